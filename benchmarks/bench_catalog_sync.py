@@ -0,0 +1,301 @@
+"""
+Purpose: Benchmark catalog pipelines against the in-process fake Square client
+Related: fake_square.py, client_utils.py, scripts/catalog/, scripts/maintenance/
+Refactor if: >400 lines OR benchmarking non-catalog pipelines
+
+Usage:
+    python benchmarks/bench_catalog_sync.py                      # sizes 10, 1000, 10000
+    python benchmarks/bench_catalog_sync.py --sizes 10,1000 --pipelines check_for_duplicates
+    python benchmarks/bench_catalog_sync.py --compare benchmarks/results/<previous>.json
+
+Each (pipeline, catalog size) pair runs in a fresh temp directory with its
+own SQLite database, a freshly seeded fake catalog and a generated menu
+(config, source feed and image files) of the same size and names, so the
+sync pipelines refresh every seeded item. Reported per run: wall time,
+API calls per endpoint, SQLite commits and peak traced memory.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+import db_utils
+import image_utils
+from client_utils import use_client
+from fake_square import FakeSquare
+
+RESULTS_DIR = PROJECT_ROOT / 'benchmarks' / 'results'
+DEFAULT_SIZES = [10, 1000, 10000]
+
+# Categories created by FakeSquare.seed_catalog() (its default category_count)
+SEED_CATEGORIES = 6
+
+
+def _load_script(relative_path):
+    """Import a script file as a module (scripts/ is not a package)"""
+    path = PROJECT_ROOT / relative_path
+    spec = importlib.util.spec_from_file_location(f"bench_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run_script(relative_path, function_name):
+    def run(client):
+        getattr(_load_script(relative_path), function_name)()
+    return run
+
+
+def _run_check_for_duplicates(client):
+    from catalog_utils import check_for_duplicates
+    check_for_duplicates(client)
+
+
+# name -> (runner, duplicate rate used when seeding the fake catalog)
+PIPELINES = {
+    'create_catalog_safe': (_run_script('scripts/catalog/create_catalog_safe.py', 'create_catalog_safe'), 0.0),
+    'create_catalog_with_images': (_run_script('scripts/catalog/create_catalog_with_images.py',
+                                               'create_catalog_with_images'), 0.0),
+    'check_for_duplicates': (_run_check_for_duplicates, 0.05),
+    'cleanup_duplicates': (_run_script('scripts/maintenance/cleanup_duplicates.py', 'cleanup_duplicates'), 0.05),
+    'delete_duplicates': (_run_script('scripts/maintenance/delete_duplicates.py', 'delete_duplicates'), 0.05),
+}
+
+# Pipelines that keep their IDs in JSON files, not SQLite: no commit count ('-')
+UNTRACKED_PIPELINES = {'create_catalog_safe'}
+
+
+def _prepare_workspace(workdir, size):
+    """
+    Write a menu config, source feed and image files for size items in workdir.
+
+    Names follow FakeSquare.seed_catalog() ('Category {c}', 'Menu Item {i}'),
+    so the catalog pipelines find and refresh the seeded objects.
+
+    Returns:
+        tuple: (config path, menu feed path, images directory)
+    """
+    config_path = workdir / 'menu_config.json'
+    menu_path = workdir / 'menu.json'
+    images_dir = workdir / 'images'
+    images_dir.mkdir()
+
+    categories = [{'name': f"Category {c}", 'description': f"Category {c} for catering"}
+                  for c in range(SEED_CATEGORIES)]
+    items_config, menu_items = [], []
+    for i in range(size):
+        name = f"Menu Item {i}"
+        file_name = name.replace(' ', '_') + '.png'
+        (images_dir / file_name).write_bytes(os.urandom(2048))
+        items_config.append({'name': name, 'category': f"Category {i % SEED_CATEGORIES}",
+                             'source_category_id': 100, 'price': 1000})
+        menu_items.append({
+            'id': i,
+            'name': name,
+            'description': f"{name} ingredients: Kale, Quinoa, Avocado",
+            'image_url': f"https://example.invalid/images/{file_name}",
+            'nutrition_info': {'calories': 400 + i % 200, 'protein': 30, 'carbohydrates': 25,
+                               'carbon_footprint': 0.8},
+            'diets': [],
+            'category_id': 100,
+        })
+
+    config_path.write_text(json.dumps({'categories': categories, 'items': items_config}))
+    menu_path.write_text(json.dumps({'menu_items': menu_items}))
+    return config_path, menu_path, images_dir
+
+
+def run_benchmark(pipeline, size, latency_ms=0.0, trace_memory=False):
+    """
+    Run one pipeline once against a freshly seeded fake catalog.
+
+    Args:
+        pipeline: Key of PIPELINES
+        size: Number of items to seed
+        latency_ms: Simulated per-call latency
+        trace_memory: Measure peak memory with tracemalloc (slows the run)
+
+    Returns:
+        dict: Measurements for this run
+    """
+    runner, duplicate_rate = PIPELINES[pipeline]
+    workdir = Path(tempfile.mkdtemp(prefix='bench-'))
+    saved = (os.getcwd(), db_utils.DB_PATH, image_utils.IMAGES_DIR)
+    saved_env = {name: os.environ.get(name) for name in ('MENU_CONFIG_PATH', 'MENU_JSON_PATH')}
+
+    try:
+        config_path, menu_path, images_dir = _prepare_workspace(workdir, size)
+        os.chdir(workdir)
+        os.environ['MENU_CONFIG_PATH'] = str(config_path)
+        os.environ['MENU_JSON_PATH'] = str(menu_path)
+        db_utils.DB_PATH = workdir / 'bench.db'
+        image_utils.IMAGES_DIR = images_dir
+
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            db_utils.init_database()
+
+        client = FakeSquare(latency=latency_ms / 1000.0, seed=size)
+        client.seed_catalog(size, category_count=SEED_CATEGORIES, duplicate_rate=duplicate_rate)
+        db_utils.DB_STATS.clear()
+
+        if trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        error = None
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), use_client(client):
+            try:
+                runner(client)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - start
+
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return {
+            'pipeline': pipeline,
+            'size': size,
+            'wall_seconds': round(wall, 6),
+            'api_calls': dict(sorted(client.calls.items())),
+            'api_calls_total': sum(client.calls.values()),
+            'db_commits': None if pipeline in UNTRACKED_PIPELINES else db_utils.DB_STATS['commits'],
+            'db_connections': None if pipeline in UNTRACKED_PIPELINES else db_utils.DB_STATS['connections'],
+            'peak_memory_bytes': peak,
+            'error': error,
+        }
+    finally:
+        os.chdir(saved[0])
+        db_utils.DB_PATH, image_utils.IMAGES_DIR = saved[1], saved[2]
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """
+    Print per-metric changes against a baseline results file.
+
+    Returns:
+        list: (pipeline, size, metric, old, new) for every regression above threshold
+    """
+    previous = {(r['pipeline'], r['size']): r for r in baseline['results']}
+    regressions = []
+
+    print(f"\n📈 Compared with {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print("-" * 70)
+
+    for result in current['results']:
+        old = previous.get((result['pipeline'], result['size']))
+        if not old:
+            continue
+        for metric in ('wall_seconds', 'api_calls_total', 'db_commits', 'peak_memory_bytes'):
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ''
+            if change > threshold:
+                flag = '  ⚠️  REGRESSION'
+                regressions.append((result['pipeline'], result['size'], metric, before, after))
+            print(f"   {result['pipeline']:<28} {result['size']:>6} {metric:<18} "
+                  f"{before:>12} → {after:<12} ({change:+.0%}){flag}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark catalog pipelines against a fake Square client")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated catalog sizes (default: 10,1000,10000)")
+    parser.add_argument('--pipelines', default=','.join(PIPELINES),
+                        help="Comma-separated pipelines to run (default: all)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated latency per API call")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument('--compare', help="Previous results file to diff against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Regression threshold (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    pipelines = [p for p in args.pipelines.split(',') if p]
+    unknown = [p for p in pipelines if p not in PIPELINES]
+    if unknown:
+        parser.error(f"Unknown pipeline(s): {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'latency_ms': args.latency_ms,
+        },
+        'results': []
+    }
+
+    print(f"⏱️  Catalog sync benchmarks (commit {results['meta']['commit']})")
+    print("=" * 70)
+    print(f"{'pipeline':<28} {'size':>6} {'wall s':>9} {'calls':>7} {'commits':>8} {'peak MB':>8}")
+    print("-" * 70)
+
+    for pipeline in pipelines:
+        for size in sizes:
+            # Time without tracemalloc overhead, then measure memory separately
+            result = run_benchmark(pipeline, size, args.latency_ms)
+            if not args.no_memory:
+                result['peak_memory_bytes'] = run_benchmark(
+                    pipeline, size, args.latency_ms, trace_memory=True)['peak_memory_bytes']
+            results['results'].append(result)
+
+            peak = f"{result['peak_memory_bytes'] / 1e6:.1f}" if result['peak_memory_bytes'] else '-'
+            commits = '-' if result['db_commits'] is None else result['db_commits']
+            print(f"{pipeline:<28} {size:>6} {result['wall_seconds']:>9.3f} {result['api_calls_total']:>7} "
+                  f"{commits:>8} {peak:>8}")
+            if result['error']:
+                print(f"   ❌ {result['error']}")
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"catalog_sync-{results['meta']['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n✅ Results saved: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
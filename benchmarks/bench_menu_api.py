@@ -0,0 +1,315 @@
+"""
+Purpose: Benchmark the read-only menu HTTP API (menu_api.py): requests/s, latency, 304s, invalidation
+Related: menu_api.py, feed_utils.py, db_utils.py (menu_changes counter)
+Refactor if: >400 lines OR benchmarking a server in another process/host
+
+Usage:
+    python benchmarks/bench_menu_api.py                          # 1000 items, 8 clients, 5s per scenario
+    python benchmarks/bench_menu_api.py --items 10000 --clients 16 --duration 10
+    python benchmarks/bench_menu_api.py --compare benchmarks/results/<previous>.json
+
+Each run builds a temp SQLite database with synthetic categories, items,
+variations and a location, starts the server in-process on a free port,
+and drives it with keep-alive client threads (http.client). Scenarios:
+
+    menu         GET /menu, gzip, no ETag (full body every time)
+    revalidate   GET /menu with If-None-Match (304s)
+    mixed        categories / items / search / menu, gzip, with ETags
+    writes       mixed, while a writer changes a price every 100 ms
+                 (every change invalidates the cache)
+
+Reported per scenario: requests/s, p50/p95/p99 latency, status counts,
+cache hits/misses/rebuilds, and KB sent per request. Client and server
+share one Python process (and its GIL), so absolute numbers are a floor.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+import db_utils
+from menu_api import create_server
+
+RESULTS_DIR = PROJECT_ROOT / 'benchmarks' / 'results'
+ENVIRONMENT = 'sandbox'
+SCENARIOS = ['menu', 'revalidate', 'mixed', 'writes']
+SEARCH_TERMS = ['kale', 'quin', 'chicken caesar', 'avocado', 'item 1', 'crunch']
+WRITE_INTERVAL = 0.1
+
+
+def _seed_database(items, categories=12):
+    """Synthetic menu: categories, items with 2 variations each, one location"""
+    with db_utils.get_db() as conn:
+        conn.execute('INSERT INTO locations (environment, square_id, name, address) VALUES (?, ?, ?, ?)',
+                     (ENVIRONMENT, 'LOC1', 'Bench Location', '1 Bench St'))
+        conn.executemany('INSERT INTO categories (environment, square_id, name, description) VALUES (?, ?, ?, ?)',
+                         [(ENVIRONMENT, f'CAT{c}', f'Category {c}', f'Category {c} description')
+                          for c in range(categories)])
+        category_ids = [row[0] for row in conn.execute('SELECT id FROM categories ORDER BY id')]
+        conn.executemany('''
+            INSERT INTO menu_items (environment, square_id, name, category_id, description, price_cents)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(ENVIRONMENT, f'ITEM{i}', f'Menu Item {i}', category_ids[i % categories],
+               f'Item {i} ingredients: Kale, Quinoa, Avocado, Chicken Caesar crunch', 1000 + i % 900)
+              for i in range(items)])
+        conn.executemany('''
+            INSERT INTO item_variations (environment, square_id, item_id, name, price_cents)
+            SELECT ?, 'VAR' || id || '-' || ?, id, ?, price_cents + ? FROM menu_items
+        ''', [(ENVIRONMENT, 0, 'Regular', 0), (ENVIRONMENT, 1, 'Large', 300)])
+
+
+def _paths(items, scenario, rng):
+    if scenario in ('menu', 'revalidate'):
+        return '/menu'
+    choice = rng.random()
+    if choice < 0.4:
+        return f'/items/ITEM{rng.randrange(items)}'
+    if choice < 0.6:
+        return f'/categories/CAT{rng.randrange(12)}'
+    if choice < 0.75:
+        return '/categories'
+    if choice < 0.9:
+        return f"/search?q={rng.choice(SEARCH_TERMS).replace(' ', '+')}"
+    return '/menu?location=LOC1'
+
+
+def _client(port, items, scenario, deadline, seed, results):
+    """One keep-alive connection issuing requests until the deadline"""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    etags = {}
+    latencies, statuses, received = [], Counter(), 0
+    revalidate = scenario != 'menu'
+
+    while time.perf_counter() < deadline:
+        path = _paths(items, scenario, rng)
+        headers = {'Accept-Encoding': 'gzip'}
+        if revalidate and path in etags:
+            headers['If-None-Match'] = etags[path]
+        started = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] += 1
+        received += len(body)
+        if response.status == 200:
+            etags[path] = response.getheader('ETag')
+
+    conn.close()
+    results.append((latencies, statuses, received))
+
+
+def _writer(deadline, stop):
+    """Change one price every WRITE_INTERVAL seconds (bumps the change counter)"""
+    writes = 0
+    conn = db_utils.connect()
+    while time.perf_counter() < deadline and not stop.wait(WRITE_INTERVAL):
+        conn.execute('UPDATE menu_items SET price_cents = price_cents + 1 WHERE square_id = ?', ('ITEM0',))
+        conn.commit()
+        writes += 1
+    conn.close()
+    return writes
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_scenario(server, items, scenario, clients, duration):
+    """
+    Drive the running server with `clients` threads for `duration` seconds.
+
+    Returns:
+        dict: Measurements for this scenario
+    """
+    cache = server.cache
+    before = dict(cache.stats, not_modified=server.not_modified)
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_client, args=(server.server_address[1], items, scenario,
+                                                        deadline, seed, results))
+               for seed in range(clients)]
+
+    stop = threading.Event()
+    writes = []
+    writer = threading.Thread(target=lambda: writes.append(_writer(deadline, stop))) \
+        if scenario == 'writes' else None
+
+    start = time.perf_counter()
+    for thread in threads + ([writer] if writer else []):
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    stop.set()
+    if writer:
+        writer.join()
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    statuses = sum((result[1] for result in results), Counter())
+    received = sum(result[2] for result in results)
+    after = dict(cache.stats, not_modified=server.not_modified)
+
+    return {
+        'scenario': scenario,
+        'items': items,
+        'clients': clients,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / wall, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'kb_per_request': round(received / 1024 / max(len(latencies), 1), 3),
+        'cache': {key: after[key] - before[key] for key in after},
+        'writes': writes[0] if writes else 0,
+    }
+
+
+def run_benchmark(items, clients, duration, scenarios, check_interval):
+    """Seed a temp database, start the server, run the scenarios; returns their results"""
+    workdir = Path(tempfile.mkdtemp(prefix='bench-api-'))
+    saved_db_path = db_utils.DB_PATH
+    try:
+        db_utils.DB_PATH = workdir / 'bench.db'
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            db_utils.init_database()
+        _seed_database(items)
+
+        server = create_server(ENVIRONMENT, port=0, check_interval=check_interval)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            started = time.perf_counter()
+            server.cache.refresh()
+            build_seconds = time.perf_counter() - started
+            results = [dict(run_scenario(server, items, scenario, clients, duration),
+                            build_seconds=round(build_seconds, 4))
+                       for scenario in scenarios]
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.cache.close()
+        return results
+    finally:
+        db_utils.DB_PATH = saved_db_path
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """
+    Print per-scenario changes against a baseline results file.
+
+    Returns:
+        list: (scenario, metric, old, new) for every regression above threshold
+    """
+    previous = {(r['scenario'], r['items'], r['clients']): r for r in baseline['results']}
+    regressions = []
+
+    print(f"\n📈 Compared with {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    print("-" * 70)
+
+    for result in current['results']:
+        old = previous.get((result['scenario'], result['items'], result['clients']))
+        if not old:
+            continue
+        # Higher is better for throughput, lower for latency
+        for metric, sign in (('requests_per_second', -1), ('p50_ms', 1), ('p99_ms', 1)):
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ''
+            if change * sign > threshold:
+                flag = '  ⚠️  REGRESSION'
+                regressions.append((result['scenario'], metric, before, after))
+            print(f"   {result['scenario']:<12} {metric:<20} {before:>12} → {after:<12} ({change:+.0%}){flag}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the read-only menu HTTP API")
+    parser.add_argument('--items', type=int, default=1000, help="Menu items in the database (default: 1000)")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent keep-alive clients (default: 8)")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per scenario (default: 5)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--check-interval', type=float, default=0.5,
+                        help="Server change-check interval in seconds (default: 0.5)")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/menu_api-<commit>-<time>.json)")
+    parser.add_argument('--compare', help="Previous results file to diff against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Regression threshold (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'check_interval': args.check_interval,
+        },
+        'results': run_benchmark(args.items, args.clients, args.duration, scenarios, args.check_interval),
+    }
+
+    print(f"⏱️  Menu API benchmarks (commit {results['meta']['commit']}, {args.items} items, "
+          f"{args.clients} clients)")
+    print("=" * 78)
+    print(f"{'scenario':<12} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KB/req':>8}  statuses")
+    print("-" * 78)
+    for result in results['results']:
+        statuses = ' '.join(f"{status}:{count}" for status, count in result['statuses'].items())
+        print(f"{result['scenario']:<12} {result['requests_per_second']:>9.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['kb_per_request']:>8.2f}  {statuses}")
+        cache = result['cache']
+        print(f"{'':<12} cache: {cache['hits']} hits, {cache['misses']} misses, {cache['rebuilds']} rebuilds"
+              + (f", {result['writes']} writes" if result['writes'] else ""))
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"menu_api-{results['meta']['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n✅ Results saved: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
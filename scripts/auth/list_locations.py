@@ -5,19 +5,23 @@ Refactor if: N/A (simple utility script)
 """
 
 import os
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
+import sys
+from pathlib import Path
+
+# Add src directory to Python path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from env_utils import load_env
+from client_utils import create_square_client
+from profiling import run_script
 
 def list_locations():
     """List all locations in the Square account"""
-    load_dotenv()
+    load_env()
 
-    access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     print("📍 Fetching all locations...\n")
     response = client.locations.list()
@@ -50,4 +54,4 @@ def list_locations():
         print()
 
 if __name__ == "__main__":
-    list_locations()
+    run_script(list_locations)
@@ -5,26 +5,33 @@ Refactor if: N/A (simple test script)
 """
 
 import os
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
+import sys
+from pathlib import Path
+
+# Add src directory to Python path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from env_utils import load_env
+from client_utils import create_square_client, is_fake_client
+from profiling import run_script
 
 def test_authentication():
     """Test Square API authentication and basic connectivity"""
 
     # Load environment variables
-    load_dotenv()
+    load_env()
 
     access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
 
+    if is_fake_client():
+        access_token = access_token or 'fake-token-not-used'
+
     if not access_token:
         print("❌ Error: SQUARE_ACCESS_TOKEN not found in .env file")
         return False
 
-    # Convert environment string to enum
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
     print(f"🔑 Testing Square API authentication...")
     print(f"   Environment: {environment_name.upper()}")
     print(f"   Access Token: {access_token[:10]}...{access_token[-10:]}")
@@ -32,10 +39,7 @@ def test_authentication():
 
     try:
         # Initialize Square client
-        client = Square(
-            token=access_token,
-            environment=environment
-        )
+        client = create_square_client(environment_name)
 
         # Test API connectivity by listing locations
         print("📍 Fetching locations...")
@@ -68,5 +72,5 @@ def test_authentication():
         return False
 
 if __name__ == "__main__":
-    success = test_authentication()
+    success = run_script(test_authentication)
     exit(0 if success else 1)
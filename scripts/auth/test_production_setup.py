@@ -18,8 +18,8 @@ from env_utils import (
     get_environment, get_access_token, get_main_location_id,
     print_environment_info, is_production
 )
-from square import Square
-from square.client import SquareEnvironment
+from client_utils import create_square_client
+from profiling import run_script
 
 
 def test_production_setup():
@@ -53,10 +53,7 @@ def test_production_setup():
         return False
 
     # Create Square client
-    client = Square(
-        token=access_token,
-        environment=SquareEnvironment.PRODUCTION
-    )
+    client = create_square_client('production')
 
     print("🔧 Running Production Checks...")
     print("-" * 70)
@@ -198,5 +195,5 @@ def test_production_setup():
 
 
 if __name__ == "__main__":
-    success = test_production_setup()
+    success = run_script(test_production_setup)
     sys.exit(0 if success else 1)
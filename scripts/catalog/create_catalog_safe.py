@@ -11,15 +11,18 @@ import sys
 import json
 import uuid
 from pathlib import Path
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
 
 # Add src directory to Python path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / 'src'))
 
 from catalog_utils import create_or_update_category, create_or_update_item, check_for_duplicates
+from env_utils import load_env
+from client_utils import create_square_client
+from snapshot_utils import sync_snapshot
+from profiling import run_script
+from api_metrics import start_stage
+from menu_utils import load_menu_data, load_menu_config
 
 def create_catalog_safe():
     """
@@ -30,13 +33,10 @@ def create_catalog_safe():
     2. Prevents duplicates
     3. Is idempotent (can be run multiple times safely)
     """
-    load_dotenv()
+    load_env()
 
-    access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     print(f"🔒 PRODUCTION-SAFE Catalog Setup")
     print(f"   Environment: {environment_name.upper()}")
@@ -44,8 +44,10 @@ def create_catalog_safe():
     print()
 
     # PRE-FLIGHT CHECK: Look for existing duplicates
+    start_stage('preflight')
     print("🔍 Pre-flight check: Scanning for existing duplicates...")
-    duplicates = check_for_duplicates(client)
+    # Delta-refreshed local snapshot: one catalog.search call on a warm start
+    duplicates = check_for_duplicates(client, snapshot=sync_snapshot(client, environment_name))
 
     if duplicates['items'] or duplicates['categories']:
         print("❌ DUPLICATES DETECTED - ABORTING!")
@@ -60,24 +62,19 @@ def create_catalog_safe():
     print("✅ No duplicates found - safe to proceed\n")
 
     # Step 1: Create Categories
+    start_stage('categories')
     print("📁 STEP 1: Creating Categories")
     print("-" * 60)
 
-    categories_to_create = [
-        {'name': 'Signature Salads', 'description': 'Just Salad signature salad bowls and plates for catering'},
-        {'name': 'Wraps', 'description': 'Fresh wraps and sandwiches for catering orders'},
-        {'name': 'Build Your Own', 'description': 'Customizable salads and bowls - build your own'},
-        {'name': 'Smoothies', 'description': 'Fresh fruit smoothies and healthy beverages'},
-        {'name': 'Snacks', 'description': 'Sides, snacks, and appetizers for catering'},
-        {'name': 'Beverages', 'description': 'Drinks, juices, and beverage options'}
-    ]
+    menu_config = load_menu_config()
+    categories_to_create = menu_config['categories']
 
     category_ids = {}
     created_count = 0
     existing_count = 0
 
     for cat in categories_to_create:
-        cat_id, was_created = create_or_update_category(
+        cat_id, was_created, _ = create_or_update_category(
             client,
             cat['name'],
             cat['description'],
@@ -100,57 +97,15 @@ def create_catalog_safe():
         json.dump(category_ids, f, indent=2)
 
     # Step 2: Create Menu Items
+    start_stage('items')
     print("📦 STEP 2: Creating Menu Items")
     print("-" * 60)
 
     # Load Just Salad menu data
-    with open('/tmp/menu.json', 'r') as f:
-        content = f.read()
-        if content.startswith('HTTP/'):
-            json_start = max(content.find('{'), content.find('['))
-            if json_start != -1:
-                content = content[json_start:]
-        menu_data = json.loads(content)
-
-    # Define items to create
-    items_to_create = [
-        {
-            'name': 'Autumn Caesar',
-            'category': 'Signature Salads',
-            'source_category_id': 100,
-            'price': 1500
-        },
-        {
-            'name': 'Honey Crispy Chicken Wrap',
-            'category': 'Wraps',
-            'source_category_id': 105,
-            'price': 1500
-        },
-        {
-            'name': 'Buffalo Cauliflower',
-            'category': 'Build Your Own',
-            'source_category_id': 100,
-            'price': 1500
-        },
-        {
-            'name': 'Strawberry Banana',
-            'category': 'Smoothies',
-            'source_category_id': 107,
-            'price': 1500
-        },
-        {
-            'name': 'Mixed Nuts & Trail Mix',
-            'category': 'Snacks',
-            'description': 'Assorted nuts, dried fruits, and healthy snack mix',
-            'price': 500
-        },
-        {
-            'name': 'Bottled Water & Drinks',
-            'category': 'Beverages',
-            'description': 'Selection of bottled water, sparkling water, and refreshing beverages',
-            'price': 500
-        }
-    ]
+    menu_data = load_menu_data()
+
+    # Items to create (data/menu_config.json)
+    items_to_create = menu_config['items']
 
     menu_item_ids = {}
     items_created_count = 0
@@ -205,4 +160,4 @@ def create_catalog_safe():
     print()
 
 if __name__ == "__main__":
-    create_catalog_safe()
+    run_script(create_catalog_safe)
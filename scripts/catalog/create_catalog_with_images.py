@@ -10,22 +10,27 @@ CRITICAL: This script is safe for production use
 """
 
 import sys
-import json
 import uuid
 from pathlib import Path
-from square import Square
-from square.client import SquareEnvironment
 
 # Add src directory to Python path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / 'src'))
 
 # Import our utilities
-from env_utils import get_access_token, get_environment, print_environment_info, is_production
-from catalog_utils import create_or_update_category, create_or_update_item, check_for_duplicates
-from db_utils import (init_database, save_category, save_menu_item, save_location,
+from env_utils import get_environment, print_environment_info, is_production
+from catalog_utils import (create_or_update_category, check_for_duplicates, get_existing_catalog_items,
+                           batch_create_items, extract_item_variations)
+from db_utils import (init_database, save_category, save_menu_item, save_location, save_item_variations,
                       get_category_by_name, get_item_by_name, export_to_json, show_summary)
 from image_utils import process_item_image
+from client_utils import create_square_client
+from snapshot_utils import sync_snapshot
+from profiling import run_script
+from api_metrics import start_stage
+from menu_utils import load_menu_data, load_menu_config, resolve_menu_items
+from nutrition_utils import save_nutrition
+from plan_utils import build_plan, print_plan
 
 
 def create_catalog_with_images():
@@ -39,17 +44,17 @@ def create_catalog_with_images():
     - Idempotent operations
     """
     # Get credentials from environment
-    access_token = get_access_token()
     environment_name = get_environment()
-    environment = SquareEnvironment.SANDBOX if environment_name == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     # Display environment info
     print_environment_info()
 
     # Production safety check
     if is_production():
+        # Show what would change first (menu config vs local DB, no API calls)
+        print_plan(build_plan(environment_name))
+        print()
         response = input("⚠️  You are in PRODUCTION mode. Type 'yes' to continue: ")
         if response.lower() != 'yes':
             print("❌ Aborted. Change SQUARE_ENVIRONMENT to 'sandbox' in .env to test first.")
@@ -68,8 +73,10 @@ def create_catalog_with_images():
     print()
 
     # PRE-FLIGHT CHECK
+    start_stage('preflight')
     print("🔍 Pre-flight check: Scanning for duplicates...")
-    duplicates = check_for_duplicates(client)
+    # Delta-refreshed local snapshot: one catalog.search call on a warm start
+    duplicates = check_for_duplicates(client, snapshot=sync_snapshot(client, environment_name))
 
     if duplicates['items'] or duplicates['categories']:
         print("❌ DUPLICATES DETECTED - ABORTING!")
@@ -84,6 +91,7 @@ def create_catalog_with_images():
     print("✅ No duplicates - safe to proceed\n")
 
     # STEP 1: Sync existing locations to database
+    start_stage('locations')
     print("📍 STEP 1: Syncing Locations to Database")
     print("-" * 70)
 
@@ -102,17 +110,12 @@ def create_catalog_with_images():
     print()
 
     # STEP 2: Create Categories
+    start_stage('categories')
     print("📁 STEP 2: Creating Categories")
     print("-" * 70)
 
-    categories_config = [
-        {'name': 'Signature Salads', 'description': 'Just Salad signature salad bowls and plates for catering'},
-        {'name': 'Wraps', 'description': 'Fresh wraps and sandwiches for catering orders'},
-        {'name': 'Build Your Own', 'description': 'Customizable salads and bowls - build your own'},
-        {'name': 'Smoothies', 'description': 'Fresh fruit smoothies and healthy beverages'},
-        {'name': 'Snacks', 'description': 'Sides, snacks, and appetizers for catering'},
-        {'name': 'Beverages', 'description': 'Drinks, juices, and beverage options'}
-    ]
+    menu_config = load_menu_config()
+    categories_config = menu_config['categories']
 
     created_count = 0
     existing_count = 0
@@ -127,7 +130,7 @@ def create_catalog_with_images():
             continue
 
         # Create in Square
-        cat_id, was_created = create_or_update_category(
+        cat_id, was_created, version = create_or_update_category(
             client,
             cat['name'],
             cat['description'],
@@ -135,7 +138,7 @@ def create_catalog_with_images():
         )
 
         # Save to database
-        save_category(environment_name, cat_id, cat['name'], cat['description'])
+        save_category(environment_name, cat_id, cat['name'], cat['description'], version=version)
 
         if was_created:
             print(f"   ✓ Created: {cat['name']}")
@@ -147,44 +150,41 @@ def create_catalog_with_images():
     print(f"\nCategories: {created_count} created, {existing_count} existing\n")
 
     # STEP 3: Load Menu Data
+    start_stage('menu_data')
     print("📥 STEP 3: Loading Just Salad Menu Data")
     print("-" * 70)
 
-    with open('/tmp/menu.json', 'r') as f:
-        content = f.read()
-        if content.startswith('HTTP/'):
-            json_start = max(content.find('{'), content.find('['))
-            if json_start != -1:
-                content = content[json_start:]
-        menu_data = json.loads(content)
+    menu_data = load_menu_data()
 
     print(f"   Loaded {len(menu_data.get('menu_items', []))} menu items from source\n")
 
     # STEP 4: Create Menu Items
+    start_stage('items')
     print("📦 STEP 4: Creating Menu Items")
     print("-" * 70)
 
-    items_config = [
-        {'name': 'Autumn Caesar', 'category': 'Signature Salads', 'js_cat': 100, 'price': 1500},
-        {'name': 'Honey Crispy Chicken Wrap', 'category': 'Wraps', 'js_cat': 105, 'price': 1500},
-        {'name': 'Buffalo Cauliflower', 'category': 'Build Your Own', 'js_cat': 100, 'price': 1500},
-        {'name': 'Strawberry Banana', 'category': 'Smoothies', 'js_cat': 107, 'price': 1500},
-        {
-            'name': 'Mixed Nuts & Trail Mix',
-            'category': 'Snacks',
-            'description': 'Assorted nuts, dried fruits, and healthy snack mix',
-            'price': 500
-        },
-        {
-            'name': 'Bottled Water & Drinks',
-            'category': 'Beverages',
-            'description': 'Selection of bottled water and refreshing beverages',
-            'price': 500
-        }
-    ]
+    items_config = menu_config['items']
+    resolved_items = {item['name']: item for item in resolve_menu_items(items_config, menu_data)}
 
     items_created = 0
     items_existing = 0
+    items_to_create = []
+    existing_items = None  # Square catalog, fetched once on first cache miss
+
+    def save_item_record(item, catalog_object):
+        """Save the item and all of its variations to the database"""
+        variations = extract_item_variations(catalog_object)
+        save_menu_item(
+            environment=environment_name,
+            square_id=catalog_object.id,
+            name=item['name'],
+            category_square_id=item['category_id'],
+            description=item['description'],
+            price_cents=variations[0]['price_cents'] if variations else None,
+            source_url=item['source_url'],
+            version=catalog_object.version
+        )
+        save_item_variations(environment_name, catalog_object.id, variations)
 
     for item_config in items_config:
         print(f"\n{item_config['name']}:")
@@ -197,51 +197,67 @@ def create_catalog_with_images():
             items_existing += 1
             continue
 
-        # Find menu data from Just Salad
-        description = item_config.get('description', '')
-        image_url = None
+        resolved = resolved_items[item_config['name']]
+        item = {
+            'name': resolved['name'],
+            # Get category Square ID from database
+            'category_id': get_category_by_name(environment_name, resolved['category']),
+            'description': resolved['description'],
+            'source_url': resolved['source_url'],
+            'variations': resolved['variations']
+        }
 
-        if 'js_cat' in item_config:
-            for menu_item in menu_data['menu_items']:
-                if menu_item.get('name') == item_config['name']:
-                    description = menu_item.get('description', description)
-                    image_url = menu_item.get('image_url')
-                    break
+        if existing_items is None:
+            existing_items = get_existing_catalog_items(client, 'ITEM')
 
-        # Get category Square ID from database
-        category_square_id = get_category_by_name(environment_name, item_config['category'])
+        if item['name'] in existing_items:
+            catalog_object = existing_items[item['name']]
+            print(f"   → Existing in Square: {catalog_object.id}")
+            items_existing += 1
+            save_item_record(item, catalog_object)
+        else:
+            print(f"   + Queued for creation ({len(item['variations'])} variation(s))")
+            items_to_create.append(item)
 
-        # Create item in Square
-        item_id, was_created = create_or_update_item(
-            client,
-            item_name=item_config['name'],
-            category_id=category_square_id,
-            description=description,
-            price_cents=item_config['price'],
-            idempotency_key=str(uuid.uuid4())
-        )
+    # Create all new items with their variations in as few upserts as possible
+    if items_to_create:
+        created = batch_create_items(client, items_to_create)
 
-        if was_created:
-            print(f"   ✓ Created in Square: {item_id}")
-            items_created += 1
-        else:
-            print(f"   → Existing in Square: {item_id}")
-            items_existing += 1
+        for item in items_to_create:
+            catalog_object = created.get(item['name'])
+            if not catalog_object:
+                print(f"   ❌ Not returned by Square: {item['name']}")
+                continue
 
-        # Save to database (without image ID initially)
-        save_menu_item(
-            environment=environment_name,
-            square_id=item_id,
-            name=item_config['name'],
-            category_square_id=category_square_id,
-            description=description,
-            price_cents=item_config['price'],
-            source_url=image_url
-        )
+            print(f"   ✓ Created in Square: {item['name']} ({catalog_object.id})")
+            items_created += 1
+            # Save to database (without image ID initially)
+            save_item_record(item, catalog_object)
 
     print(f"\nMenu Items: {items_created} created, {items_existing} existing\n")
 
+    # Keep nutrition facts and diet tags from the source feed
+    nutrition_saved = 0
+
+    for item_config in items_config:
+        if 'source_category_id' not in item_config:
+            continue
+
+        item_square_id = get_item_by_name(environment_name, item_config['name'])
+        if not item_square_id:
+            continue
+
+        for menu_item in menu_data['menu_items']:
+            if menu_item.get('name') == item_config['name']:
+                if save_nutrition(environment_name, item_square_id,
+                                  menu_item.get('nutrition_info'), menu_item.get('diets')):
+                    nutrition_saved += 1
+                break
+
+    print(f"Nutrition: {nutrition_saved} items saved\n")
+
     # STEP 5: Process Images
+    start_stage('images')
     print("🖼️  STEP 5: Processing Images")
     print("-" * 70)
 
@@ -257,7 +273,7 @@ def create_catalog_with_images():
         # Find image URL
         image_url = None
 
-        if 'js_cat' in item_config:
+        if 'source_category_id' in item_config:
             for menu_item in menu_data['menu_items']:
                 if menu_item.get('name') == item_config['name']:
                     image_url = menu_item.get('image_url')
@@ -272,24 +288,15 @@ def create_catalog_with_images():
                 environment_name
             )
 
+            # process_item_image() links the image to the saved item; the
+            # description, price and category from step 4 stay as they are
             if image_id:
-                # Update database with image ID
-                category_square_id = get_category_by_name(environment_name, item_config['category'])
-                save_menu_item(
-                    environment=environment_name,
-                    square_id=item_square_id,
-                    name=item_config['name'],
-                    category_square_id=category_square_id,
-                    description=item_config.get('description', ''),
-                    price_cents=item_config['price'],
-                    image_square_id=image_id,
-                    source_url=image_url
-                )
                 images_processed += 1
 
     print(f"\n✅ Images processed: {images_processed}\n")
 
     # STEP 6: Export to JSON (backward compatibility)
+    start_stage('export')
     print("📤 STEP 6: Exporting to JSON Files")
     print("-" * 70)
 
@@ -314,4 +321,4 @@ def create_catalog_with_images():
 
 
 if __name__ == "__main__":
-    create_catalog_with_images()
+    run_script(create_catalog_with_images)
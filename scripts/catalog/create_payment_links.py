@@ -7,25 +7,22 @@ Refactor if: N/A (utility script)
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
 
 # Add src directory to Python path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / 'src'))
 
 from db_utils import get_all_items
+from env_utils import load_env
+from client_utils import create_square_client
+from profiling import run_script
 
 def create_payment_links():
     """Create shareable payment links for all menu items"""
-    load_dotenv()
+    load_env()
 
-    access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     print("=" * 70)
     print("🔗 CREATING PAYMENT LINKS FOR MENU ITEMS")
@@ -107,4 +104,4 @@ def create_payment_links():
 
 
 if __name__ == "__main__":
-    create_payment_links()
+    run_script(create_payment_links)
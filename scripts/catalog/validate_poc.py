@@ -5,25 +5,25 @@ Refactor if: N/A (validation script)
 """
 
 import os
+import sys
 import json
 from pathlib import Path
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
 
 # Get project root and data directory
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from env_utils import load_env
+from client_utils import create_square_client
+from profiling import run_script
 
 def validate_poc():
     """Validate the complete POC setup"""
-    load_dotenv()
+    load_env()
 
-    access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     print("=" * 60)
     print("SQUARE CATERING MENU POC - VALIDATION REPORT")
@@ -148,4 +148,4 @@ def validate_poc():
     print()
 
 if __name__ == "__main__":
-    validate_poc()
+    run_script(validate_poc)
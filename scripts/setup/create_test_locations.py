@@ -5,20 +5,24 @@ Refactor if: N/A (one-time setup script)
 """
 
 import os
+import sys
 import json
-from dotenv import load_dotenv
-from square import Square
-from square.client import SquareEnvironment
+from pathlib import Path
+
+# Add src directory to Python path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from env_utils import load_env
+from client_utils import create_square_client
+from profiling import run_script
 
 def create_test_locations():
     """Create 2 test locations based on Just Salad store data"""
-    load_dotenv()
+    load_env()
 
-    access_token = os.getenv('SQUARE_ACCESS_TOKEN')
     environment_name = os.getenv('SQUARE_ENVIRONMENT', 'sandbox')
-    environment = SquareEnvironment.SANDBOX if environment_name.lower() == 'sandbox' else SquareEnvironment.PRODUCTION
-
-    client = Square(token=access_token, environment=environment)
+    client = create_square_client(environment_name)
 
     # Load Just Salad locations
     with open('/tmp/store_locations.json', 'r') as f:
@@ -100,4 +104,4 @@ def create_test_locations():
     return created_locations
 
 if __name__ == "__main__":
-    create_test_locations()
+    run_script(create_test_locations)
@@ -0,0 +1,389 @@
+"""
+Purpose: Per-endpoint and per-stage instrumentation of Square API calls
+Related: client_utils.py (wraps every client), fake_square.py, db_utils.py (DB_STATS)
+Refactor if: >400 lines OR exporting to a metrics backend beyond JSON/Prometheus text
+
+Every call made through InstrumentedClient records count, request/response
+bytes, latency (percentiles + Prometheus histogram buckets), errors and
+retries, keyed by endpoint (e.g. 'catalog.batch_upsert') and by the
+pipeline stage active at the time (set with start_stage()/stage()).
+"""
+
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Prometheus-style latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTTP statuses worth retrying (rate limit + server errors)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+NO_STAGE = '-'
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _payload_size(value):
+    """Best-effort JSON size in bytes of a request or response"""
+    if value is None:
+        return 0
+    try:
+        if callable(getattr(value, 'model_dump_json', None)):
+            return len(value.model_dump_json())
+        if callable(getattr(value, 'model_dump', None)):
+            return len(json.dumps(value.model_dump(), default=str))
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _Series:
+    """Counters and latencies for one endpoint or stage"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latencies = []
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.status_codes = defaultdict(int)
+
+    def add(self, latency, request_bytes, response_bytes, status_code):
+        self.calls += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.latencies.append(latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+                break
+        if status_code is not None:
+            self.errors += 1
+            self.status_codes[status_code] += 1
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency_total_s': round(sum(ordered), 6),
+            'latency_p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+            'latency_p95_ms': round(_percentile(ordered, 95) * 1000, 3),
+            'latency_p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+            'latency_max_ms': round((ordered[-1] if ordered else 0.0) * 1000, 3),
+            'status_codes': dict(self.status_codes),
+        }
+
+
+class ApiMetrics:
+    """Thread-safe registry of API call measurements"""
+
+    def __init__(self, measure_bytes=True):
+        self.measure_bytes = measure_bytes
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = defaultdict(_Series)
+            self.stages = defaultdict(_Series)
+            self.stage_seconds = defaultdict(float)
+            self._stage = NO_STAGE
+            self._stage_started = time.perf_counter()
+
+    # ----- stages ----------------------------------------------------------
+
+    @property
+    def current_stage(self):
+        return self._stage
+
+    def start_stage(self, name):
+        """Attribute following calls to a pipeline stage (ends the previous one)"""
+        with self._lock:
+            now = time.perf_counter()
+            if self._stage != NO_STAGE:
+                self.stage_seconds[self._stage] += now - self._stage_started
+            self._stage = name or NO_STAGE
+            self._stage_started = now
+
+    def end_stage(self):
+        self.start_stage(None)
+
+    @contextmanager
+    def stage(self, name):
+        """Context manager form of start_stage(); restores the outer stage"""
+        outer = self._stage
+        self.start_stage(name)
+        try:
+            yield
+        finally:
+            self.start_stage(outer if outer != NO_STAGE else None)
+
+    def slowest_stages(self, limit=5):
+        """Return [(stage, seconds)] sorted slowest first (includes the running stage)"""
+        with self._lock:
+            totals = dict(self.stage_seconds)
+            if self._stage != NO_STAGE:
+                totals[self._stage] = totals.get(self._stage, 0.0) + time.perf_counter() - self._stage_started
+        return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+
+    # ----- recording -------------------------------------------------------
+
+    def record(self, endpoint, latency, request_bytes=0, response_bytes=0, status_code=None):
+        with self._lock:
+            self.endpoints[endpoint].add(latency, request_bytes, response_bytes, status_code)
+            self.stages[self._stage].add(latency, request_bytes, response_bytes, status_code)
+
+    def record_retry(self, endpoint):
+        with self._lock:
+            self.endpoints[endpoint].retries += 1
+            self.stages[self._stage].retries += 1
+
+    def total_calls(self):
+        with self._lock:
+            return sum(series.calls for series in self.endpoints.values())
+
+    # ----- reporting -------------------------------------------------------
+
+    def to_dict(self):
+        from db_utils import DB_STATS
+
+        with self._lock:
+            endpoints = {name: series.summary() for name, series in sorted(self.endpoints.items())}
+            stages = {name: series.summary() for name, series in sorted(self.stages.items())}
+        return {
+            'endpoints': endpoints,
+            'stages': stages,
+            'stage_seconds': {name: round(sec, 6) for name, sec in self.slowest_stages(limit=None)},
+            'db': dict(DB_STATS),
+        }
+
+    def to_json(self, path=None):
+        """Return the metrics as JSON, optionally writing them to path"""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, path=None):
+        """Return the metrics in Prometheus text exposition format"""
+        lines = [
+            '# HELP square_api_calls_total Square API calls by endpoint and stage',
+            '# TYPE square_api_calls_total counter',
+        ]
+        with self._lock:
+            for name, series in sorted(self.stages.items()):
+                lines.append(f'square_api_stage_calls_total{{stage="{name}"}} {series.calls}')
+            for name, series in sorted(self.endpoints.items()):
+                lines.append(f'square_api_calls_total{{endpoint="{name}"}} {series.calls}')
+                lines.append(f'square_api_errors_total{{endpoint="{name}"}} {series.errors}')
+                lines.append(f'square_api_retries_total{{endpoint="{name}"}} {series.retries}')
+                lines.append(f'square_api_request_bytes_total{{endpoint="{name}"}} {series.request_bytes}')
+                lines.append(f'square_api_response_bytes_total{{endpoint="{name}"}} {series.response_bytes}')
+            lines.append('# TYPE square_api_latency_seconds histogram')
+            for name, series in sorted(self.endpoints.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, series.buckets):
+                    cumulative += count
+                    lines.append(f'square_api_latency_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'square_api_latency_seconds_bucket{{endpoint="{name}",le="+Inf"}} {series.calls}')
+                lines.append(f'square_api_latency_seconds_sum{{endpoint="{name}"}} {sum(series.latencies):.6f}')
+                lines.append(f'square_api_latency_seconds_count{{endpoint="{name}"}} {series.calls}')
+
+        text = '\n'.join(lines) + '\n'
+        if path:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def print_summary(self):
+        """Print a per-endpoint and per-stage table"""
+        data = self.to_dict()
+        if not data['endpoints']:
+            return
+
+        print()
+        print("=" * 70)
+        print("📡 SQUARE API SUMMARY")
+        print("=" * 70)
+        print(f"{'endpoint':<26} {'calls':>6} {'err':>4} {'retry':>5} {'p50 ms':>8} {'p95 ms':>8} {'KB':>8}")
+        for name, s in data['endpoints'].items():
+            kb = (s['request_bytes'] + s['response_bytes']) / 1024
+            print(f"{name:<26} {s['calls']:>6} {s['errors']:>4} {s['retries']:>5} "
+                  f"{s['latency_p50_ms']:>8.1f} {s['latency_p95_ms']:>8.1f} {kb:>8.1f}")
+
+        if len(data['stages']) > 1 or NO_STAGE not in data['stages']:
+            print("-" * 70)
+            print(f"{'stage':<26} {'calls':>6} {'err':>4} {'api s':>8} {'wall s':>8}")
+            empty = _Series().summary()
+            for name in sorted(set(data['stages']) | set(data['stage_seconds'])):
+                s = data['stages'].get(name, empty)
+                wall = data['stage_seconds'].get(name)
+                wall_text = f"{wall:>8.2f}" if wall is not None else f"{'-':>8}"
+                print(f"{name:<26} {s['calls']:>6} {s['errors']:>4} {s['latency_total_s']:>8.2f} {wall_text}")
+
+        if data['db']:
+            print("-" * 70)
+            print(f"SQLite: {data['db'].get('commits', 0)} commits, {data['db'].get('connections', 0)} connections")
+        print("=" * 70)
+
+
+# Process-wide registry used by create_square_client()
+METRICS = ApiMetrics(measure_bytes=os.getenv('SQUARE_METRICS_BYTES', '1') != '0')
+
+
+def start_stage(name):
+    """Mark the start of a pipeline stage in the process-wide metrics"""
+    METRICS.start_stage(name)
+
+
+def stage(name):
+    """Context manager for a pipeline stage in the process-wide metrics"""
+    return METRICS.stage(name)
+
+
+def _status_code(error):
+    return getattr(error, 'status_code', None) or 0
+
+
+class _InstrumentedPager:
+    """Wraps an SDK/fake pager so fetching each further page is recorded"""
+
+    def __init__(self, pager, endpoint, instrumented):
+        self._pager = pager
+        self._endpoint = endpoint
+        self._instrumented = instrumented
+        self.items = pager.items
+        self.has_next = pager.has_next
+        self.response = getattr(pager, 'response', None)
+
+    def next_page(self):
+        page = self._instrumented._invoke(self._endpoint, self._pager.next_page, (), {})
+        return _InstrumentedPager(page, self._endpoint, self._instrumented) if page is not None else None
+
+    def iter_pages(self):
+        page = self
+        while page is not None:
+            yield page
+            if not page.has_next:
+                return
+            page = page.next_page()
+            if page is not None and not page.items:
+                return
+
+    def __iter__(self):
+        for page in self.iter_pages():
+            yield from page.items or []
+
+
+class InstrumentedClient:
+    """
+    Transparent proxy around a Square (or FakeSquare) client.
+
+    Attribute chains are followed (client.catalog.images.create) and every
+    method call is timed and recorded under its dotted endpoint name.
+
+    Args:
+        client: Square client to wrap
+        metrics: ApiMetrics registry (default: process-wide METRICS)
+        max_retries: Retries for 429/5xx responses with exponential backoff
+        backoff: Initial backoff in seconds (doubles per retry)
+    """
+
+    _PLAIN_TYPES = (str, bytes, int, float, bool, dict, list, tuple, set, type(None))
+
+    def __init__(self, client, metrics=None, max_retries=0, backoff=0.5, _prefix=''):
+        object.__setattr__(self, 'wrapped', client)
+        object.__setattr__(self, 'metrics', metrics or METRICS)
+        object.__setattr__(self, 'max_retries', max_retries)
+        object.__setattr__(self, 'backoff', backoff)
+        object.__setattr__(self, '_prefix', _prefix)
+
+    def __getattr__(self, name):
+        attr = getattr(self.wrapped, name)
+        if name.startswith('_') or isinstance(attr, self._PLAIN_TYPES) or isinstance(attr, type):
+            return attr
+
+        endpoint = f"{self._prefix}{name}"
+        if callable(attr):
+            def call(*args, **kwargs):
+                return self._invoke(endpoint, attr, args, kwargs)
+            call.__name__ = name
+            call.__doc__ = getattr(attr, '__doc__', None)
+            return call
+
+        return InstrumentedClient(attr, self.metrics, self.max_retries, self.backoff, _prefix=f"{endpoint}.")
+
+    def _invoke(self, endpoint, func, args, kwargs):
+        metrics = self.metrics
+        request_bytes = _payload_size(kwargs) if metrics.measure_bytes and kwargs else 0
+        attempt = 0
+
+        while True:
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                status = _status_code(e)
+                metrics.record(endpoint, time.perf_counter() - start, request_bytes, 0, status or 'exception')
+                if status in RETRYABLE_STATUSES and attempt < self.max_retries:
+                    attempt += 1
+                    metrics.record_retry(endpoint)
+                    time.sleep(self.backoff * (2 ** (attempt - 1)))
+                    continue
+                raise
+
+            latency = time.perf_counter() - start
+            if callable(getattr(result, 'iter_pages', None)):
+                response_bytes = sum(_payload_size(i) for i in result.items or []) if metrics.measure_bytes else 0
+                metrics.record(endpoint, latency, request_bytes, response_bytes)
+                return _InstrumentedPager(result, endpoint, self)
+
+            response_bytes = _payload_size(result) if metrics.measure_bytes else 0
+            metrics.record(endpoint, latency, request_bytes, response_bytes)
+            return result
+
+
+_exit_hook_installed = False
+
+
+def install_exit_summary(metrics=None):
+    """
+    Print the API summary when the process exits, and dump it to the files
+    named by SQUARE_METRICS_JSON / SQUARE_METRICS_PROM if set.
+    """
+    global _exit_hook_installed
+    if _exit_hook_installed:
+        return
+    _exit_hook_installed = True
+    metrics = metrics or METRICS
+
+    def report():
+        if not metrics.total_calls():
+            return
+        metrics.end_stage()
+        if os.getenv('SQUARE_METRICS_SUMMARY', '1') != '0':
+            metrics.print_summary()
+        if os.getenv('SQUARE_METRICS_JSON'):
+            metrics.to_json(os.getenv('SQUARE_METRICS_JSON'))
+        if os.getenv('SQUARE_METRICS_PROM'):
+            metrics.to_prometheus(os.getenv('SQUARE_METRICS_PROM'))
+
+    import atexit
+    atexit.register(report)
@@ -1,13 +1,19 @@
 """
 Purpose: Production-safe catalog utilities with duplicate prevention
-Related: create_categories.py, create_menu_items.py
+Related: create_categories.py, create_menu_items.py, duplicate_utils.py (duplicate indexes)
 Refactor if: >500 lines OR handling unrelated catalog operations
 
 CRITICAL: These utilities prevent duplicates in production
 """
 
-from collections import defaultdict
-from square import Square
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from square import Square  # Annotations only - the SDK is imported by client_utils
 
 def get_existing_catalog_items(client: Square, item_type='ITEM'):
     """
@@ -84,14 +90,14 @@ def create_or_update_category(client: Square, category_name, description, idempo
         idempotency_key: Unique key for this operation
 
     Returns:
-        tuple: (category_id, was_created)
+        tuple: (category_id, was_created, version)
     """
     # Check if category already exists
     existing = get_existing_catalog_items(client, 'CATEGORY')
 
     if category_name in existing:
         print(f"   ⚠️  Category '{category_name}' already exists (ID: {existing[category_name].id})")
-        return (existing[category_name].id, False)
+        return (existing[category_name].id, False, existing[category_name].version)
 
     # Create new category
     import uuid
@@ -115,14 +121,14 @@ def create_or_update_category(client: Square, category_name, description, idempo
         raise Exception(f"Failed to create category: {response.errors[0].detail}")
 
     if hasattr(response, 'objects') and response.objects:
-        return (response.objects[0].id, True)
+        return (response.objects[0].id, True, response.objects[0].version)
 
     raise Exception("Unexpected response from catalog API")
 
 
 def create_or_update_item(client: Square, item_name, category_id, description,
                           price_cents, variation_name='Regular',
-                          image_url=None, idempotency_key=None):
+                          image_url=None, idempotency_key=None, variations=None):
     """
     Create menu item only if it doesn't exist, otherwise return existing.
 
@@ -135,6 +141,8 @@ def create_or_update_item(client: Square, item_name, category_id, description,
         variation_name: Name for the price variation
         image_url: Optional image URL
         idempotency_key: Unique key for this operation
+        variations: Optional list of {'name', 'price_cents'} for multi-variation
+                    items (sizes, per-person tiers); overrides price_cents/variation_name
 
     Returns:
         tuple: (item_id, was_created)
@@ -146,85 +154,256 @@ def create_or_update_item(client: Square, item_name, category_id, description,
         print(f"   ⚠️  Item '{item_name}' already exists (ID: {existing[item_name].id})")
         return (existing[item_name].id, False)
 
-    # Create new item
+    # Create new item (all variations go in the same upsert as the item)
     import uuid
 
     if not idempotency_key:
         idempotency_key = str(uuid.uuid4())
 
-    item_id = f"#{uuid.uuid4().hex[:16]}"
-    variation_id = f"#{uuid.uuid4().hex[:16]}"
+    if not variations:
+        variations = [{'name': variation_name, 'price_cents': price_cents}]
+
+    item_obj = build_item_object(item_name, category_id, description, variations)
+
+    if image_url:
+        item_obj['item_data']['image_urls'] = [image_url]
+
+    response = client.catalog.batch_upsert(
+        idempotency_key=idempotency_key,
+        batches=[{
+            'objects': [item_obj]
+        }]
+    )
+
+    if hasattr(response, 'errors') and response.errors:
+        raise Exception(f"Failed to create item: {response.errors[0].detail}")
+
+    if hasattr(response, 'objects') and response.objects:
+        return (response.objects[0].id, True)
+
+    raise Exception("Unexpected response from catalog API")
 
-    item_obj = {
+
+def build_item_object(item_name, category_id, description, variations):
+    """
+    Build an ITEM upsert object with all of its variations nested.
+
+    Args:
+        item_name: Name of the item
+        category_id: Square category ID
+        description: Item description
+        variations: List of {'name', 'price_cents'}
+
+    Returns:
+        dict: Catalog object with temporary (#) IDs
+    """
+    import uuid
+
+    return {
         'type': 'ITEM',
-        'id': item_id,
+        'id': f"#{uuid.uuid4().hex[:16]}",
         'item_data': {
             'name': item_name,
             'description': description[:500] if description else '',
             'category_id': category_id,
             'variations': [{
                 'type': 'ITEM_VARIATION',
-                'id': variation_id,
+                'id': f"#{uuid.uuid4().hex[:16]}",
                 'item_variation_data': {
-                    'name': variation_name,
+                    'name': variation['name'],
                     'pricing_type': 'FIXED_PRICING',
                     'price_money': {
-                        'amount': price_cents,
+                        'amount': variation['price_cents'],
                         'currency': 'USD'
                     }
                 }
-            }]
+            } for variation in variations]
         }
     }
 
-    if image_url:
-        item_obj['item_data']['image_urls'] = [image_url]
 
-    response = client.catalog.batch_upsert(
-        idempotency_key=idempotency_key,
-        batches=[{
-            'objects': [item_obj]
-        }]
-    )
+def extract_item_variations(item):
+    """
+    Extract variation IDs, names, prices and versions from a catalog ITEM.
 
-    if hasattr(response, 'errors') and response.errors:
-        raise Exception(f"Failed to create item: {response.errors[0].detail}")
+    Args:
+        item: Square catalog object of type ITEM
 
-    if hasattr(response, 'objects') and response.objects:
-        return (response.objects[0].id, True)
+    Returns:
+        list: Dicts with square_id, name, price_cents, version
+    """
+    variations = []
+    item_data = getattr(item, 'item_data', None)
+
+    for var in (getattr(item_data, 'variations', None) or []):
+        var_data = var.item_variation_data
+        price_money = getattr(var_data, 'price_money', None)
+        variations.append({
+            'square_id': var.id,
+            'name': var_data.name,
+            'price_cents': price_money.amount if price_money else None,
+            'version': getattr(var, 'version', None)
+        })
+
+    return variations
+
+
+# Square batch_upsert limits: objects per batch and total objects per request
+MAX_OBJECTS_PER_BATCH = 1000
+MAX_OBJECTS_PER_UPSERT = 10000
+
+# Square batch_delete limit: object IDs per request
+MAX_DELETE_IDS = 200
+
+
+def _chunk_upsert_objects(objects):
+    """Split objects into requests of batches within Square's upsert limits"""
+    requests, batches, batch = [], [], []
+    batch_size = request_size = 0
+
+    for obj in objects:
+        # Nested variations and modifiers count towards the limits
+        size = (1 + len(obj.get('item_data', {}).get('variations', []))
+                + len(obj.get('modifier_list_data', {}).get('modifiers', [])))
+
+        if batch and batch_size + size > MAX_OBJECTS_PER_BATCH:
+            batches.append({'objects': batch})
+            batch, batch_size = [], 0
+        if request_size + size > MAX_OBJECTS_PER_UPSERT and (batches or batch):
+            if batch:
+                batches.append({'objects': batch})
+                batch, batch_size = [], 0
+            requests.append(batches)
+            batches, request_size = [], 0
+
+        batch.append(obj)
+        batch_size += size
+        request_size += size
+
+    if batch:
+        batches.append({'objects': batch})
+    if batches:
+        requests.append(batches)
+
+    return requests
+
+
+def replace_ids(value, mapping):
+    """Replace every string in `mapping` (object IDs) anywhere in a JSON value"""
+    if isinstance(value, dict):
+        return {k: replace_ids(v, mapping) for k, v in value.items()}
+    if isinstance(value, list):
+        return [replace_ids(v, mapping) for v in value]
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    return value
+
+
+def batch_create_items(client: Square, items):
+    """
+    Create many items, each with all of its variations, in as few
+    batch_upsert calls as Square allows.
 
-    raise Exception("Unexpected response from catalog API")
+    Args:
+        client: Square API client
+        items: List of dicts with name, category_id, description and
+               variations ([{'name', 'price_cents'}])
+
+    Returns:
+        dict: {item_name: created catalog object}
+    """
+    import uuid
+
+    objects = [
+        build_item_object(item['name'], item.get('category_id'), item.get('description'),
+                          item['variations'])
+        for item in items
+    ]
+
+    created = {}
+
+    for batches in _chunk_upsert_objects(objects):
+        response = client.catalog.batch_upsert(
+            idempotency_key=str(uuid.uuid4()),
+            batches=batches
+        )
+
+        if hasattr(response, 'errors') and response.errors:
+            raise Exception(f"Failed to create items: {response.errors[0].detail}")
+
+        for obj in (getattr(response, 'objects', None) or []):
+            if obj.type == 'ITEM':
+                created[obj.item_data.name] = obj
 
+    return created
 
-def check_for_duplicates(client: Square):
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_name(name):
     """
-    Check catalog for duplicate items or categories.
+    Normalize a catalog name for matching.
 
-    Returns:
-        dict: {'items': {name: [ids]}, 'categories': {name: [ids]}}
+    Case, accents, punctuation and repeated whitespace are ignored, and
+    '&' matches 'and': 'Mixed Nuts & Trail-Mix ' -> 'mixed nuts and trail mix'.
     """
-    duplicates = {'items': {}, 'categories': {}}
+    if not name:
+        return ''
+    text = name.casefold()
+    if not text.isascii():
+        text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return ' '.join(_NON_WORD.sub(' ', text.replace('&', ' and ')).split())
 
-    # Check items
-    items_response = client.catalog.search_items()
-    if hasattr(items_response, 'items') and items_response.items:
-        item_ids = [item.id for item in items_response.items]
-        details = client.catalog.batch_get(object_ids=item_ids)
 
-        if hasattr(details, 'objects') and details.objects:
-            items_by_name = defaultdict(list)
-            for obj in details.objects:
-                items_by_name[obj.item_data.name].append(obj.id)
+def _get(value, key):
+    """Field of an API dict or SDK model"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return value.get(key)
+    return getattr(value, key, None)
 
-            duplicates['items'] = {name: ids for name, ids in items_by_name.items() if len(ids) > 1}
 
-    # Check categories
-    categories_response = client.catalog.list(types='CATEGORY')
-    if hasattr(categories_response, 'objects') and categories_response.objects:
-        cats_by_name = defaultdict(list)
-        for obj in categories_response.objects:
-            cats_by_name[obj.category_data.name].append(obj.id)
+def iter_catalog_objects(client: Square, types=None, page_size=1000):
+    """
+    Stream every catalog object, one catalog.search page at a time.
+
+    Args:
+        client: Square API client
+        types: Optional object types (e.g. ['ITEM', 'CATEGORY'])
+        page_size: Objects per call (Square maximum: 1000)
+
+    Yields:
+        Catalog objects as returned by the client (SDK models or dicts)
+    """
+    cursor = None
+    while True:
+        kwargs = {'cursor': cursor, 'limit': page_size}
+        if types:
+            kwargs['object_types'] = list(types)
+        response = client.catalog.search(**kwargs)
+        yield from response.objects or []
+        cursor = response.cursor
+        if not cursor:
+            return
+
+
+def check_for_duplicates(client: Square, snapshot=None):
+    """
+    Check catalog for duplicate items or categories.
+
+    Args:
+        client: Square API client
+        snapshot: Optional CatalogSnapshot - checked locally without API calls
+
+    Returns:
+        dict: {'items': {name: [ids]}, 'categories': {name: [ids]}}
+    """
+    from duplicate_utils import find_duplicates
 
-        duplicates['categories'] = {name: ids for name, ids in cats_by_name.items() if len(ids) > 1}
+    if snapshot is not None:
+        return find_duplicates(snapshot.objects.values())
 
-    return duplicates
+    # Every page, in one pass
+    return find_duplicates(iter_catalog_objects(client, types=('ITEM', 'CATEGORY')))
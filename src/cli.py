@@ -0,0 +1,215 @@
+"""
+Purpose: Single `catering-square` command with subcommands and a shell/batch mode
+Related: cli_session.py (Session, subcommand handlers), scripts/, client_utils.py, db_utils.py
+Refactor if: >400 lines OR a subcommand needs more than a couple of flags
+
+Usage:
+    catering-square sync                  # create_catalog_with_images
+    catering-square sync --no-images      # create_catalog_safe
+    catering-square images | validate | dedupe [--check] | locations | links | summary
+    catering-square dedupe --policy tracked [--dry-run]   # survivors by policy, see dedupe_utils.py
+    catering-square plan [--json]         # dry-run diff, no API calls
+    catering-square snapshot [--full]     # refresh data/snapshots/<env>.jsonl.gz
+    catering-square snapshot --archive    # ...and keep a dated copy
+    catering-square diff OLD [NEW]        # snapshot paths or db:<env> (NEW default: db:<env>)
+    catering-square rollback SNAPSHOT [--apply]   # restore an archived snapshot
+    catering-square reconcile [--dry-run] # repair drift between the database and Square
+    catering-square prices RULES.json [--apply]   # rule-driven bulk price update
+    catering-square modifiers [--dry-run] # create BYO modifier lists and attach them
+    catering-square feed [--force]        # static menu feeds (gzip/brotli + ETag) from the database
+    catering-square api [--port 8080]     # read-only menu HTTP API from the database (Ctrl-C stops)
+    catering-square webhook [--port 8765] # sync once per burst of catalog.version.updated events
+    catering-square daemon --catalog 15m --images 1h   # scheduled syncs, see daemon_utils.py
+    catering-square --env production validate
+    catering-square batch commands.txt    # one subcommand per line ('-' = stdin)
+    catering-square shell                 # interactive
+
+Every subcommand run in one process shares a single Square client (one
+HTTP connection pool), a read-through catalog cache that is cleared by
+any write, and one SQLite connection.
+"""
+
+import sys
+import shlex
+import argparse
+
+from cli_session import Session
+
+
+def build_parser(session_mode=False):
+    """Argument parser for one subcommand line (session_mode drops shell/batch)"""
+    parser = argparse.ArgumentParser(prog='catering-square', description="Square catering catalog tools")
+    if not session_mode:
+        parser.add_argument('--env', choices=['sandbox', 'production'], help="Override SQUARE_ENVIRONMENT")
+    sub = parser.add_subparsers(dest='command')
+
+    sync = sub.add_parser('sync', help="Create/refresh categories, items and images")
+    sync.add_argument('--no-images', action='store_true', help="Skip images (create_catalog_safe)")
+    sync.set_defaults(handler=Session.cmd_sync)
+
+    sub.add_parser('images', help="Upload and attach images for tracked items").set_defaults(
+        handler=Session.cmd_images)
+
+    dedupe = sub.add_parser('dedupe', help="Remove duplicate items and categories")
+    dedupe.add_argument('--check', action='store_true', help="Only report duplicates (all object types)")
+    dedupe.add_argument('--snapshot', action='store_true', help="With --check: use the local snapshot")
+    dedupe.add_argument('--policy', default='newest', help="Which copy to keep (see dedupe_utils.SURVIVOR_POLICIES)")
+    dedupe.add_argument('--type', help="Only one object type (CATEGORY or ITEM unless --check)")
+    dedupe.add_argument('--dry-run', action='store_true', help="Show survivors and deletions only")
+    dedupe.add_argument('--disk', action='store_true', help="Index on disk (flat memory for huge catalogs)")
+    dedupe.set_defaults(handler=Session.cmd_dedupe)
+
+    for command, help_text in (('validate', "Validate catalog structure"),
+                               ('locations', "List Square locations"),
+                               ('links', "Create payment links for tracked items")):
+        sub.add_parser(command, help=help_text).set_defaults(handler=Session.cmd_script)
+
+    plan = sub.add_parser('plan', help="Dry run: show what sync would create/update/delete (no API calls)")
+    plan.add_argument('--config', help="Menu config JSON (default: data/menu_config.json)")
+    plan.add_argument('--menu', help="Source menu feed (default: MENU_JSON_PATH)")
+    plan.add_argument('--catalog', help="Saved catalog JSON instead of the local database")
+    plan.add_argument('--json', action='store_true', help="Print the plan as JSON")
+    plan.set_defaults(handler=Session.cmd_plan)
+
+    snapshot = sub.add_parser('snapshot', help="Refresh the local catalog snapshot (delta sync)")
+    snapshot.add_argument('--full', action='store_true', help="Download the whole catalog again")
+    snapshot.add_argument('--archive', action='store_true', help="Also keep a dated copy for later diffs")
+    snapshot.set_defaults(handler=Session.cmd_snapshot)
+
+    diff = sub.add_parser('diff', help="Diff two catalog snapshots, or a snapshot against the database")
+    diff.add_argument('old', help="Snapshot path or db:<environment>")
+    diff.add_argument('new', nargs='?', help="Snapshot path or db:<environment> (default: db:<env>)")
+    diff.add_argument('--type', help="Only show one object type (e.g. ITEM)")
+    diff.add_argument('--json', action='store_true', help="Print the full diff as JSON")
+    diff.set_defaults(handler=Session.cmd_diff)
+
+    for command, help_text, source, source_help in (
+            ('rollback', "Restore the catalog to a saved snapshot (dry run by default)",
+             'snapshot', "Snapshot file to restore (see snapshot --archive)"),
+            ('prices', "Bulk price update from a rule set (dry run by default)",
+             'rules', "Rule set JSON (see data/price_rules.example.json)")):
+        planned = sub.add_parser(command, help=help_text)
+        planned.add_argument(source, help=source_help)
+        planned.add_argument('--apply', action='store_true', help="Send the changes")
+        planned.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+        planned.add_argument('--json', action='store_true', help="Print the plan as JSON")
+        planned.set_defaults(handler=getattr(Session, f'cmd_{command}'))
+
+    modifiers = sub.add_parser('modifiers', help="Create the menu_config.json modifier lists and attach them")
+    modifiers.add_argument('--dry-run', action='store_true', help="Only show what would change")
+    modifiers.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+    modifiers.set_defaults(handler=Session.cmd_modifiers)
+
+    feed = sub.add_parser('feed', help="Write the static menu feeds if the database changed (no API calls)")
+    feed.add_argument('--force', action='store_true', help="Rebuild even if nothing changed")
+    feed.set_defaults(handler=Session.cmd_feed)
+
+    reconcile = sub.add_parser('reconcile', help="Repair drift between the database and the live catalog")
+    reconcile.add_argument('--dry-run', action='store_true', help="Report drift without repairing it")
+    reconcile.add_argument('--snapshot', action='store_true', help="Use the delta-refreshed local snapshot")
+    reconcile.add_argument('--json', action='store_true', help="Print the stats as JSON")
+    reconcile.set_defaults(handler=Session.cmd_reconcile)
+
+    # Options parsed by the handler with the module's own argument set ('+': '-' options are not ours)
+    for command, help_text in (
+            ('api', "Serve the menu read-only over HTTP from the database (no API calls)"),
+            ('webhook', "Receive catalog webhooks and sync once per burst (Ctrl-C stops)"),
+            ('daemon', "Run catalog/image/location syncs on schedules (Ctrl-C drains)")):
+        delegated = sub.add_parser(command, help=help_text, add_help=False, prefix_chars='+')
+        delegated.add_argument('options', nargs=argparse.REMAINDER, help="See catering-square COMMAND --help")
+        delegated.set_defaults(handler=getattr(Session, f'cmd_{command}'))
+
+    summary = sub.add_parser('summary', help="Show the local database summary (no API calls)")
+    summary.add_argument('environment', nargs='?', help="Limit to one environment")
+    summary.set_defaults(handler=Session.cmd_summary)
+
+    if not session_mode:
+        batch = sub.add_parser('batch', help="Run subcommands from a file, one per line ('-' = stdin)")
+        batch.add_argument('file')
+        batch.add_argument('--keep-going', action='store_true', help="Continue after a failing line")
+        sub.add_parser('shell', help="Interactive shell sharing one client, cache and DB connection")
+
+    return parser
+
+
+def execute(session, argv):
+    """Parse and run one subcommand line in a session"""
+    args = build_parser(session_mode=True).parse_args(argv)
+    if not args.command:
+        return None
+
+    from api_metrics import stage
+
+    with stage(args.command):
+        return args.handler(session, args)
+
+
+def run_lines(session, lines, keep_going=False):
+    """Run subcommand lines in one session; returns the number of failures"""
+    failures = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        print(f"\n▶ {line}")
+        try:
+            execute(session, shlex.split(line))
+        except SystemExit as e:
+            # argparse errors/--help and scripts that call exit()
+            if e.code:
+                failures += 1
+        except Exception as e:
+            print(f"❌ {line}: {e}")
+            failures += 1
+
+        if failures and not keep_going:
+            break
+    return failures
+
+
+def shell(session):
+    """Read-eval loop over subcommands until 'exit', 'quit' or EOF"""
+    print("catering-square shell - type 'help' for commands, 'exit' to quit")
+    while True:
+        try:
+            line = input(f"[{session.environment}]> ")
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return 0
+
+        if line.strip() in ('exit', 'quit'):
+            return 0
+        if line.strip() == 'help':
+            build_parser(session_mode=True).print_help()
+            continue
+        run_lines(session, [line], keep_going=True)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.command:
+        build_parser().print_help()
+        return 1
+
+    with Session(args.env) as session:
+        if args.command == 'shell':
+            return shell(session)
+
+        if args.command == 'batch':
+            if args.file == '-':
+                lines = sys.stdin.readlines()
+            else:
+                with open(args.file) as f:
+                    lines = f.readlines()
+            return 1 if run_lines(session, lines, args.keep_going) else 0
+
+        from api_metrics import stage
+
+        with stage(args.command):
+            args.handler(session, args)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
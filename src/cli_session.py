@@ -0,0 +1,236 @@
+"""
+Purpose: Session of the `catering-square` command: shared client/DB state and the subcommand handlers
+Related: cli.py (parser, batch/shell modes), scripts/ (loaded on demand), client_utils.py, db_utils.py
+Refactor if: >400 lines OR a handler needs more than a call into its module
+
+Handlers (Session.cmd_<subcommand>) import their module on first use,
+so parsing a command line never loads the Square SDK or NumPy.
+api/webhook/daemon parse their own options with the argument set their
+module declares (parse_options).
+"""
+
+import os
+import sys
+import argparse
+import importlib.util
+from contextlib import ExitStack
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / 'scripts'
+
+# Subcommand -> (script under scripts/, entry function)
+SCRIPT_COMMANDS = {
+    'sync': ('catalog/create_catalog_with_images.py', 'create_catalog_with_images'),
+    'sync-safe': ('catalog/create_catalog_safe.py', 'create_catalog_safe'),
+    'validate': ('catalog/validate_poc.py', 'validate_poc'),
+    'locations': ('auth/list_locations.py', 'list_locations'),
+    'links': ('catalog/create_payment_links.py', 'create_payment_links'),
+}
+
+
+class Session:
+    """
+    State shared by every subcommand run in one process.
+
+    The Square client and the shared DB connection are created on first
+    use, so local-only commands (summary) never import the SDK.
+    """
+
+    def __init__(self, environment=None):
+        if environment:
+            os.environ['SQUARE_ENVIRONMENT'] = environment
+        self._stack = ExitStack()
+        self._client = None
+        self._scripts = {}
+        self.snapshot = None  # Set by the snapshot subcommand, reused by dedupe --check --snapshot
+
+    @property
+    def environment(self):
+        from env_utils import get_environment
+        return get_environment()
+
+    @property
+    def client(self):
+        """Shared caching Square client, also returned by create_square_client()"""
+        if self._client is None:
+            from client_utils import CachingClient, create_square_client, use_client
+
+            self._client = CachingClient(create_square_client(self.environment))
+            self._stack.enter_context(use_client(self._client))
+        return self._client
+
+    def open(self):
+        from db_utils import shared_connection
+
+        self._stack.enter_context(shared_connection())
+        return self
+
+    def close(self):
+        if self._client is not None and (self._client.hits or self._client.misses):
+            # stderr: the last thing printed, after any --json output
+            print(f"🗄️  Catalog cache: {self._client.hits} hits, {self._client.misses} misses", file=sys.stderr)
+        self._stack.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load_script(self, relative_path):
+        """Import a script once per session (scripts/ is not a package)"""
+        if relative_path not in self._scripts:
+            path = SCRIPTS_DIR / relative_path
+            spec = importlib.util.spec_from_file_location(f"cli_{path.stem}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._scripts[relative_path] = module
+        return self._scripts[relative_path]
+
+    def run_script(self, command):
+        relative_path, function_name = SCRIPT_COMMANDS[command]
+        self.client  # Install the shared client before the script builds its own
+        return getattr(self.load_script(relative_path), function_name)()
+
+    # ----- subcommands -----------------------------------------------------
+
+    def cmd_sync(self, args):
+        return self.run_script('sync-safe' if args.no_images else 'sync')
+
+    def cmd_images(self, args):
+        from image_utils import sync_item_images
+        from menu_utils import load_menu_data
+
+        processed = sync_item_images(self.client, self.environment, load_menu_data()['menu_items'])
+        print(f"\n✅ Images processed: {processed}")
+        return processed
+
+    def cmd_dedupe(self, args):
+        if not args.check:
+            from dedupe_utils import SURVIVOR_POLICIES, dedupe
+
+            if args.policy not in SURVIVOR_POLICIES:
+                print(f"❌ --policy must be one of: {', '.join(SURVIVOR_POLICIES)}")
+                return None
+            if args.type not in (None, 'CATEGORY', 'ITEM'):
+                print(f"❌ Only CATEGORY and ITEM duplicates can be cleaned up (got {args.type})")
+                return None
+            self.snapshot = None  # Refreshed (and changed) by the cleanup
+            types = (args.type,) if args.type else ('CATEGORY', 'ITEM')
+            return dedupe(self.client, self.environment, args.policy, types, apply=not args.dry_run,
+                          disk=args.disk)
+
+        from duplicate_utils import report_duplicates
+
+        # Every object type (variations, images, ...), normalized names
+        types = (args.type,) if args.type else None
+        if args.snapshot:
+            from snapshot_utils import sync_snapshot
+            objects = (self.snapshot or sync_snapshot(self.client, self.environment)).objects.values()
+        else:
+            from catalog_utils import iter_catalog_objects
+            objects = iter_catalog_objects(self.client, types)
+        return report_duplicates(objects, types, disk=args.disk)
+
+    def cmd_plan(self, args):
+        from plan_utils import build_plan, print_plan
+
+        plan = build_plan(self.environment, args.config, args.menu, args.catalog)
+        if args.json:
+            import json
+            print(json.dumps(plan, indent=2))
+        else:
+            print_plan(plan)
+        return plan
+
+    def cmd_snapshot(self, args):
+        from snapshot_utils import sync_snapshot
+
+        self.snapshot = sync_snapshot(self.client, self.environment, full=args.full, archive=args.archive)
+        return self.snapshot
+
+    def cmd_diff(self, args):
+        from diff_utils import diff_sources, print_diff
+
+        result = diff_sources(args.old, args.new or f"db:{self.environment}")
+        if args.json:
+            import json
+            print(json.dumps(result, indent=2))
+        else:
+            print_diff(result, args.type)
+        return result
+
+    def cmd_rollback(self, args):
+        from rollback_utils import rollback
+
+        self.snapshot = None  # The live snapshot is refreshed (and changed) by the rollback
+        try:
+            plan = rollback(self.client, self.environment, args.snapshot,
+                            apply=args.apply, confirm=not args.yes, as_json=args.json)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return None
+        return plan
+
+    def cmd_reconcile(self, args):
+        from reconcile_utils import reconcile
+
+        return reconcile(self.client, self.environment, dry_run=args.dry_run,
+                         snapshot=args.snapshot, as_json=args.json)
+
+    @staticmethod
+    def parse_options(args, add_arguments):
+        """Options of a long-running subcommand, declared by its module (imported only to run it)"""
+        parser = argparse.ArgumentParser(prog=f"catering-square {args.command}")
+        add_arguments(parser)
+        return parser.parse_args(args.options)
+
+    def cmd_webhook(self, args):
+        from webhook_utils import add_server_arguments, serve
+
+        args = self.parse_options(args, add_server_arguments)
+        return serve(self.client, self.environment, args.host, args.port,
+                     quiet=args.quiet, max_wait=args.max_wait)
+
+    def cmd_daemon(self, args):
+        from daemon_utils import JOBS, add_schedule_arguments, confirm_production, run_daemon
+
+        args = self.parse_options(args, add_schedule_arguments)
+        if not confirm_production(self.environment, args):
+            return None
+        return run_daemon(self, {name: getattr(args, name) for name in JOBS},
+                          jitter=args.jitter, duration=args.duration)
+
+    def cmd_prices(self, args):
+        from price_utils import update_prices
+
+        self.snapshot = None  # Refreshed (and changed) by the update
+        return update_prices(self.client, self.environment, args.rules,
+                             apply=args.apply, confirm=not args.yes, as_json=args.json)
+
+    def cmd_modifiers(self, args):
+        from modifier_utils import sync_modifier_lists
+
+        self.snapshot = None  # Refreshed (and changed) by the sync
+        return sync_modifier_lists(self.client, self.environment, dry_run=args.dry_run, confirm=not args.yes)
+
+    def cmd_feed(self, args):
+        from feed_utils import generate_feeds, print_feed_stats
+
+        stats = generate_feeds(self.environment, force=args.force)
+        print_feed_stats(self.environment, stats)
+        return stats
+
+    def cmd_api(self, args):
+        from menu_api import add_server_arguments, serve
+
+        args = self.parse_options(args, add_server_arguments)
+        return serve(self.environment, args.host, args.port, args.check_interval, args.verbose)
+
+    def cmd_summary(self, args):
+        from db_utils import show_summary
+        show_summary(args.environment)
+
+    def cmd_script(self, args):
+        return self.run_script(args.command)
@@ -0,0 +1,175 @@
+"""
+Purpose: Single place to build the Square API client (real SDK or in-process fake)
+Related: env_utils.py, fake_square.py, all scripts that call Square
+Refactor if: >200 lines OR supporting more client backends
+
+Set SQUARE_CLIENT=fake to run any script offline against FakeSquare.
+Fake tuning (all optional):
+    SQUARE_FAKE_LATENCY_MS   - per-call latency in milliseconds
+    SQUARE_FAKE_ERROR_RATE   - probability of an injected HTTP 500
+    SQUARE_FAKE_429_RATE     - probability of an injected HTTP 429
+    SQUARE_FAKE_SEED_ITEMS   - seed the fake catalog with this many items
+    SQUARE_FAKE_STATE        - JSON file to load/save the fake catalog across runs
+
+Every client built here is wrapped in api_metrics.InstrumentedClient and a
+per-endpoint summary is printed at exit (SQUARE_METRICS_SUMMARY=0 hides it).
+    SQUARE_METRICS_JSON      - also write the metrics as JSON to this file
+    SQUARE_METRICS_PROM      - also write them in Prometheus text format
+    SQUARE_MAX_RETRIES       - retries for 429/5xx (default: 2 for the fake,
+                               0 for the SDK, which already retries internally)
+"""
+
+import os
+import atexit
+from contextlib import contextmanager
+
+# Client returned by create_square_client() while use_client() is active
+_active_client = None
+
+
+@contextmanager
+def use_client(client):
+    """
+    Make create_square_client() return this client inside the block.
+
+    Lets a benchmark or long-running process hand one pre-built client
+    to code that normally builds its own.
+    """
+    global _active_client
+    previous = _active_client
+    _active_client = client
+    try:
+        yield client
+    finally:
+        _active_client = previous
+
+
+def is_fake_client():
+    """Check if scripts should talk to the in-process fake instead of Square"""
+    from env_utils import load_env
+
+    load_env()  # SQUARE_CLIENT may only be set in .env
+    return os.getenv('SQUARE_CLIENT', '').lower() == 'fake'
+
+
+def create_fake_client():
+    """Build a FakeSquare configured from SQUARE_FAKE_* environment variables"""
+    from fake_square import FakeSquare
+
+    client = FakeSquare(
+        latency=float(os.getenv('SQUARE_FAKE_LATENCY_MS', '0')) / 1000.0,
+        error_rate=float(os.getenv('SQUARE_FAKE_ERROR_RATE', '0')),
+        rate_limit_rate=float(os.getenv('SQUARE_FAKE_429_RATE', '0')),
+        seed=int(os.getenv('SQUARE_FAKE_SEED', '0'))
+    )
+
+    state_path = os.getenv('SQUARE_FAKE_STATE')
+    if state_path and os.path.exists(state_path):
+        client.load_state(state_path)
+    elif os.getenv('SQUARE_FAKE_SEED_ITEMS'):
+        client.seed_catalog(int(os.getenv('SQUARE_FAKE_SEED_ITEMS')))
+
+    if state_path:
+        atexit.register(client.save_state, state_path)
+
+    return client
+
+
+def instrument_client(client, max_retries=0):
+    """Wrap a client so every call is recorded in api_metrics.METRICS"""
+    from api_metrics import InstrumentedClient, install_exit_summary
+
+    install_exit_summary()
+    max_retries = int(os.getenv('SQUARE_MAX_RETRIES', max_retries))
+    return InstrumentedClient(client, max_retries=max_retries)
+
+
+class CachingClient:
+    """
+    Read-through cache in front of a Square client for long-lived sessions.
+
+    Repeated catalog/location reads with the same arguments are answered
+    from memory; any other call (upserts, deletes, image uploads...) is
+    passed through and clears the whole cache, so reads never see state
+    older than this process's last write.
+    """
+
+    READ_ENDPOINTS = frozenset({
+        'catalog.search_items',
+        'catalog.batch_get',
+        'catalog.list',
+        'catalog.search',
+        'catalog.object.get',
+        'locations.list',
+        'merchants.list',
+    })
+
+    def __init__(self, client, _cache=None, _prefix=''):
+        object.__setattr__(self, 'wrapped', client)
+        object.__setattr__(self, '_cache', _cache if _cache is not None else {'entries': {}, 'hits': 0, 'misses': 0})
+        object.__setattr__(self, '_prefix', _prefix)
+
+    @property
+    def hits(self):
+        return self._cache['hits']
+
+    @property
+    def misses(self):
+        return self._cache['misses']
+
+    def clear(self):
+        self._cache['entries'].clear()
+
+    def __getattr__(self, name):
+        attr = getattr(self.wrapped, name)
+        if name.startswith('_') or isinstance(attr, (str, bytes, int, float, bool, dict, list, tuple, type(None))):
+            return attr
+
+        endpoint = f"{self._prefix}{name}"
+        if not callable(attr):
+            return CachingClient(attr, self._cache, _prefix=f"{endpoint}.")
+
+        def call(*args, **kwargs):
+            if endpoint not in self.READ_ENDPOINTS:
+                self.clear()
+                return attr(*args, **kwargs)
+
+            key = (endpoint, repr(args), repr(sorted(kwargs.items())))
+            entries = self._cache['entries']
+            if key in entries:
+                self._cache['hits'] += 1
+                return entries[key]
+            self._cache['misses'] += 1
+            entries[key] = result = attr(*args, **kwargs)
+            return result
+
+        call.__name__ = name
+        return call
+
+
+def create_square_client(environment_name=None):
+    """
+    Create a Square client for the given or active environment.
+
+    Args:
+        environment_name: 'sandbox' or 'production' (default: SQUARE_ENVIRONMENT)
+
+    Returns:
+        InstrumentedClient around square.Square (or FakeSquare when SQUARE_CLIENT=fake)
+    """
+    if _active_client is not None:
+        return _active_client
+
+    if is_fake_client():
+        return instrument_client(create_fake_client(), max_retries=2)
+
+    from square import Square
+    from square.client import SquareEnvironment
+    from env_utils import get_access_token, get_config
+
+    config = get_config(environment_name)
+    if not config.access_token:
+        get_access_token(config.environment)  # Raises ValueError naming the missing variable
+
+    environment = SquareEnvironment.PRODUCTION if config.environment == 'production' else SquareEnvironment.SANDBOX
+    return instrument_client(Square(token=config.access_token, environment=environment))
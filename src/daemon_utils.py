@@ -0,0 +1,314 @@
+"""
+Purpose: Long-running sync daemon: catalog, image, location and menu feed jobs on schedules with jitter
+Related: cli.py (Session: warm client/cache/DB connection), reconcile_utils.py, snapshot_utils.py
+Refactor if: >400 lines OR jobs need to run in parallel (they share one SQLite connection)
+
+One process keeps everything warm between runs: the Square client (HTTP
+connection pool), the session's SQLite connection, loaded scripts and the
+in-memory catalog snapshot (refreshed by delta). The read cache is cleared
+at the start of every run so no run sees another run's data.
+
+Scheduling and backpressure:
+
+    - each job runs every `interval` seconds ± jitter, measured from the end
+      of its previous run, so a slow run pushes the next one back
+    - runs happen one at a time on the main thread: a job can never overlap
+      itself (or another job), and nothing is queued while a run is going -
+      ticks missed meanwhile are dropped and counted as skipped
+    - SIGTERM or a first Ctrl-C stops taking new work; the running job
+      drains, then the daemon exits (a second Ctrl-C interrupts it)
+
+Usage:
+    python src/daemon_utils.py --catalog 15m --images 1h --locations 6h
+    catering-square daemon --catalog 5m --images off --jitter 0.2
+"""
+
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+# Default schedules (seconds); 'off' on the command line disables a job
+DEFAULT_INTERVALS = {
+    'locations': 6 * 3600,
+    'catalog': 15 * 60,
+    'images': 3600,
+    'feed': 60,  # Cheap when nothing changed: one SELECT of the change counter
+}
+DEFAULT_JITTER = 0.1  # ± fraction of the interval
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(text):
+    """'90', '90s', '15m', '6h', '1d' -> seconds; 'off'/'0' -> None"""
+    text = str(text).strip().lower()
+    if text in ('off', 'none', '0', ''):
+        return None
+    unit = DURATION_UNITS.get(text[-1])
+    try:
+        seconds = float(text[:-1]) * unit if unit else float(text)
+    except ValueError:
+        raise ValueError(f"Invalid duration: {text!r} (use e.g. 90s, 15m, 6h or off)")
+    if seconds <= 0:
+        return None
+    return seconds
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+# ----- jobs -------------------------------------------------------------------
+
+def sync_locations(session):
+    """Save every Square location to the database; returns the count"""
+    from db_utils import save_location
+
+    response = session.client.locations.list()
+    locations = getattr(response, 'locations', None) or []
+    for loc in locations:
+        address = getattr(loc, 'address', None)
+        save_location(session.environment, loc.id, loc.name,
+                      address=str(address) if address else None,
+                      phone=getattr(loc, 'phone_number', None))
+    return len(locations)
+
+
+def sync_catalog(session):
+    """Push the menu config (create_catalog_safe), then reconcile the database; returns rows changed"""
+    from reconcile_utils import drift_count, reconcile_objects
+    from snapshot_utils import sync_snapshot
+
+    session.run_script('sync-safe')
+    snapshot = sync_snapshot(session.client, session.environment)
+    return drift_count(reconcile_objects(session.environment, snapshot.objects.values()))
+
+
+def sync_images(session):
+    """Upload/attach images for tracked items; returns items with an image"""
+    from image_utils import sync_item_images
+    from menu_utils import load_menu_data
+
+    return sync_item_images(session.client, session.environment, load_menu_data()['menu_items'])
+
+
+def build_feeds(session):
+    """Regenerate the static menu feeds if the database changed; returns feeds written"""
+    from feed_utils import generate_feeds
+
+    return generate_feeds(session.environment)['written']
+
+
+# Job name -> function(session); runs at startup go in this order
+JOBS = {
+    'locations': sync_locations,
+    'catalog': sync_catalog,
+    'images': sync_images,
+    'feed': build_feeds,
+}
+
+
+@dataclass
+class Job:
+    """One scheduled job and its run statistics"""
+    name: str
+    run: Callable
+    interval: float
+    jitter: float = DEFAULT_JITTER
+    next_at: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_seconds: float = 0.0
+    total_seconds: float = 0.0
+    last_error: str = None
+
+    def delay(self, rng):
+        return self.interval * (1 + rng.uniform(-self.jitter, self.jitter))
+
+
+class Scheduler:
+    """
+    Runs due jobs one at a time on the calling thread until stop().
+
+    Args:
+        session: cli.Session passed to every job (shared client/DB connection)
+        jobs: [Job] - every job runs once at startup, in list order
+        seed: Random seed for the jitter
+    """
+
+    def __init__(self, session, jobs, seed=None):
+        self.session = session
+        self.jobs = list(jobs)
+        self.rng = random.Random(seed)
+        self._stop = threading.Event()
+        now = time.monotonic()
+        for job in self.jobs:
+            job.next_at = now  # min() keeps list order on ties
+
+    @property
+    def stopping(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        """Take no new work; a running job finishes first"""
+        self._stop.set()
+
+    def run_job(self, job):
+        from api_metrics import stage
+
+        self.session.client.clear()  # Warm connections, fresh reads
+        started = time.monotonic()
+        try:
+            with stage(job.name):
+                result = job.run(self.session)
+            job.last_error = None
+            status = f"✅ {job.name} run #{job.runs + 1}" + ("" if result is None else f" → {result}")
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            status = f"❌ {job.name} run #{job.runs + 1} failed: {e}"
+        finished = time.monotonic()
+
+        job.runs += 1
+        job.last_seconds = finished - started
+        job.total_seconds += job.last_seconds
+
+        # Backpressure: ticks that passed while this job waited or ran are dropped, not queued
+        missed = int((finished - job.next_at) // job.interval)
+        job.skipped += missed
+        job.next_at = finished + job.delay(self.rng)
+
+        extra = f", {missed} tick(s) skipped" if missed else ""
+        print(f"{status} in {job.last_seconds:.2f}s{extra} (next in {format_duration(job.next_at - finished)})")
+
+    def run(self, duration=None):
+        """
+        Run until stop() (or `duration` seconds).
+
+        Returns:
+            list: The jobs, with their statistics
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self.stopping:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            job = min(self.jobs, key=lambda j: j.next_at)
+            wake_at = job.next_at if deadline is None else min(job.next_at, deadline)
+            if wake_at > now:
+                self._stop.wait(wake_at - now)
+                continue
+            self.run_job(job)
+        return self.jobs
+
+
+def print_stats(jobs):
+    print("-" * 70)
+    print(f"  {'job':<12}{'every':>9}{'runs':>7}{'failed':>8}{'skipped':>9}{'avg':>9}{'last':>9}")
+    for job in jobs:
+        average = job.total_seconds / job.runs if job.runs else 0.0
+        print(f"  {job.name:<12}{format_duration(job.interval):>9}{job.runs:>7}{job.failures:>8}"
+              f"{job.skipped:>9}{average:>8.2f}s{job.last_seconds:>8.2f}s")
+    print("-" * 70)
+
+
+def _install_signal_handlers(scheduler):
+    """SIGTERM / first Ctrl-C drain; a second Ctrl-C raises KeyboardInterrupt"""
+    def drain(signum, frame):
+        if scheduler.stopping and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        print("\n🛑 Stopping: no new runs, waiting for the current one to finish")
+        scheduler.stop()
+
+    previous = {sig: signal.signal(sig, drain) for sig in (signal.SIGINT, signal.SIGTERM)}
+    return lambda: [signal.signal(sig, handler) for sig, handler in previous.items()]
+
+
+def run_daemon(session, intervals=None, jitter=DEFAULT_JITTER, duration=None, seed=None):
+    """
+    Run the scheduled sync jobs in a session until stopped.
+
+    Args:
+        session: cli_session.Session (opened by the caller)
+        intervals: {job name: seconds or None (off)} (default: DEFAULT_INTERVALS)
+        jitter: ± fraction of each interval
+        duration: Stop after this many seconds (tests/benchmarks)
+
+    Returns:
+        list: Jobs with their run statistics
+    """
+    from snapshot_utils import warm_snapshots
+
+    intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+    jobs = [Job(name, JOBS[name], intervals[name], jitter) for name in JOBS if intervals.get(name)]
+    if not jobs:
+        print("❌ All jobs are off")
+        return []
+
+    scheduler = Scheduler(session, jobs, seed=seed)
+    print(f"🔁 Sync daemon for {session.environment.upper()}: "
+          + ', '.join(f"{job.name} every {format_duration(job.interval)}" for job in jobs)
+          + f" (±{jitter:.0%})")
+
+    restore = _install_signal_handlers(scheduler) if threading.current_thread() is threading.main_thread() else None
+    try:
+        with warm_snapshots():
+            scheduler.run(duration)
+    finally:
+        if restore:
+            restore()
+    print_stats(jobs)
+    return jobs
+
+
+def add_schedule_arguments(parser):
+    """--catalog/--images/--locations/--feed/--jitter/--duration/--yes, shared with cli.py"""
+    for name, seconds in DEFAULT_INTERVALS.items():
+        parser.add_argument(f'--{name}', type=parse_duration, default=seconds,
+                            help=f"Interval, e.g. 90s, 15m, 6h or off (default: {format_duration(seconds)})")
+    parser.add_argument('--jitter', type=float, default=DEFAULT_JITTER, help="± fraction of each interval")
+    parser.add_argument('--duration', type=parse_duration, help="Stop after this long (default: run until stopped)")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+
+
+def confirm_production(environment, args):
+    """Unattended catalog pushes to production need one confirmation (or --yes)"""
+    if environment != 'production' or args.yes or not args.catalog:
+        return True
+    response = input("⚠️  The daemon will push catalog changes to PRODUCTION unattended. Type 'yes' to continue: ")
+    if response.lower() != 'yes':
+        print("❌ Aborted.")
+        return False
+    return True
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run catalog, image and location syncs on schedules")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    add_schedule_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from cli_session import Session
+
+    with Session(args.environment) as session:
+        if not confirm_production(session.environment, args):
+            return 1
+        run_daemon(session, {name: getattr(args, name) for name in JOBS},
+                   jitter=args.jitter, duration=args.duration)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -1,6 +1,6 @@
 """
 Purpose: SQLite database utilities for tracking Square catalog IDs across environments
-Related: catalog_utils.py, create_catalog_safe.py
+Related: catalog_utils.py, create_catalog_safe.py, schema_utils.py (tables and migrations)
 Refactor if: >500 lines OR handling unrelated database operations
 
 This is the SINGLE SOURCE OF TRUTH for Square catalog ID tracking
@@ -8,19 +8,96 @@ This is the SINGLE SOURCE OF TRUTH for Square catalog ID tracking
 
 import sqlite3
 import os
+import sys
+from collections import Counter
 from datetime import datetime
 from contextlib import contextmanager
 from pathlib import Path
 
+from schema_utils import create_tables, get_schema_version, run_migrations
+
 # Get project root and set data paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DB_PATH = PROJECT_ROOT / 'data' / 'square_catalog.db'
 
+# Process-wide connection/commit counters (reported by benchmarks and run summaries)
+DB_STATS = Counter()
+
+
+class TrackedConnection(sqlite3.Connection):
+    """sqlite3 connection that counts commits in DB_STATS"""
+
+    def commit(self):
+        if self.in_transaction:
+            DB_STATS['commits'] += 1
+        super().commit()
+
+
+# Databases already brought to the current schema by this process
+_migrated_paths = set()
+
+
+def connect(check_same_thread=True):
+    """
+    Open a connection to the catalog database (check_same_thread=False: caller serializes use).
+
+    The first connection of the process to a database applies pending
+    migrations, so code never runs against an older schema; their progress
+    goes to stderr, which keeps --json output on stdout parseable. A
+    database without tables is left to init_database().
+    """
+    conn = sqlite3.connect(DB_PATH, factory=TrackedConnection, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row  # Return rows as dicts
+    DB_STATS['connections'] += 1
+
+    if DB_PATH not in _migrated_paths:
+        has_schema = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='menu_items'").fetchone()
+        if has_schema:
+            run_migrations(conn, file=sys.stderr)
+            _migrated_paths.add(DB_PATH)
+    return conn
+
+
+# Connection reused by get_db() while shared_connection() is active
+_shared_conn = None
+
+
+@contextmanager
+def shared_connection():
+    """
+    Reuse one connection for every get_db() inside the block.
+
+    Used by long-lived processes (the CLI shell/batch mode) so each save_*
+    call does not open and close its own connection. get_db() still
+    commits or rolls back per block.
+    """
+    global _shared_conn
+    if _shared_conn is not None:
+        yield _shared_conn
+        return
+
+    _shared_conn = connect()
+    try:
+        yield _shared_conn
+    finally:
+        _shared_conn.close()
+        _shared_conn = None
+
+
 @contextmanager
 def get_db():
     """Context manager for database connections"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return rows as dicts
+    if _shared_conn is not None:
+        try:
+            yield _shared_conn
+            _shared_conn.commit()
+        except Exception:
+            _shared_conn.rollback()
+            raise
+        return
+
+    conn = connect()
     try:
         yield conn
         conn.commit()
@@ -34,109 +111,14 @@ def get_db():
 def init_database():
     """Initialize SQLite database with schema"""
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect()
     try:
-        cursor = conn.cursor()
+        create_tables(conn)
 
-        # Locations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS locations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,  -- 'sandbox' or 'production'
-                square_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                store_number TEXT,
-                address TEXT,
-                phone TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(environment, square_id)
-            )
-        ''')
-
-        # Categories table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,
-                square_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(environment, square_id),
-                UNIQUE(environment, name)
-            )
-        ''')
-
-        # Images table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,
-                square_id TEXT NOT NULL,
-                source_url TEXT,
-                local_path TEXT,
-                downloaded_at TIMESTAMP,
-                uploaded_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(environment, square_id)
-            )
-        ''')
-
-        # Menu items table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS menu_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,
-                square_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                category_id INTEGER,
-                description TEXT,
-                price_cents INTEGER,
-                image_id INTEGER,
-                source_url TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(environment, square_id),
-                UNIQUE(environment, name),
-                FOREIGN KEY (category_id) REFERENCES categories(id),
-                FOREIGN KEY (image_id) REFERENCES images(id)
-            )
-        ''')
-
-        # Item variations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS item_variations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,
-                square_id TEXT NOT NULL,
-                item_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                price_cents INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(environment, square_id),
-                FOREIGN KEY (item_id) REFERENCES menu_items(id)
-            )
-        ''')
-
-        # Sync log table - track all operations
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sync_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                environment TEXT NOT NULL,
-                operation TEXT NOT NULL,  -- 'create', 'update', 'delete'
-                object_type TEXT NOT NULL,  -- 'location', 'category', 'item', 'image'
-                square_id TEXT,
-                status TEXT NOT NULL,  -- 'success', 'error'
-                error_message TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
-        print(f"✅ Database initialized: {DB_PATH}")
+        # Bring existing databases up to the current schema version
+        run_migrations(conn)
+        _migrated_paths.add(DB_PATH)
+        print(f"✅ Database initialized: {DB_PATH} (schema v{get_schema_version(conn)})")
     finally:
         conn.close()
 
@@ -164,19 +146,20 @@ def save_location(environment, square_id, name, store_number=None, address=None,
         ''', (environment, 'create', 'location', square_id, 'success', None))
 
 
-def save_category(environment, square_id, name, description=None):
+def save_category(environment, square_id, name, description=None, version=None):
     """Save or update category in database"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO categories (environment, square_id, name, description)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO categories (environment, square_id, name, description, square_version)
+            VALUES (?, ?, ?, ?, ?)
             ON CONFLICT(environment, square_id)
             DO UPDATE SET
                 name=excluded.name,
                 description=excluded.description,
+                square_version=COALESCE(excluded.square_version, square_version),
                 updated_at=CURRENT_TIMESTAMP
-        ''', (environment, square_id, name, description))
+        ''', (environment, square_id, name, description, version))
 
         cursor.execute('''
             INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
@@ -186,18 +169,23 @@ def save_category(environment, square_id, name, description=None):
         return cursor.lastrowid
 
 
-def save_image(environment, square_id, source_url=None, local_path=None):
+def save_image(environment, square_id, source_url=None, local_path=None,
+               content_hash=None, version=None):
     """Save image metadata in database"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO images (environment, square_id, source_url, local_path)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO images
+                (environment, square_id, source_url, local_path, content_hash, square_version,
+                 uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             ON CONFLICT(environment, square_id)
             DO UPDATE SET
                 source_url=excluded.source_url,
-                local_path=excluded.local_path
-        ''', (environment, square_id, source_url, local_path))
+                local_path=excluded.local_path,
+                content_hash=COALESCE(excluded.content_hash, content_hash),
+                square_version=COALESCE(excluded.square_version, square_version)
+        ''', (environment, square_id, source_url, local_path, content_hash, version))
 
         cursor.execute('''
             INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
@@ -208,8 +196,14 @@ def save_image(environment, square_id, source_url=None, local_path=None):
 
 
 def save_menu_item(environment, square_id, name, category_square_id, description=None,
-                   price_cents=None, image_square_id=None, source_url=None):
-    """Save or update menu item in database"""
+                   price_cents=None, image_square_id=None, source_url=None, version=None,
+                   content_hash=None):
+    """
+    Save or update menu item in database.
+
+    price_cents=None keeps the stored price: items priced only by their
+    variations have no item-level price to overwrite it with.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -237,18 +231,22 @@ def save_menu_item(environment, square_id, name, category_square_id, description
 
         cursor.execute('''
             INSERT INTO menu_items
-                (environment, square_id, name, category_id, description, price_cents, image_id, source_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                (environment, square_id, name, category_id, description, price_cents, image_id,
+                 source_url, square_version, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(environment, square_id)
             DO UPDATE SET
                 name=excluded.name,
                 category_id=excluded.category_id,
                 description=excluded.description,
-                price_cents=excluded.price_cents,
+                price_cents=COALESCE(excluded.price_cents, price_cents),
                 image_id=excluded.image_id,
                 source_url=excluded.source_url,
+                square_version=COALESCE(excluded.square_version, square_version),
+                content_hash=COALESCE(excluded.content_hash, content_hash),
                 updated_at=CURRENT_TIMESTAMP
-        ''', (environment, square_id, name, category_id, description, price_cents, image_id, source_url))
+        ''', (environment, square_id, name, category_id, description, price_cents, image_id,
+              source_url, version, content_hash))
 
         cursor.execute('''
             INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
@@ -256,6 +254,80 @@ def save_menu_item(environment, square_id, name, category_square_id, description
         ''', (environment, 'create', 'menu_item', square_id, 'success', None))
 
 
+def set_menu_item_image(environment, item_square_id, image_square_id, source_url=None, version=None):
+    """Point an existing menu item at an uploaded image (keeps all other fields)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE menu_items
+            SET image_id = (SELECT id FROM images WHERE environment=? AND square_id=?),
+                source_url = COALESCE(?, source_url),
+                square_version = COALESCE(?, square_version),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE environment=? AND square_id=?
+        ''', (environment, image_square_id, source_url, version, environment, item_square_id))
+        return cursor.rowcount > 0
+
+
+def save_item_variations(environment, item_square_id, variations):
+    """
+    Bulk save all variations of a menu item in one transaction.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        item_square_id: Square ID of the parent item (must already be saved)
+        variations: List of dicts with square_id, name, price_cents, version
+
+    Returns:
+        int: Number of variations saved
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id FROM menu_items WHERE environment=? AND square_id=?',
+            (environment, item_square_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return 0
+
+        cursor.executemany('''
+            INSERT INTO item_variations
+                (environment, square_id, item_id, name, price_cents, square_version, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(environment, square_id)
+            DO UPDATE SET
+                item_id=excluded.item_id,
+                name=excluded.name,
+                price_cents=excluded.price_cents,
+                square_version=COALESCE(excluded.square_version, square_version),
+                updated_at=CURRENT_TIMESTAMP
+        ''', [(environment, var['square_id'], row['id'], var['name'], var.get('price_cents'),
+               var.get('version')) for var in variations])
+
+        cursor.executemany('''
+            INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(environment, 'create', 'item_variation', var['square_id'], 'success', None)
+              for var in variations])
+
+        return len(variations)
+
+
+def get_item_variations(environment, item_name):
+    """Get all variations (Square ID, name, price) of a menu item by name"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT v.square_id, v.name, v.price_cents, v.square_version AS version
+            FROM item_variations v
+            JOIN menu_items m ON m.id = v.item_id
+            WHERE m.environment=? AND m.name=?
+            ORDER BY v.id
+        ''', (environment, item_name))
+        return [dict(row) for row in cursor.fetchall()]
+
+
 def get_category_by_name(environment, name):
     """Get category Square ID by name"""
     with get_db() as conn:
@@ -280,6 +352,30 @@ def get_item_by_name(environment, name):
         return row['square_id'] if row else None
 
 
+def get_image_by_source_url(environment, source_url):
+    """Get image Square ID previously uploaded from a source URL"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT square_id FROM images WHERE environment=? AND source_url=?',
+            (environment, source_url)
+        )
+        row = cursor.fetchone()
+        return row['square_id'] if row else None
+
+
+def get_image_by_hash(environment, content_hash):
+    """Get image Square ID previously uploaded with identical file contents"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT square_id FROM images WHERE environment=? AND content_hash=?',
+            (environment, content_hash)
+        )
+        row = cursor.fetchone()
+        return row['square_id'] if row else None
+
+
 def log_sync(environment, operation, object_type, square_id, status, error_message=None):
     """Log sync operation"""
     with get_db() as conn:
@@ -317,7 +413,8 @@ def export_to_json(environment, output_dir=None):
     import json
 
     if output_dir is None:
-        output_dir = PROJECT_ROOT / 'data'
+        # Export next to the database (data/ by default)
+        output_dir = Path(DB_PATH).parent
 
     categories = get_all_categories(environment)
     items = get_all_items(environment)
@@ -340,17 +437,11 @@ def show_summary(environment=None):
             print(f"\n📊 Database Summary - {environment.upper()}")
             print("=" * 60)
 
-            cursor.execute('SELECT COUNT(*) as count FROM locations WHERE environment=?', (environment,))
-            print(f"Locations: {cursor.fetchone()['count']}")
-
-            cursor.execute('SELECT COUNT(*) as count FROM categories WHERE environment=?', (environment,))
-            print(f"Categories: {cursor.fetchone()['count']}")
-
-            cursor.execute('SELECT COUNT(*) as count FROM menu_items WHERE environment=?', (environment,))
-            print(f"Menu Items: {cursor.fetchone()['count']}")
-
-            cursor.execute('SELECT COUNT(*) as count FROM images WHERE environment=?', (environment,))
-            print(f"Images: {cursor.fetchone()['count']}")
+            for label, table in (('Locations', 'locations'), ('Categories', 'categories'),
+                                 ('Menu Items', 'menu_items'), ('Item Variations', 'item_variations'),
+                                 ('Images', 'images')):
+                cursor.execute(f'SELECT COUNT(*) as count FROM {table} WHERE environment=?', (environment,))
+                print(f"{label}: {cursor.fetchone()['count']}")
         else:
             print("\n📊 Database Summary - ALL ENVIRONMENTS")
             print("=" * 60)
@@ -365,6 +456,42 @@ def show_summary(environment=None):
                 print(f"{env.capitalize()}: {cat_count} categories, {item_count} items")
 
 
+def main(argv=None):
+    """
+    Local database commands (no Square API access).
+
+    Usage:
+        python src/db_utils.py                    # init + summary
+        python src/db_utils.py summary [--env sandbox]
+        python src/db_utils.py migrate
+        python src/db_utils.py export sandbox [--output-dir data]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='catering-square-db', description="Local SQLite catalog database")
+    sub = parser.add_subparsers(dest='command')
+    summary = sub.add_parser('summary', help="Show tracked categories, items and images")
+    summary.add_argument('--env', help="Limit to one environment")
+    sub.add_parser('init', help="Create tables and show the summary")
+    sub.add_parser('migrate', help="Apply pending schema migrations")
+    export = sub.add_parser('export', help="Export ID mappings to JSON")
+    export.add_argument('environment')
+    export.add_argument('--output-dir')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        show_summary(args.env)
+    elif args.command == 'migrate':
+        with get_db() as conn:
+            run_migrations(conn)
+            print(f"✅ Schema version: {get_schema_version(conn)}")
+    elif args.command == 'export':
+        export_to_json(args.environment, args.output_dir)
+    else:
+        init_database()
+        show_summary()
+    return 0
+
+
 if __name__ == "__main__":
-    init_database()
-    show_summary()
+    main()
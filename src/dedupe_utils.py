@@ -0,0 +1,332 @@
+"""
+Purpose: Duplicate cleanup engine - survivors by policy, re-pointed items, parallel bulk deletes
+Related: duplicate_utils.py (find_duplicates, reconcile_duplicates), catalog_utils.py, snapshot_utils.py,
+         scripts/maintenance/cleanup_duplicates.py, scripts/maintenance/delete_duplicates.py
+Refactor if: >400 lines OR other object types start referencing deduped objects
+
+One run:
+    1. find duplicate items/categories in a fresh snapshot (every page)
+    2. keep one survivor per group (SURVIVOR_POLICIES)
+    3. re-point items that use a duplicate category to the surviving one
+       (version-checked batch_upsert)
+    4. delete the duplicates in batch_delete chunks of 200, in parallel
+    5. merge the local categories/menu_items rows in one transaction
+
+Usage:
+    python src/dedupe_utils.py sandbox                  # dry run
+    python src/dedupe_utils.py production --apply --policy tracked
+    python src/dedupe_utils.py production --disk        # flat memory for very large catalogs
+"""
+
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog_utils import MAX_DELETE_IDS, _chunk_upsert_objects, _get, iter_catalog_objects, replace_ids
+from duplicate_utils import DiskDuplicateIndex, find_duplicates, reconcile_duplicates
+
+# Square batch_get limit: object IDs per request
+MAX_BATCH_GET_IDS = 1000
+
+# newest: highest version (what the old cleanup scripts kept)
+# oldest: lowest version
+# tracked: the ID recorded in the local database, then newest
+# most-referenced: the category most items point at, then newest
+SURVIVOR_POLICIES = ('newest', 'oldest', 'tracked', 'most-referenced')
+
+# Concurrent batch_delete calls
+DELETE_WORKERS = 4
+
+
+def category_refs(item):
+    """Category IDs an ITEM (dict or SDK model) points at (category_id, categories, reporting_category)"""
+    data = _get(item, 'item_data')
+    refs = [_get(data, 'category_id'), _get(_get(data, 'reporting_category'), 'id')]
+    refs.extend(_get(category, 'id') for category in _get(data, 'categories') or [])
+    return {ref for ref in refs if ref}
+
+
+def _survivor_key(policy, tracked_ids, ref_counts):
+    if policy == 'newest':
+        return lambda obj: obj.get('version') or 0
+    if policy == 'oldest':
+        return lambda obj: -(obj.get('version') or 0)
+    if policy == 'tracked':
+        return lambda obj: (obj['id'] in tracked_ids, obj.get('version') or 0)
+    if policy == 'most-referenced':
+        return lambda obj: (ref_counts[obj['id']], obj.get('version') or 0)
+    raise ValueError(f"Unknown survivor policy: {policy} (choose from {', '.join(SURVIVOR_POLICIES)})")
+
+
+def _variations(item):
+    variations = []
+    for variation in (item.get('item_data') or {}).get('variations') or []:
+        data = variation.get('item_variation_data') or {}
+        variations.append({'square_id': variation['id'], 'name': data.get('name'),
+                           'price_cents': (data.get('price_money') or {}).get('amount'),
+                           'version': variation.get('version')})
+    return variations
+
+
+def _repointed(item, category_map):
+    """Copy of an item with duplicate category IDs replaced by the survivors"""
+    data = replace_ids(item['item_data'], category_map)
+    if data.get('categories'):
+        # An item in both copies of a category keeps a single reference
+        unique, seen = [], set()
+        for category in data['categories']:
+            if category.get('id') not in seen:
+                seen.add(category.get('id'))
+                unique.append(category)
+        data['categories'] = unique
+    return dict(item, item_data=data)
+
+
+def _group(object_type, name, members, survivor_key):
+    keep = max(members, key=survivor_key)
+    return {'type': object_type, 'name': name, 'keep': keep['id'],
+            'delete': sorted(member['id'] for member in members if member['id'] != keep['id'])}
+
+
+def _assemble_plan(groups, items, policy):
+    """Deletes, re-pointed items and summary for survivor groups (categories first)"""
+    deletes = [object_id for group in groups for object_id in group['delete']]
+    deleted = set(deletes)
+
+    # Items that survive but point at a category that is about to be deleted
+    category_map = {object_id: group['keep'] for group in groups if group['type'] == 'CATEGORY'
+                    for object_id in group['delete']}
+    repoint = [_repointed(item, category_map) for item in items
+               if item['id'] not in deleted and category_refs(item) & category_map.keys()]
+
+    summary = {
+        'groups': len(groups),
+        'delete': len(deletes),
+        'repoint': len(repoint),
+        'calls': len(_chunk_upsert_objects(repoint)) + -(-len(deletes) // MAX_DELETE_IDS),
+    }
+    return {'groups': groups, 'repoint': repoint, 'deletes': deletes, 'summary': summary, 'policy': policy}
+
+
+def plan_dedupe(objects, policy='newest', tracked_ids=frozenset(), types=('CATEGORY', 'ITEM')):
+    """
+    Pick survivors and the changes needed to remove every duplicate.
+
+    Args:
+        objects: Live catalog objects (dicts), e.g. snapshot.objects.values()
+        policy: One of SURVIVOR_POLICIES
+        tracked_ids: Square IDs recorded in the local database ('tracked' policy)
+        types: Object types to dedupe
+
+    Returns:
+        dict: {'groups': [{'type', 'name', 'keep', 'delete', 'variations'}],
+               'repoint': [item objects to upsert], 'deletes': [ids], 'summary': {...}}
+    """
+    objects = [obj for obj in objects if not obj.get('is_deleted')]
+    by_id = {obj['id']: obj for obj in objects}
+    items = [obj for obj in objects if obj.get('type') == 'ITEM']
+    ref_counts = Counter(ref for item in items for ref in category_refs(item))
+    survivor_key = _survivor_key(policy, tracked_ids, ref_counts)
+
+    duplicates = find_duplicates(objects)
+    groups = []
+    for object_type, kind in (('CATEGORY', 'categories'), ('ITEM', 'items')):
+        if object_type not in types:
+            continue
+        for name, ids in sorted(duplicates[kind].items(), key=lambda entry: str(entry[0])):
+            group = _group(object_type, name, [by_id[object_id] for object_id in ids], survivor_key)
+            if object_type == 'ITEM':
+                group['variations'] = _variations(by_id[group['keep']])
+            groups.append(group)
+
+    return _assemble_plan(groups, items, policy)
+
+
+def plan_dedupe_streaming(client, policy='newest', tracked_ids=frozenset(), types=('CATEGORY', 'ITEM')):
+    """
+    plan_dedupe() for catalogs too big to hold in memory.
+
+    Objects are streamed from Square into a DiskDuplicateIndex as
+    (type, name, id, version) rows. Only the duplicate groups, the items
+    that reference a duplicate category (second pass, only when there are
+    duplicate categories) and the surviving items (batch_get) are loaded.
+    """
+    from snapshot_utils import _to_dict
+
+    with DiskDuplicateIndex(types=types) as index:
+        index.update(iter_catalog_objects(client, types))
+        duplicate_groups = [(object_type, name, [{'id': object_id, 'version': version}
+                                                 for object_id, version in members])
+                            for object_type, name, members in index.groups()]
+
+    category_ids = {member['id'] for object_type, _, members in duplicate_groups
+                    if object_type == 'CATEGORY' for member in members}
+    ref_counts, items = Counter(), []
+    if category_ids:
+        for item in iter_catalog_objects(client, ['ITEM']):
+            refs = category_refs(item) & category_ids
+            if refs:
+                ref_counts.update(refs)
+                items.append(_to_dict(item))
+
+    survivor_key = _survivor_key(policy, tracked_ids, ref_counts)
+    groups = [_group(object_type, name, members, survivor_key)
+              for object_type, name, members in duplicate_groups]
+
+    # The survivors' variations, for the local database
+    item_groups = {group['keep']: group for group in groups if group['type'] == 'ITEM'}
+    keep_ids = list(item_groups)
+    for start in range(0, len(keep_ids), MAX_BATCH_GET_IDS):
+        response = client.catalog.batch_get(object_ids=keep_ids[start:start + MAX_BATCH_GET_IDS])
+        for obj in getattr(response, 'objects', None) or []:
+            item_groups[obj.id]['variations'] = _variations(_to_dict(obj))
+
+    return _assemble_plan(groups, items, policy)
+
+
+def apply_dedupe(client, plan, workers=DELETE_WORKERS):
+    """
+    Re-point items, then delete the duplicates in parallel chunks.
+
+    Returns:
+        dict: {'repointed': n, 'deleted': n, 'calls': n}
+    """
+    stats = {'repointed': 0, 'deleted': 0, 'calls': 0}
+
+    # Re-point first: deleting a category must never leave an item pointing at it
+    for batches in _chunk_upsert_objects(plan['repoint']):
+        response = client.catalog.batch_upsert(idempotency_key=str(uuid.uuid4()), batches=batches)
+        stats['calls'] += 1
+        if getattr(response, 'errors', None):
+            raise Exception(f"Failed to re-point items: {response.errors[0].detail}")
+        stats['repointed'] += sum(len(batch['objects']) for batch in batches)
+
+    chunks = [plan['deletes'][start:start + MAX_DELETE_IDS]
+              for start in range(0, len(plan['deletes']), MAX_DELETE_IDS)]
+
+    def delete_chunk(object_ids):
+        response = client.catalog.batch_delete(object_ids=object_ids)
+        if getattr(response, 'errors', None):
+            raise Exception(f"Failed to delete duplicates: {response.errors[0].detail}")
+        return len(getattr(response, 'deleted_object_ids', None) or [])
+
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            stats['deleted'] = sum(pool.map(delete_chunk, chunks))
+        stats['calls'] += len(chunks)
+
+    return stats
+
+
+def tracked_square_ids(environment):
+    """Square IDs of the categories and items recorded in the local database"""
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT square_id FROM categories WHERE environment = ?
+            UNION ALL
+            SELECT square_id FROM menu_items WHERE environment = ?
+        ''', (environment, environment))
+        return {row['square_id'] for row in cursor.fetchall()}
+
+
+def print_dedupe(plan, limit=50):
+    """Print the survivors and duplicates of a plan"""
+    icons = {'CATEGORY': '📁', 'ITEM': '📦'}
+
+    print(f"🔍 Duplicate cleanup plan (survivor policy: {plan['policy']})")
+    print("-" * 70)
+    for group in plan['groups'][:limit]:
+        print(f"{icons[group['type']]} {group['name']}:")
+        print(f"   ✓ Keeping: {group['keep']}")
+        for object_id in group['delete']:
+            print(f"   ✗ Deleting: {object_id}")
+    if len(plan['groups']) > limit:
+        print(f"... {len(plan['groups']) - limit} more groups")
+
+    s = plan['summary']
+    if not plan['groups']:
+        print("✅ No duplicates found!")
+    print("-" * 70)
+    print(f"Dedupe: {s['delete']} duplicates in {s['groups']} groups, {s['repoint']} items to re-point "
+          f"({s['calls']} API call(s))")
+
+
+def dedupe(client, environment, policy='newest', types=('CATEGORY', 'ITEM'), apply=False, confirm=True,
+           disk=False):
+    """
+    Plan (and with apply=True, run) a duplicate cleanup for one environment.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        policy: Survivor policy (see SURVIVOR_POLICIES)
+        types: Object types to dedupe
+        apply: Send the changes and reconcile the database (default: dry run)
+        confirm: Ask before applying in production
+        disk: Stream the catalog through a temporary SQLite index instead of
+              loading the snapshot (flat memory for very large catalogs)
+
+    Returns:
+        dict: The plan, plus 'applied' and 'database' stats when applied
+    """
+    from snapshot_utils import sync_snapshot
+
+    tracked_ids = tracked_square_ids(environment) if policy == 'tracked' else frozenset()
+    if disk:
+        plan = plan_dedupe_streaming(client, policy, tracked_ids, types)
+    else:
+        snapshot = sync_snapshot(client, environment)
+        plan = plan_dedupe(snapshot.objects.values(), policy, tracked_ids, types)
+    print_dedupe(plan)
+
+    if not apply or not plan['groups']:
+        return plan
+
+    if confirm and environment == 'production':
+        response = input("⚠️  You are deleting from PRODUCTION. Type 'yes' to continue: ")
+        if response.lower() != 'yes':
+            print("❌ Aborted.")
+            return plan
+
+    plan['applied'] = apply_dedupe(client, plan)
+    stats = plan['applied']
+    print(f"✅ Deleted {stats['deleted']} objects, re-pointed {stats['repointed']} items "
+          f"in {stats['calls']} call(s)")
+
+    plan['database'] = reconcile_duplicates(environment, plan['groups'])
+    print(f"📝 Database: {plan['database']['merged']} rows merged, "
+          f"{plan['database']['renamed']} moved to the surviving ID")
+
+    if not disk:
+        sync_snapshot(client, environment)
+    return plan
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Remove duplicate catalog items and categories")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--policy', choices=SURVIVOR_POLICIES, default='newest', help="Which copy to keep")
+    parser.add_argument('--type', choices=['CATEGORY', 'ITEM'], help="Only dedupe one object type")
+    parser.add_argument('--apply', action='store_true', help="Delete the duplicates (default: dry run)")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+    parser.add_argument('--disk', action='store_true', help="Index on disk instead of loading the snapshot")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    from client_utils import create_square_client
+
+    environment = args.environment or get_environment()
+    types = (args.type,) if args.type else ('CATEGORY', 'ITEM')
+    dedupe(create_square_client(environment), environment, args.policy, types,
+           apply=args.apply, confirm=not args.yes, disk=args.disk)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
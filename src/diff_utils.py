@@ -0,0 +1,295 @@
+"""
+Purpose: Diff two catalog snapshots, or a snapshot against the SQLite tables
+Related: snapshot_utils.py, catalog_utils.py (normalize_name), db_utils.py
+Refactor if: >400 lines OR diffing object types beyond names/prices/categories
+
+Objects are matched by Square ID first (hash join); whatever is left on
+each side is matched by (type, normalized name) to catch objects that
+were deleted and re-created under a new ID. Reported changes:
+
+    added, removed, recreated, renamed, repriced, recategorized
+
+Usage:
+    python src/diff_utils.py data/snapshots/production-20261001-090000.jsonl.gz data/snapshots/production.jsonl.gz
+    python src/diff_utils.py data/snapshots/sandbox.jsonl.gz db:sandbox --json
+"""
+
+import json
+from collections import defaultdict
+
+from catalog_utils import normalize_name
+from snapshot_utils import gc_paused
+
+CHANGE_KINDS = ('added', 'removed', 'recreated', 'renamed', 'repriced', 'recategorized')
+
+# Object types records_from_db() can load (images have no name in SQLite)
+DB_OBJECT_TYPES = ('CATEGORY', 'ITEM', 'ITEM_VARIATION', 'MODIFIER_LIST')
+
+
+def _object_name(obj):
+    data = obj.get(f"{obj.get('type', '').lower()}_data") or {}
+    return data.get('name')
+
+
+def _item_category_id(item_data):
+    return item_data.get('category_id') or next(
+        (c.get('id') for c in item_data.get('categories') or []), None)
+
+
+def records_from_objects(objects):
+    """
+    Flatten catalog objects (API shape) into diff records.
+
+    Nested item variations become their own records as well, so a price
+    change is reported on both the variation and its item.
+
+    Returns:
+        dict: {square_id: {'type', 'name', 'category_id', 'prices'}}
+              (variations also carry their item's name as 'item')
+    """
+    records = {}
+
+    def add_variation(variation, item_name=None):
+        data = variation.get('item_variation_data') or {}
+        amount = (data.get('price_money') or {}).get('amount')
+        records[variation['id']] = {'type': 'ITEM_VARIATION', 'name': data.get('name'), 'item': item_name,
+                                    'category_id': None, 'prices': {data.get('name'): amount}}
+        return data.get('name'), amount
+
+    for obj in objects:
+        if obj.get('is_deleted'):
+            continue
+        object_type = obj.get('type')
+
+        if object_type == 'ITEM':
+            data = obj.get('item_data') or {}
+            prices = dict(add_variation(v, data.get('name')) for v in data.get('variations') or [])
+            records[obj['id']] = {'type': 'ITEM', 'name': data.get('name'),
+                                  'category_id': _item_category_id(data), 'prices': prices}
+
+        elif object_type == 'ITEM_VARIATION':
+            if obj['id'] not in records:
+                add_variation(obj)
+
+        else:
+            records[obj['id']] = {'type': object_type, 'name': _object_name(obj),
+                                  'category_id': None, 'prices': None}
+
+    return records
+
+
+def records_from_db(environment):
+    """Diff records for the categories, items, variations and modifier lists tracked in SQLite"""
+    from db_utils import get_db
+
+    records = {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT square_id, name FROM categories WHERE environment=?', (environment,))
+        for row in cursor.fetchall():
+            records[row['square_id']] = {'type': 'CATEGORY', 'name': row['name'],
+                                         'category_id': None, 'prices': None}
+
+        cursor.execute('''
+            SELECT m.square_id, m.name, c.square_id AS category_id
+            FROM menu_items m
+            LEFT JOIN categories c ON c.id = m.category_id
+            WHERE m.environment = ?
+        ''', (environment,))
+        for row in cursor.fetchall():
+            records[row['square_id']] = {'type': 'ITEM', 'name': row['name'],
+                                         'category_id': row['category_id'], 'prices': {}}
+
+        cursor.execute('''
+            SELECT v.square_id, v.name, v.price_cents, m.square_id AS item_id, m.name AS item_name
+            FROM item_variations v
+            JOIN menu_items m ON m.id = v.item_id
+            WHERE v.environment = ?
+        ''', (environment,))
+        for row in cursor.fetchall():
+            records[row['square_id']] = {'type': 'ITEM_VARIATION', 'name': row['name'],
+                                         'item': row['item_name'], 'category_id': None,
+                                         'prices': {row['name']: row['price_cents']}}
+            if row['item_id'] in records:
+                records[row['item_id']]['prices'][row['name']] = row['price_cents']
+
+        cursor.execute('SELECT square_id, name FROM modifier_lists WHERE environment=?', (environment,))
+        for row in cursor.fetchall():
+            records[row['square_id']] = {'type': 'MODIFIER_LIST', 'name': row['name'],
+                                         'category_id': None, 'prices': None}
+
+    return records
+
+
+def load_records(source):
+    """
+    Load diff records from 'db:<environment>' or a snapshot file path.
+
+    Returns:
+        tuple: (records, label)
+    """
+    if source.startswith('db:'):
+        environment = source[3:]
+        return records_from_db(environment), f"database ({environment})"
+
+    from snapshot_utils import CatalogSnapshot
+    snapshot = CatalogSnapshot.load(source)
+    with gc_paused():
+        return records_from_objects(snapshot.objects.values()), source
+
+
+def _entry(object_id, record):
+    entry = {'type': record['type'], 'id': object_id, 'name': record['name']}
+    if record.get('item'):
+        entry['item'] = record['item']
+    return entry
+
+
+def _name_key(record):
+    # Variations are only unique within their item ('Regular', 'Large', ...)
+    return record['type'], normalize_name(record.get('item')), normalize_name(record['name'])
+
+
+def _compare(old, new, old_id, new_id, old_names, new_names, result):
+    """Append rename/price/category changes between two matched records"""
+    entry = _entry(new_id, new)
+    if old_id != new_id:
+        entry['old_id'] = old_id
+
+    if old['name'] != new['name']:
+        result['renamed'].append(dict(entry, old_name=old['name']))
+
+    # Empty on DB items saved before variations were tracked - not compared
+    if old['prices'] and new['prices'] and old['prices'] != new['prices']:
+        result['repriced'].append(dict(entry, old_prices=old['prices'], new_prices=new['prices']))
+
+    # By name: a category re-created under a new ID is still the same category
+    old_category = old_names.get(old['category_id'], old['category_id'])
+    new_category = new_names.get(new['category_id'], new['category_id'])
+    if new['type'] == 'ITEM' and old_category != new_category:
+        result['recategorized'].append(dict(entry, old_category=old_category, new_category=new_category))
+
+
+def diff_records(old, new):
+    """
+    Diff two record sets from records_from_objects()/records_from_db().
+
+    Returns:
+        dict: {'summary': {kind: count}, kind: [changes]} for CHANGE_KINDS
+    """
+    result = {kind: [] for kind in CHANGE_KINDS}
+    old_names = {oid: r['name'] for oid, r in old.items() if r['type'] == 'CATEGORY'}
+    new_names = {oid: r['name'] for oid, r in new.items() if r['type'] == 'CATEGORY'}
+
+    # 1. Hash join on ID
+    for object_id, new_record in new.items():
+        old_record = old.get(object_id)
+        if old_record is not None:
+            _compare(old_record, new_record, object_id, object_id, old_names, new_names, result)
+
+    # 2. Hash join the leftovers on (type, normalized name)
+    removed_by_name = defaultdict(list)
+    for object_id, record in old.items():
+        if object_id not in new:
+            removed_by_name[_name_key(record)].append(object_id)
+
+    for object_id, record in new.items():
+        if object_id in old:
+            continue
+        candidates = removed_by_name.get(_name_key(record))
+        if candidates:
+            old_id = candidates.pop(0)
+            result['recreated'].append(dict(_entry(object_id, record), old_id=old_id))
+            _compare(old[old_id], record, old_id, object_id, old_names, new_names, result)
+        else:
+            result['added'].append(_entry(object_id, record))
+
+    for object_ids in removed_by_name.values():
+        for object_id in object_ids:
+            result['removed'].append(_entry(object_id, old[object_id]))
+
+    for kind in CHANGE_KINDS:
+        result[kind].sort(key=lambda c: (c['type'], c.get('item') or '', c['name'] or '', c['id']))
+    result['summary'] = {kind: len(result[kind]) for kind in CHANGE_KINDS}
+    return result
+
+
+def diff_sources(old_source, new_source):
+    """
+    Diff two sources ('db:<env>' or snapshot paths); see diff_records().
+
+    Against the database only DB_OBJECT_TYPES are compared, so images and
+    other objects SQLite does not track are not reported as removed/added.
+    """
+    old, old_label = load_records(old_source)
+    new, new_label = load_records(new_source)
+    if 'db:' in (old_source[:3], new_source[:3]):
+        old = {oid: r for oid, r in old.items() if r['type'] in DB_OBJECT_TYPES}
+        new = {oid: r for oid, r in new.items() if r['type'] in DB_OBJECT_TYPES}
+    with gc_paused():
+        result = diff_records(old, new)
+    result['old'] = old_label
+    result['new'] = new_label
+    result['summary']['objects'] = {'old': len(old), 'new': len(new)}
+    return result
+
+
+def _format_prices(prices):
+    return ', '.join(f"{name} {'?' if cents is None else f'${cents / 100:.2f}'}" for name, cents in prices.items())
+
+
+def print_diff(result, object_type=None, limit=50):
+    """Print a diff, at most `limit` lines per change kind"""
+    symbols = {'added': '+', 'removed': '-', 'recreated': '↻', 'renamed': '✎',
+               'repriced': '$', 'recategorized': '→'}
+
+    print(f"🔎 Catalog diff: {result['old']} → {result['new']}")
+    print("=" * 70)
+
+    for kind in CHANGE_KINDS:
+        changes = [c for c in result[kind] if not object_type or c['type'] == object_type]
+        if not changes:
+            continue
+        print(f"\n{kind.upper()} ({len(changes)})")
+        for change in changes[:limit]:
+            prefix = f"  {symbols[kind]} {change['type']:<15} " + (f"{change['item']} / " if change.get('item') else '')
+            line = prefix + str(change['name'])
+            if kind == 'renamed':
+                line = f"{prefix}{change['old_name']} → {change['name']}"
+            elif kind == 'repriced':
+                line += f": {_format_prices(change['old_prices'])} → {_format_prices(change['new_prices'])}"
+            elif kind == 'recategorized':
+                line += f": {change['old_category']} → {change['new_category']}"
+            elif kind == 'recreated':
+                line += f" ({change['old_id']} → {change['id']})"
+            print(line)
+        if len(changes) > limit:
+            print(f"  ... {len(changes) - limit} more")
+
+    summary = ', '.join(f"{result['summary'][kind]} {kind}" for kind in CHANGE_KINDS)
+    print("\n" + "-" * 70)
+    print(f"Summary: {summary}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Diff catalog snapshots and/or the local database")
+    parser.add_argument('old', help="Snapshot path or db:<environment>")
+    parser.add_argument('new', help="Snapshot path or db:<environment>")
+    parser.add_argument('--type', help="Only show one object type (e.g. ITEM)")
+    parser.add_argument('--limit', type=int, default=50, help="Max lines per change kind (default: 50)")
+    parser.add_argument('--json', action='store_true', help="Print the full diff as JSON")
+    args = parser.parse_args(argv)
+
+    result = diff_sources(args.old, args.new)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_diff(result, args.type, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
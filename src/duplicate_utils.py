@@ -0,0 +1,333 @@
+"""
+Purpose: Finding duplicate catalog objects and merging the local rows of removed ones
+Related: dedupe_utils.py (cleanup engine), catalog_utils.py (normalize_name, check_for_duplicates),
+         db_utils.py
+Refactor if: >400 lines OR duplicates are matched by more than type, scope and name
+
+DuplicateIndex groups objects in memory; DiskDuplicateIndex does the same
+through a temporary SQLite table for catalogs too big for that.
+find_duplicates() is the item/category check every sync runs first
+(catalog_utils.check_for_duplicates); report_duplicates() backs
+`catering-square dedupe --check`.
+"""
+
+from collections import defaultdict
+
+from catalog_utils import _get, normalize_name
+
+
+# Child types are only duplicates within their parent: (parent reference field)
+DUPLICATE_SCOPES = {
+    'ITEM_VARIATION': 'item_id',
+    'MODIFIER': 'modifier_list_id',
+}
+
+
+def _duplicate_fields(obj, types=None):
+    """(type, scope, name, id, version) of an object to index, or None to skip it"""
+    get = obj.get if isinstance(obj, dict) else lambda key: getattr(obj, key, None)
+    object_type = get('type')
+    if not object_type or get('is_deleted') or (types is not None and object_type not in types):
+        return None
+    data = get(f"{object_type.lower()}_data")
+    name = _get(data, 'name')
+    if not name:
+        return None
+    scope = _get(data, DUPLICATE_SCOPES[object_type]) if object_type in DUPLICATE_SCOPES else None
+    return object_type, scope, name, get('id'), get('version')
+
+
+def _group_label(name, scope):
+    return f"{name} ({scope})" if scope else name
+
+
+class DuplicateIndex:
+    """
+    Single-pass duplicate index over catalog objects of every type.
+
+    Objects are grouped by (type, normalized name) - see normalize_name() -
+    and variations/modifiers additionally by their parent, so "Autumn
+    Caesar " and "autumn caesar" are one group. Only IDs are kept, so
+    memory grows with the number of objects, not their size. Nested
+    children are not walked: stream catalog.search, which returns them
+    as top-level objects.
+    """
+
+    def __init__(self, types=None):
+        self.types = set(types) if types else None
+        self.groups = defaultdict(list)  # (type, scope, key) -> [ids]
+        self.names = {}  # (type, scope, key) -> first name seen
+        self.count = 0
+        self._keys = {}  # name -> normalize_name(name); names repeat a lot ('Regular')
+
+    def add(self, obj):
+        """Index one object (API dict or SDK model); deleted and unnamed objects are skipped"""
+        fields = _duplicate_fields(obj, self.types)
+        if fields is None:
+            return
+        object_type, scope, name, object_id, _ = fields
+
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = normalize_name(name)
+        group = (object_type, scope, key)
+        ids = self.groups[group]
+        if not ids:
+            self.names[group] = name
+        ids.append(object_id)
+        self.count += 1
+
+    def update(self, objects):
+        from snapshot_utils import gc_paused
+
+        with gc_paused():
+            for obj in objects:
+                self.add(obj)
+        return self
+
+    def duplicates(self, object_type=None):
+        """
+        Groups with more than one object.
+
+        Returns:
+            dict: {type: {name: [ids]}} (variations/modifiers: 'name (parent ID)'),
+                  or {name: [ids]} for a single object_type
+        """
+        result = defaultdict(dict)
+        for group, ids in self.groups.items():
+            if len(ids) > 1 and (object_type is None or group[0] == object_type):
+                result[group[0]][_group_label(self.names[group], group[1])] = ids
+        return result[object_type] if object_type else dict(result)
+
+
+class DiskDuplicateIndex:
+    """
+    DuplicateIndex for catalogs too big to group in memory.
+
+    Each object is reduced to a (type, scope, normalized name, name, id,
+    version) row in a temporary SQLite table, flushed every FLUSH_ROWS
+    rows; grouping is an indexed GROUP BY. Memory stays flat however many
+    objects are streamed through. The table is deleted on close().
+
+    Usage:
+        with DiskDuplicateIndex(types=['ITEM']) as index:
+            index.update(iter_catalog_objects(client, ['ITEM']))
+            for object_type, name, members in index.groups():
+                ...
+    """
+
+    FLUSH_ROWS = 5000
+
+    def __init__(self, types=None, path=''):
+        import sqlite3
+        from functools import lru_cache
+
+        self.types = set(types) if types else None
+        self.count = 0
+        self._rows = []
+        self._indexed = False
+        self._normalize = lru_cache(maxsize=4096)(normalize_name)  # Bounded, unlike DuplicateIndex
+
+        # '' = private temporary database file, removed when the connection closes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=OFF')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.execute('''
+            CREATE TABLE objects (
+                type TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                id TEXT NOT NULL,
+                version INTEGER
+            )
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, obj):
+        """Index one object (API dict or SDK model); deleted and unnamed objects are skipped"""
+        fields = _duplicate_fields(obj, self.types)
+        if fields is None:
+            return
+        object_type, scope, name, object_id, version = fields
+        self._rows.append((object_type, scope or '', self._normalize(name), name, object_id, version))
+        self.count += 1
+        if len(self._rows) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def update(self, objects):
+        for obj in objects:
+            self.add(obj)
+        self._flush()
+        return self
+
+    def _flush(self):
+        if self._rows:
+            self.conn.executemany('INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)', self._rows)
+            self._rows = []
+            self._indexed = False
+
+    def groups(self, object_type=None):
+        """
+        Stream duplicate groups, one at a time.
+
+        Yields:
+            tuple: (type, name, [(id, version)]) for each group of 2+ objects
+        """
+        self._flush()
+        if not self._indexed:
+            # Built once after the bulk insert - cheaper than maintaining it per row
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_objects_group ON objects(type, scope, key)')
+            self._indexed = True
+
+        cursor = self.conn.execute('''
+            SELECT o.type, o.scope, o.key, g.name, o.id, o.version
+            FROM (
+                SELECT type, scope, key, MIN(name) AS name FROM objects
+                WHERE ?1 IS NULL OR type = ?1
+                GROUP BY type, scope, key
+                HAVING COUNT(*) > 1
+            ) g
+            JOIN objects o ON o.type = g.type AND o.scope = g.scope AND o.key = g.key
+            ORDER BY o.type, o.scope, o.key, o.id
+        ''', (object_type,))
+
+        group, label, members = None, None, []
+        for row_type, scope, key, name, object_id, version in cursor:
+            if (row_type, scope, key) != group:
+                if members:
+                    yield group[0], label, members
+                group, label, members = (row_type, scope, key), _group_label(name, scope), []
+            members.append((object_id, version))
+        if members:
+            yield group[0], label, members
+
+    def duplicates(self, object_type=None):
+        """Same shape as DuplicateIndex.duplicates() (group names: the smallest spelling)"""
+        result = defaultdict(dict)
+        for group_type, name, members in self.groups(object_type):
+            result[group_type][name] = [object_id for object_id, _ in members]
+        return result[object_type] if object_type else dict(result)
+
+
+def find_duplicates(objects):
+    """
+    Find duplicate item and category names (normalized) in catalog objects.
+
+    Args:
+        objects: Iterable of catalog objects (e.g. a snapshot)
+
+    Returns:
+        dict: {'items': {name: [ids]}, 'categories': {name: [ids]}}
+    """
+    duplicates = DuplicateIndex(types=('ITEM', 'CATEGORY')).update(objects).duplicates()
+    return {
+        'items': duplicates.get('ITEM', {}),
+        'categories': duplicates.get('CATEGORY', {}),
+    }
+
+
+def report_duplicates(objects, types=None, disk=False):
+    """
+    Print every duplicate group of any object type (catering-square dedupe --check).
+
+    Args:
+        objects: Iterable of catalog objects
+        types: Object types to check (default: all)
+        disk: Index through DiskDuplicateIndex (flat memory)
+
+    Returns:
+        dict: {object_type: {name: [ids]}}
+    """
+    index = DiskDuplicateIndex(types) if disk else DuplicateIndex(types)
+    index.update(objects)
+    duplicates = index.duplicates()
+    if disk:
+        index.close()
+    if not duplicates:
+        print(f"✅ No duplicates found ({index.count} objects checked)")
+    for object_type, groups in sorted(duplicates.items()):
+        for name, ids in groups.items():
+            print(f"   {object_type}: {name} ({len(ids)} copies)")
+    return duplicates
+
+
+def reconcile_duplicates(environment, groups):
+    """
+    Point local rows at the surviving Square objects after a dedupe, in one transaction.
+
+    Rows for deleted duplicates are merged into the survivor's row (menu
+    items follow their category), or take over the survivor's Square ID
+    when the survivor was not tracked yet.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        groups: Dicts with type ('CATEGORY'/'ITEM'), keep (Square ID),
+                delete ([Square IDs]) and, for items, the survivor's
+                variations ([{'square_id', 'name', 'price_cents', 'version'}])
+
+    Returns:
+        dict: {'merged': n, 'renamed': n} rows
+    """
+    tables = {'CATEGORY': 'categories', 'ITEM': 'menu_items'}
+    stats = {'merged': 0, 'renamed': 0}
+
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        def row_id(table, square_id):
+            cursor.execute(f'SELECT id FROM {table} WHERE environment=? AND square_id=?',
+                           (environment, square_id))
+            row = cursor.fetchone()
+            return row['id'] if row else None
+
+        for group in groups:
+            table = tables[group['type']]
+            keep_id = row_id(table, group['keep'])
+
+            for square_id in group['delete']:
+                loser_id = row_id(table, square_id)
+                if loser_id is None:
+                    continue
+
+                if keep_id is None:
+                    cursor.execute(f'UPDATE {table} SET square_id=?, square_version=NULL WHERE id=?',
+                                   (group['keep'], loser_id))
+                    keep_id = loser_id
+                    stats['renamed'] += 1
+                elif group['type'] == 'CATEGORY':
+                    cursor.execute('UPDATE menu_items SET category_id=? WHERE category_id=?', (keep_id, loser_id))
+                    cursor.execute('DELETE FROM categories WHERE id=?', (loser_id,))
+                    stats['merged'] += 1
+                else:
+                    cursor.execute('DELETE FROM item_variations WHERE item_id=?', (loser_id,))
+                    cursor.execute('DELETE FROM menu_items WHERE id=?', (loser_id,))
+                    stats['merged'] += 1
+
+            if group['type'] == 'ITEM' and keep_id is not None and group.get('variations') is not None:
+                # The duplicates' variations were deleted with them
+                cursor.execute('DELETE FROM item_variations WHERE item_id=?', (keep_id,))
+                cursor.executemany('''
+                    INSERT INTO item_variations
+                        (environment, square_id, item_id, name, price_cents, square_version, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', [(environment, var['square_id'], keep_id, var['name'], var.get('price_cents'),
+                       var.get('version')) for var in group['variations']])
+
+        cursor.executemany('''
+            INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(environment, 'delete', group['type'].lower(), square_id, 'success', 'duplicate')
+              for group in groups for square_id in group['delete']])
+
+    return stats
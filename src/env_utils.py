@@ -2,31 +2,57 @@
 Purpose: Environment variable utilities for flexible sandbox/production switching
 Related: All scripts that interact with Square API
 Refactor if: Supporting more than 2 environments OR complex credential logic
+
+Importing this module has no side effects: the .env file is read (and the
+legacy SQUARE_ACCESS_TOKEN / SQUARE_LOCATION_ID variables set) the first
+time a value is looked up, or explicitly with load_env().
 """
 
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+
+_env_loaded = False
+
+
+def load_env():
+    """Load the .env file once per process (python-dotenv is imported lazily)"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass  # Plain environment variables still work
+    else:
+        load_dotenv()
+
+    set_legacy_env_vars()
+
 
-# Load .env file
-load_dotenv()
+def _getenv(name, default=None):
+    load_env()
+    return os.getenv(name, default)
 
 
 def get_environment():
     """Get the active environment (sandbox or production)"""
-    return os.getenv('SQUARE_ENVIRONMENT', 'sandbox').lower()
+    return _getenv('SQUARE_ENVIRONMENT', 'sandbox').lower()
 
 
-def get_access_token():
-    """Get access token for active environment"""
-    env = get_environment()
+def get_access_token(environment=None):
+    """Get access token for the given or active environment"""
+    env = (environment or get_environment()).lower()
 
     if env == 'production':
-        token = os.getenv('PRODUCTION_ACCESS_TOKEN')
+        token = _getenv('PRODUCTION_ACCESS_TOKEN')
         if not token:
             raise ValueError("PRODUCTION_ACCESS_TOKEN not found in .env file")
         return token
     else:
-        token = os.getenv('SANDBOX_ACCESS_TOKEN')
+        token = _getenv('SANDBOX_ACCESS_TOKEN')
         if not token:
             raise ValueError("SANDBOX_ACCESS_TOKEN not found in .env file")
         return token
@@ -37,9 +63,9 @@ def get_app_id():
     env = get_environment()
 
     if env == 'production':
-        return os.getenv('PRODUCTION_APP_ID')
+        return _getenv('PRODUCTION_APP_ID')
     else:
-        return os.getenv('SANDBOX_APP_ID')
+        return _getenv('SANDBOX_APP_ID')
 
 
 def get_main_location_id():
@@ -47,17 +73,67 @@ def get_main_location_id():
     env = get_environment()
 
     if env == 'production':
-        location_id = os.getenv('PRODUCTION_LOCATION_MAIN')
+        location_id = _getenv('PRODUCTION_LOCATION_MAIN')
         if not location_id:
             raise ValueError("PRODUCTION_LOCATION_MAIN not found in .env file")
         return location_id
     else:
-        location_id = os.getenv('SANDBOX_LOCATION_MAIN')
+        location_id = _getenv('SANDBOX_LOCATION_MAIN')
         if not location_id:
             raise ValueError("SANDBOX_LOCATION_MAIN not found in .env file")
         return location_id
 
 
+def get_webhook_signature_key():
+    """Get the signature key of the webhook subscription (Developer Console → Webhooks)"""
+    key = _getenv('SQUARE_WEBHOOK_SIGNATURE_KEY')
+    if not key:
+        raise ValueError("SQUARE_WEBHOOK_SIGNATURE_KEY not found in .env file")
+    return key
+
+
+def get_webhook_url(default=None):
+    """Get the notification URL registered with Square (signatures cover it)"""
+    return _getenv('SQUARE_WEBHOOK_URL', default)
+
+
+@dataclass(frozen=True)
+class SquareConfig:
+    """Resolved settings for one environment (see get_config)"""
+    environment: str
+    access_token: str
+    app_id: str
+    location_id: str
+
+
+@lru_cache(maxsize=None)
+def get_config(environment=None):
+    """
+    Get the resolved Square settings for an environment, cached per process.
+
+    Missing values are None; use get_access_token() for the error message.
+    The legacy SQUARE_ACCESS_TOKEN / SQUARE_LOCATION_ID only stand in for
+    the active environment: set_legacy_env_vars() fills them from it, so
+    they must never reach the other one.
+    Call get_config.cache_clear() after changing environment variables.
+
+    Args:
+        environment: 'sandbox' or 'production' (default: SQUARE_ENVIRONMENT)
+
+    Returns:
+        SquareConfig
+    """
+    env = (environment or get_environment()).lower()
+    prefix = 'PRODUCTION' if env == 'production' else 'SANDBOX'
+    legacy = env == get_environment()
+    return SquareConfig(
+        environment=env,
+        access_token=_getenv(f'{prefix}_ACCESS_TOKEN') or (_getenv('SQUARE_ACCESS_TOKEN') if legacy else None),
+        app_id=_getenv(f'{prefix}_APP_ID'),
+        location_id=_getenv(f'{prefix}_LOCATION_MAIN') or (_getenv('SQUARE_LOCATION_ID') if legacy else None),
+    )
+
+
 def is_production():
     """Check if currently in production environment"""
     return get_environment() == 'production'
@@ -111,7 +187,7 @@ def print_environment_info():
 
 
 # Backward compatibility: Set legacy environment variables
-# This ensures old scripts still work
+# This ensures old scripts still work (called once by load_env)
 def set_legacy_env_vars():
     """Set legacy SQUARE_ACCESS_TOKEN for backward compatibility"""
     try:
@@ -121,10 +197,6 @@ def set_legacy_env_vars():
         pass  # Variables not set yet
 
 
-# Auto-set legacy vars on import
-set_legacy_env_vars()
-
-
 if __name__ == "__main__":
     # Test/display environment info
     print_environment_info()
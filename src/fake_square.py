@@ -0,0 +1,313 @@
+"""
+Purpose: In-process fake of the Square SDK client for offline runs and benchmarks
+Related: client_utils.py (SQUARE_CLIENT=fake), fake_square_store.py, fake_square_models.py,
+         fake_square_state.py
+Refactor if: >600 lines OR emulating Square APIs beyond catalog/locations
+
+Implements only the surface this project uses:
+    catalog.search_items / batch_get / batch_upsert / batch_delete / list / search
+    catalog.object.get, catalog.images.create
+    locations.list / locations.create
+
+Objects live in an in-memory store with versions and tombstones
+(fake_square_store.py). Page sizes and per-call ID caps follow Square's
+documented limits, and latency, 5xx errors and 429s can be injected.
+"""
+
+import copy
+import time
+from collections import Counter
+
+from fake_square_models import FakeApiError, FakeModel, FakePager
+from fake_square_state import FakeStateMixin
+from fake_square_store import (
+    LIST_PAGE_SIZE, MAX_BATCH_DELETE_IDS, MAX_BATCH_GET_IDS, MAX_OBJECTS_PER_BATCH,
+    MAX_OBJECTS_PER_UPSERT, SEARCH_ITEMS_PAGE_SIZE, SEARCH_PAGE_SIZE, FakeCatalogStore, _now,
+)
+
+# Object type -> (data field, name field) used for sorting and text search
+NAME_FIELDS = {
+    'ITEM': ('item_data', 'name'),
+    'CATEGORY': ('category_data', 'name'),
+    'ITEM_VARIATION': ('item_variation_data', 'name'),
+    'IMAGE': ('image_data', 'name'),
+    'MODIFIER_LIST': ('modifier_list_data', 'name'),
+    'MODIFIER': ('modifier_data', 'name'),
+}
+
+
+def _name_of(obj):
+    data_field, name_field = NAME_FIELDS.get(obj['type'], (None, None))
+    if not data_field:
+        return ''
+    return (obj.get(data_field) or {}).get(name_field) or ''
+
+
+class _Endpoint:
+    """Base for fake sub-clients; every public call goes through _call()"""
+
+    def __init__(self, fake):
+        self._fake = fake
+
+
+class FakeCatalogObjectClient(_Endpoint):
+
+    def get(self, object_id, *, include_related_objects=None, catalog_version=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.object.get')
+        with fake._lock:
+            obj = fake._live(object_id)
+            if obj is None:
+                raise FakeApiError(404, 'INVALID_REQUEST_ERROR', 'NOT_FOUND',
+                                   f"Object with ID `{object_id}` not found.")
+            result = {'object': fake._compose(obj)}
+            if include_related_objects:
+                result['related_objects'] = fake._related([obj])
+            return FakeModel(result)
+
+
+class FakeCatalogImagesClient(_Endpoint):
+
+    def create(self, *, request=None, image_file=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.images.create')
+        request = request or {}
+        image = copy.deepcopy(request.get('image') or {'type': 'IMAGE', 'image_data': {}})
+
+        size = 0
+        if hasattr(image_file, 'read'):
+            size = len(image_file.read())
+        elif isinstance(image_file, (bytes, str)):
+            size = len(image_file)
+
+        with fake._lock:
+            image_id = fake._new_id()
+            image['id'] = image_id
+            image['type'] = 'IMAGE'
+            image_data = image.setdefault('image_data', {})
+            image_data.setdefault('name', image_data.get('caption', ''))
+            image_data['url'] = f"https://fake-square.local/images/{image_id}.jpg"
+            image_data['size_bytes'] = size
+            stored = fake._store(image)
+
+            # Attach to an existing object when object_id is given
+            target_id = request.get('object_id')
+            if target_id:
+                target = fake._live(target_id)
+                if target is not None and target['type'] == 'ITEM':
+                    target['item_data'].setdefault('image_ids', []).append(image_id)
+                    fake._touch(target)
+
+            return FakeModel({'image': fake._compose(stored)})
+
+
+class FakeCatalogClient(_Endpoint):
+
+    def __init__(self, fake):
+        super().__init__(fake)
+        self.object = FakeCatalogObjectClient(fake)
+        self.images = FakeCatalogImagesClient(fake)
+
+    def search_items(self, *, text_filter=None, category_ids=None, cursor=None, limit=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.search_items')
+        limit = min(limit or SEARCH_ITEMS_PAGE_SIZE, SEARCH_ITEMS_PAGE_SIZE)
+
+        with fake._lock:
+            items = [obj for obj in fake._objects.values()
+                     if obj['type'] == 'ITEM' and not obj['is_deleted']]
+            if text_filter:
+                needle = text_filter.casefold()
+                items = [obj for obj in items if needle in _name_of(obj).casefold()]
+            if category_ids:
+                wanted = set(category_ids)
+                items = [obj for obj in items if obj['item_data'].get('category_id') in wanted]
+
+            items.sort(key=lambda obj: (_name_of(obj), obj['id']))
+            page, next_cursor = fake._page(items, cursor, limit)
+            return FakeModel({'items': [fake._compose(obj) for obj in page], 'cursor': next_cursor})
+
+    def batch_get(self, *, object_ids, include_related_objects=None, include_deleted_objects=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.batch_get')
+        if len(object_ids) > MAX_BATCH_GET_IDS:
+            raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'INVALID_ARRAY_LENGTH',
+                               f"object_ids must contain at most {MAX_BATCH_GET_IDS} elements")
+
+        with fake._lock:
+            found = []
+            for object_id in object_ids:
+                obj = fake._objects.get(object_id)
+                if obj is not None and (include_deleted_objects or not obj['is_deleted']):
+                    found.append(obj)
+
+            result = {'objects': [fake._compose(obj) for obj in found]}
+            if include_related_objects:
+                result['related_objects'] = fake._related(found)
+            return FakeModel(result)
+
+    def batch_upsert(self, *, idempotency_key, batches, **kwargs):
+        fake = self._fake
+        fake._call('catalog.batch_upsert')
+
+        total = sum(fake._count_objects(batch.get('objects', [])) for batch in batches)
+        if total > MAX_OBJECTS_PER_UPSERT:
+            raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'INVALID_ARRAY_LENGTH',
+                               f"A request may contain at most {MAX_OBJECTS_PER_UPSERT} objects")
+        for batch in batches:
+            if fake._count_objects(batch.get('objects', [])) > MAX_OBJECTS_PER_BATCH:
+                raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'INVALID_ARRAY_LENGTH',
+                                   f"A batch may contain at most {MAX_OBJECTS_PER_BATCH} objects")
+
+        with fake._lock:
+            if idempotency_key in fake._idempotency:
+                return FakeModel(copy.deepcopy(fake._idempotency[idempotency_key]))
+
+            result = fake._upsert(batches)
+            fake._idempotency[idempotency_key] = result
+            return FakeModel(copy.deepcopy(result))
+
+    def batch_delete(self, *, object_ids, **kwargs):
+        fake = self._fake
+        fake._call('catalog.batch_delete')
+        if len(object_ids) > MAX_BATCH_DELETE_IDS:
+            raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'INVALID_ARRAY_LENGTH',
+                               f"object_ids must contain at most {MAX_BATCH_DELETE_IDS} elements")
+
+        with fake._lock:
+            deleted_at = _now()
+            deleted = []
+            for object_id in object_ids:
+                deleted.extend(fake._delete(object_id, deleted_at))
+            return FakeModel({'deleted_object_ids': deleted, 'deleted_at': deleted_at})
+
+    def list(self, *, cursor=None, types=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.list')
+        wanted = {t.strip() for t in types.split(',')} if types else None
+
+        with fake._lock:
+            objects = [obj for obj in fake._objects.values()
+                       if not obj['is_deleted'] and (wanted is None or obj['type'] in wanted)]
+            page, next_cursor = fake._page(objects, cursor, LIST_PAGE_SIZE)
+            items = [fake._compose(obj) for obj in page]
+
+        return FakePager(items, next_cursor, lambda c: self.list(cursor=c, types=types))
+
+    def search(self, *, cursor=None, object_types=None, include_deleted_objects=None,
+               include_related_objects=None, begin_time=None, limit=None, **kwargs):
+        fake = self._fake
+        fake._call('catalog.search')
+        limit = min(limit or SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE)
+        wanted = set(object_types) if object_types else None
+
+        with fake._lock:
+            objects = [
+                obj for obj in fake._objects.values()
+                if (wanted is None or obj['type'] in wanted)
+                and (include_deleted_objects or not obj['is_deleted'])
+                and (begin_time is None or obj['updated_at'] > begin_time)
+            ]
+            objects.sort(key=lambda obj: (obj['updated_at'], obj['id']))
+            page, next_cursor = fake._page(objects, cursor, limit)
+
+            result = {
+                'objects': [fake._compose(obj) for obj in page],
+                'cursor': next_cursor,
+                'latest_time': fake._latest_time,
+            }
+            if include_related_objects:
+                result['related_objects'] = fake._related(page)
+            return FakeModel(result)
+
+
+class FakeLocationsClient(_Endpoint):
+
+    def list(self, **kwargs):
+        fake = self._fake
+        fake._call('locations.list')
+        with fake._lock:
+            return FakeModel({'locations': copy.deepcopy(fake._locations)})
+
+    def create(self, *, location=None, **kwargs):
+        fake = self._fake
+        fake._call('locations.create')
+        with fake._lock:
+            created = copy.deepcopy(location or {})
+            created['id'] = fake._new_id(13)
+            created.setdefault('status', 'ACTIVE')
+            created.setdefault('capabilities', [])
+            created['created_at'] = _now()
+            fake._locations.append(created)
+            return FakeModel({'location': copy.deepcopy(created)})
+
+
+class FakeSquare(FakeStateMixin, FakeCatalogStore):
+    """
+    Drop-in stand-in for square.Square.
+
+    Args:
+        token: Ignored (accepted for signature compatibility)
+        environment: Ignored (accepted for signature compatibility)
+        latency: Seconds to sleep per call, or (min, max) for a uniform range
+        error_rate: Probability that a call fails with HTTP 500
+        rate_limit_rate: Probability that a call fails with HTTP 429
+        seed: Random seed for IDs and fault injection (reproducible runs)
+
+    Attributes:
+        calls: Counter of calls per endpoint, e.g. calls['catalog.batch_get']
+    """
+
+    def __init__(self, token=None, environment=None, latency=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, seed=0):
+        super().__init__(seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.calls = Counter()
+
+        self._locations = []
+        self._idempotency = {}
+        self._forced_failures = []
+
+        self.catalog = FakeCatalogClient(self)
+        self.locations = FakeLocationsClient(self)
+
+    # ----- fault injection -------------------------------------------------
+
+    def fail_next(self, endpoint, status_code=500):
+        """Make the next call to an endpoint (e.g. 'catalog.batch_upsert') fail"""
+        with self._lock:
+            self._forced_failures.append((endpoint, status_code))
+
+    def _call(self, endpoint):
+        """Count the call, apply latency and injected failures"""
+        with self._lock:
+            self.calls[endpoint] += 1
+            forced = next((f for f in self._forced_failures if f[0] == endpoint), None)
+            if forced:
+                self._forced_failures.remove(forced)
+            roll = self._random.random()
+            delay = (self._random.uniform(*self.latency) if isinstance(self.latency, (tuple, list))
+                     else self.latency)
+
+        if delay:
+            time.sleep(delay)
+
+        status = forced[1] if forced else None
+        if status is None and roll < self.rate_limit_rate:
+            status = 429
+        elif status is None and roll < self.rate_limit_rate + self.error_rate:
+            status = 500
+
+        if status == 429:
+            raise FakeApiError(429, 'RATE_LIMIT_ERROR', 'RATE_LIMITED', "Rate limit exceeded.")
+        if status:
+            raise FakeApiError(status, 'API_ERROR', 'INTERNAL_SERVER_ERROR', "Injected failure.")
+
+
+if __name__ == "__main__":
+    fake = FakeSquare()
+    fake.seed_catalog(250, duplicate_rate=0.1)
+    items = list(fake.catalog.list(types='ITEM'))
+    print(f"✅ Fake catalog: {len(items)} items, calls: {dict(fake.calls)}")
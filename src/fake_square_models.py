@@ -0,0 +1,97 @@
+"""
+Purpose: Response models, errors and pagers of the fake Square client
+Related: fake_square.py (endpoints), fake_square_store.py
+Refactor if: >200 lines OR the SDK's response types change shape
+
+The SDK returns pydantic models; FakeModel is a read-only attribute view
+over the plain dicts the fake stores, and FakePager mirrors SyncPager.
+"""
+
+import copy
+import json
+
+try:
+    # Raise the same exception type as the real SDK when it is installed
+    from square.core.api_error import ApiError as _ApiErrorBase
+except ImportError:
+    _ApiErrorBase = Exception
+
+
+class FakeApiError(_ApiErrorBase):
+    """Non-2xx response from the fake (mirrors square.core.api_error.ApiError)"""
+
+    def __init__(self, status_code, category, code, detail):
+        body = {'errors': [{'category': category, 'code': code, 'detail': detail}]}
+        Exception.__init__(self, f"API Error\nStatus code: {status_code}\nBody: {json.dumps(body)}")
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+        self.errors = [FakeModel(error) for error in body['errors']]
+
+    def __str__(self):
+        return f"status_code: {self.status_code}, body: {self.body}"
+
+
+class FakeModel:
+    """
+    Read-only attribute view over a dict, standing in for SDK pydantic models.
+
+    Unknown attributes read as None (like unset optional SDK fields).
+    """
+
+    def __init__(self, data):
+        self.__dict__['_data'] = data
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _wrap(self._data.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FakeModel is read-only")
+
+    def __eq__(self, other):
+        return isinstance(other, FakeModel) and other._data == self._data
+
+    def __repr__(self):
+        return f"FakeModel({self._data!r})"
+
+    def model_dump(self, **kwargs):
+        """Return a deep copy of the underlying data (SDK-compatible name)"""
+        return copy.deepcopy(self._data)
+
+    dict = model_dump
+
+
+def _wrap(value):
+    if isinstance(value, dict):
+        return FakeModel(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+
+class FakePager:
+    """Page of list() results; iterating walks all pages like the SDK's SyncPager"""
+
+    def __init__(self, items, cursor, fetch_next):
+        self.items = items
+        self.has_next = cursor is not None
+        self.response = FakeModel({'cursor': cursor})
+        self._cursor = cursor
+        self._fetch_next = fetch_next
+
+    def next_page(self):
+        return self._fetch_next(self._cursor) if self.has_next else None
+
+    def iter_pages(self):
+        page = self
+        while page is not None:
+            yield page
+            if not page.has_next:
+                return
+            page = page.next_page()
+
+    def __iter__(self):
+        for page in self.iter_pages():
+            yield from page.items
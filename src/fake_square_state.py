@@ -0,0 +1,108 @@
+"""
+Purpose: Seeding and JSON persistence of the fake Square catalog
+Related: fake_square.py (FakeSquare), fake_square_store.py, client_utils.py (SQUARE_FAKE_STATE)
+Refactor if: >200 lines OR seeded catalogs need more than categories/items/variations
+
+Seeding writes straight to the store (no API calls are counted), in
+chunks within the batch_upsert limits so the result is the same as a
+real bulk import.
+"""
+
+import json
+from collections import defaultdict
+
+from fake_square_store import MAX_OBJECTS_PER_BATCH
+
+
+class FakeStateMixin:
+    """seed_catalog(), save_state() and load_state() for FakeSquare"""
+
+    def seed_catalog(self, item_count, category_count=6, duplicate_rate=0.0, variations_per_item=1):
+        """
+        Populate the catalog with synthetic categories and items.
+
+        Args:
+            item_count: Number of distinct items
+            category_count: Number of distinct categories
+            duplicate_rate: Fraction of items (and categories) created twice
+            variations_per_item: Variations nested under each item
+
+        Returns:
+            dict: {'categories': [ids], 'items': [ids]}
+        """
+        objects = []
+        category_refs = []
+        for c in range(category_count):
+            category_refs.append(f"#cat{c}")
+            objects.append({'type': 'CATEGORY', 'id': f"#cat{c}",
+                            'category_data': {'name': f"Category {c}"}})
+            if self._random.random() < duplicate_rate:
+                objects.append({'type': 'CATEGORY', 'id': f"#cat{c}dup",
+                                'category_data': {'name': f"Category {c}"}})
+
+        for i in range(item_count):
+            copies = 2 if self._random.random() < duplicate_rate else 1
+            for copy_number in range(copies):
+                objects.append({
+                    'type': 'ITEM',
+                    'id': f"#item{i}-{copy_number}",
+                    'item_data': {
+                        'name': f"Menu Item {i}",
+                        'description': f"Ingredient {i % 50}, Kale, Quinoa",
+                        'category_id': category_refs[i % category_count] if category_refs else None,
+                        'variations': [{
+                            'type': 'ITEM_VARIATION',
+                            'id': f"#var{i}-{copy_number}-{v}",
+                            'item_variation_data': {
+                                'name': 'Regular' if v == 0 else f"Size {v}",
+                                'pricing_type': 'FIXED_PRICING',
+                                'price_money': {'amount': 1000 + 100 * v, 'currency': 'USD'}
+                            }
+                        } for v in range(variations_per_item)]
+                    }
+                })
+
+        # Write in chunks within upsert limits without counting as API calls
+        with self._lock:
+            mappings = {}
+            batch, size = [], 0
+            for obj in objects:
+                obj_size = self._count_objects([obj])
+                if batch and size + obj_size > MAX_OBJECTS_PER_BATCH:
+                    result = self._upsert([{'objects': batch}])
+                    mappings.update({m['client_object_id']: m['object_id'] for m in result['id_mappings']})
+                    batch, size = [], 0
+                # Categories created in earlier chunks are referenced by real ID
+                if obj['type'] == 'ITEM' and obj['item_data']['category_id'] in mappings:
+                    obj['item_data']['category_id'] = mappings[obj['item_data']['category_id']]
+                batch.append(obj)
+                size += obj_size
+            if batch:
+                result = self._upsert([{'objects': batch}])
+                mappings.update({m['client_object_id']: m['object_id'] for m in result['id_mappings']})
+
+        return {
+            'categories': [v for k, v in mappings.items() if k.startswith('#cat')],
+            'items': [v for k, v in mappings.items() if k.startswith('#item')],
+        }
+
+    def save_state(self, path):
+        """Write the object store to a JSON file"""
+        with self._lock:
+            state = {'objects': self._objects, 'locations': self._locations,
+                     'version': self._version, 'latest_time': self._latest_time}
+            with open(path, 'w') as f:
+                json.dump(state, f)
+
+    def load_state(self, path):
+        """Replace the object store with one written by save_state()"""
+        with open(path) as f:
+            state = json.load(f)
+        with self._lock:
+            self._objects = state['objects']
+            self._child_index = defaultdict(dict)
+            for obj in self._objects.values():
+                self._index_child(obj)
+            self._locations = state['locations']
+            self._version = state['version']
+            self._latest_time = state['latest_time']
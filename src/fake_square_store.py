@@ -0,0 +1,227 @@
+"""
+Purpose: Catalog object store of the fake Square client: versions, nesting, tombstones
+Related: fake_square.py (endpoints), fake_square_state.py (seeding, persistence)
+Refactor if: >400 lines OR the fake needs catalog features beyond items/modifiers
+
+Objects are stored flat: an ITEM's variations and a MODIFIER_LIST's
+modifiers are separate objects pointing at their parent, re-attached by
+_compose() on the way out. Every write takes a new, increasing version
+and updated_at; deletes leave tombstones for catalog.search(begin_time).
+Methods here expect the caller to hold _lock.
+"""
+
+import copy
+import random
+import string
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from fake_square_models import FakeApiError
+
+# Square API limits
+SEARCH_ITEMS_PAGE_SIZE = 100
+LIST_PAGE_SIZE = 100
+SEARCH_PAGE_SIZE = 1000
+MAX_BATCH_GET_IDS = 1000
+MAX_BATCH_DELETE_IDS = 200
+MAX_OBJECTS_PER_BATCH = 1000
+MAX_OBJECTS_PER_UPSERT = 10000
+
+# Parent type -> (data field, child list field, child type, child data field, parent ref field)
+NESTED_TYPES = {
+    'ITEM': ('item_data', 'variations', 'ITEM_VARIATION', 'item_variation_data', 'item_id'),
+    'MODIFIER_LIST': ('modifier_list_data', 'modifiers', 'MODIFIER', 'modifier_data', 'modifier_list_id'),
+}
+
+# Child type -> (child data field, parent ref field)
+CHILD_TYPES = {child: (data, ref) for _, _, child, data, ref in NESTED_TYPES.values()}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds').replace('+00:00', 'Z')
+
+
+class FakeCatalogStore:
+    """In-memory catalog objects shared by the fake's endpoints"""
+
+    def __init__(self, seed=0):
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._objects = {}
+        self._child_index = defaultdict(dict)  # parent ID -> {child ID: True} (insertion ordered)
+        self._version = 1_700_000_000_000
+        self._latest_time = _now()
+
+    def _new_id(self, length=24):
+        alphabet = string.ascii_uppercase + string.digits
+        while True:
+            new_id = ''.join(self._random.choice(alphabet) for _ in range(length))
+            if new_id not in self._objects:
+                return new_id
+
+    def _touch(self, obj):
+        self._version += 1
+        obj['version'] = self._version
+        obj['updated_at'] = self._latest_time = _now()
+
+    def _store(self, obj):
+        """Store a flat copy of obj (nested children are stored separately)"""
+        stored = copy.deepcopy(obj)
+        stored['is_deleted'] = False
+        stored.setdefault('present_at_all_locations', True)
+        nested = NESTED_TYPES.get(stored['type'])
+        if nested:
+            stored.get(nested[0], {}).pop(nested[1], None)
+        self._touch(stored)
+        self._objects[stored['id']] = stored
+        self._index_child(stored)
+        return stored
+
+    def _index_child(self, obj):
+        child = CHILD_TYPES.get(obj['type'])
+        if child:
+            parent_id = (obj.get(child[0]) or {}).get(child[1])
+            if parent_id:
+                self._child_index[parent_id][obj['id']] = True
+
+    def _live(self, object_id):
+        obj = self._objects.get(object_id)
+        return obj if obj is not None and not obj['is_deleted'] else None
+
+    def _children(self, obj):
+        nested = NESTED_TYPES.get(obj['type'])
+        if not nested:
+            return []
+        _, _, _, child_field, parent_field = nested
+        children = (self._objects.get(child_id) for child_id in self._child_index.get(obj['id'], ()))
+        return [child for child in children
+                if child is not None and not child['is_deleted']
+                and child[child_field].get(parent_field) == obj['id']]
+
+    def _compose(self, obj):
+        """Return a response-ready deep copy with nested children re-attached"""
+        result = copy.deepcopy(obj)
+        nested = NESTED_TYPES.get(obj['type'])
+        if nested:
+            result.setdefault(nested[0], {})[nested[1]] = [copy.deepcopy(c) for c in self._children(obj)]
+        return result
+
+    def _related(self, objects):
+        related = {}
+        for obj in objects:
+            item_data = obj.get('item_data') or {}
+            refs = [item_data.get('category_id')] + list(item_data.get('image_ids') or [])
+            for ref in refs:
+                target = self._live(ref) if ref else None
+                if target is not None:
+                    related[ref] = self._compose(target)
+        return list(related.values())
+
+    def _page(self, objects, cursor, limit):
+        start = int(cursor) if cursor else 0
+        end = start + limit
+        return objects[start:end], (str(end) if end < len(objects) else None)
+
+    @staticmethod
+    def _count_objects(objects):
+        total = 0
+        for obj in objects:
+            total += 1
+            nested = NESTED_TYPES.get(obj.get('type'))
+            if nested:
+                total += len((obj.get(nested[0]) or {}).get(nested[1]) or [])
+        return total
+
+    def _upsert(self, batches):
+        """Apply batches atomically; temporary (#) IDs may be referenced anywhere"""
+        flat = []
+        replaced_children = {}  # parent ID -> child IDs sent with it (others get deleted)
+        for batch in batches:
+            for obj in batch.get('objects', []):
+                obj = copy.deepcopy(obj)
+                flat.append(obj)
+                nested = NESTED_TYPES.get(obj['type'])
+                if nested:
+                    data_field, list_field, _, child_field, parent_field = nested
+                    children = (obj.get(data_field) or {}).get(list_field)
+                    if children is None:
+                        continue
+                    replaced_children[obj['id']] = [child['id'] for child in children]
+                    for child in children:
+                        child.setdefault(child_field, {})[parent_field] = obj['id']
+                        flat.append(child)
+
+        # Validate before writing anything
+        for obj in flat:
+            object_id = obj.get('id', '')
+            if object_id.startswith('#'):
+                continue
+            current = self._live(object_id)
+            if current is None:
+                raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'NOT_FOUND',
+                                   f"Object with ID `{object_id}` not found.")
+            if obj.get('version') is not None and obj['version'] != current['version']:
+                raise FakeApiError(400, 'INVALID_REQUEST_ERROR', 'VERSION_MISMATCH',
+                                   f"Object version does not match for object: {object_id}")
+
+        id_mappings = {}
+        for obj in flat:
+            if obj['id'].startswith('#') and obj['id'] not in id_mappings:
+                id_mappings[obj['id']] = self._new_id()
+
+        def resolve(value):
+            if isinstance(value, dict):
+                return {k: resolve(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [resolve(v) for v in value]
+            if isinstance(value, str) and value in id_mappings:
+                return id_mappings[value]
+            return value
+
+        written = {}
+        for obj in flat:
+            obj = resolve(obj)
+            obj.pop('version', None)
+            previous = self._objects.get(obj['id'])
+            if previous is not None:
+                obj.setdefault('created_at', previous.get('created_at'))
+            else:
+                obj['created_at'] = _now()
+            written[obj['id']] = self._store(obj)
+
+        # A variation/modifier sent on its own changes its parent as well (new version and updated_at)
+        parents = {(obj.get(CHILD_TYPES[obj['type']][0]) or {}).get(CHILD_TYPES[obj['type']][1])
+                   for obj in written.values() if obj['type'] in CHILD_TYPES}
+        for parent_id in parents - set(written):
+            parent = self._live(parent_id) if parent_id else None
+            if parent is not None:
+                self._touch(parent)
+
+        # Sending a child list replaces it: drop children that were left out
+        for parent_id, child_ids in replaced_children.items():
+            parent = self._objects[resolve(parent_id)]
+            keep = set(resolve(child_ids))
+            for child in self._children(parent):
+                if child['id'] not in keep:
+                    self._delete(child['id'], self._latest_time)
+
+        top_level = [resolve(obj['id']) for batch in batches for obj in batch.get('objects', [])]
+        return {
+            'objects': [self._compose(written[object_id]) for object_id in top_level],
+            'id_mappings': [{'client_object_id': k, 'object_id': v} for k, v in id_mappings.items()],
+            'updated_at': self._latest_time,
+        }
+
+    def _delete(self, object_id, deleted_at):
+        obj = self._live(object_id)
+        if obj is None:
+            return []
+        deleted = []
+        for child in self._children(obj):
+            deleted.extend(self._delete(child['id'], deleted_at))
+        self._touch(obj)
+        obj['is_deleted'] = True
+        obj['updated_at'] = self._latest_time = deleted_at
+        deleted.append(object_id)
+        return deleted
@@ -0,0 +1,321 @@
+"""
+Purpose: Precomputed static menu feed (JSON + gzip/brotli + ETag) per environment and location
+Related: schema_utils.py (menu_changes counter), daemon_utils.py ('feed' job)
+Refactor if: >400 lines OR the frontend needs per-location prices/availability
+
+The feed is one denormalized document built from square_catalog.db only
+(never Square): categories with their items, each item with its image
+URL, variations and modifier lists.
+
+    data/feeds/<env>/all.json              every location
+    data/feeds/<env>/<location ID>.json    same menu + the location's details
+    ...json.gz / ...json.br                precompressed (.br when `brotli` is installed)
+    data/feeds/<env>/manifest.json         ETags, sizes and the change counter they were built at
+
+Regeneration is driven by get_menu_change_counter(), which
+triggers bump on every write to the menu tables: when it has not moved
+since the manifest was written, generate_feeds() returns after one
+SELECT. When it has, the menu is rebuilt, and files are only rewritten
+when their content hash (the ETag) changed. The ETag is the same for
+every encoding; servers send `Vary: Accept-Encoding` with it.
+
+Usage:
+    python src/feed_utils.py                 # SQUARE_ENVIRONMENT
+    python src/feed_utils.py production --force
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # .br files are skipped
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Encoding -> file suffix after .json
+SUFFIXES = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+
+ALL_LOCATIONS = 'all'
+
+
+def feeds_dir(environment):
+    """Feeds live next to the database (data/feeds/<env>/ by default)"""
+    import db_utils
+    return Path(db_utils.DB_PATH).parent / 'feeds' / environment
+
+
+def feed_path(environment, key=ALL_LOCATIONS, encoding='identity'):
+    return feeds_dir(environment) / f"{key}.json{SUFFIXES[encoding]}"
+
+
+def encodings():
+    """Encodings written/served, best first"""
+    return (['br'] if brotli else []) + ['gzip', 'identity']
+
+
+def build_menu(conn, environment):
+    """
+    Denormalized menu from the database: categories -> items -> variations/modifier lists.
+
+    Args:
+        conn: Open sqlite3 connection (row_factory=sqlite3.Row)
+        environment: 'sandbox' or 'production'
+
+    Returns:
+        list: [{'id', 'name', 'description', 'items': [{'id', 'name', 'description',
+               'price_cents', 'image_url', 'variations', 'modifier_lists'}]}]
+               in name order; items without a category come last under id None
+    """
+    variations = {}
+    for row in conn.execute('''
+        SELECT item_id, square_id, name, price_cents
+        FROM item_variations
+        WHERE environment=?
+        ORDER BY item_id, price_cents, name
+    ''', (environment,)):
+        variations.setdefault(row['item_id'], []).append(
+            {'id': row['square_id'], 'name': row['name'], 'price_cents': row['price_cents']})
+
+    modifier_lists = {}
+    for row in conn.execute('''
+        SELECT l.id, l.square_id, l.name, l.selection_type,
+               m.square_id AS modifier_id, m.name AS modifier_name, m.price_cents
+        FROM modifier_lists l
+        LEFT JOIN modifiers m ON m.modifier_list_id = l.id
+        WHERE l.environment=?
+        ORDER BY l.name, m.id
+    ''', (environment,)):
+        modifier_list = modifier_lists.setdefault(row['id'], {
+            'id': row['square_id'], 'name': row['name'],
+            'selection_type': row['selection_type'], 'modifiers': []})
+        if row['modifier_id']:
+            modifier_list['modifiers'].append(
+                {'id': row['modifier_id'], 'name': row['modifier_name'], 'price_cents': row['price_cents']})
+
+    item_lists = {}
+    for row in conn.execute('''
+        SELECT iml.item_id, iml.modifier_list_id
+        FROM item_modifier_lists iml
+        JOIN modifier_lists l ON l.id = iml.modifier_list_id
+        WHERE l.environment=?
+        ORDER BY l.name
+    ''', (environment,)):
+        item_lists.setdefault(row['item_id'], []).append(modifier_lists[row['modifier_list_id']])
+
+    categories = {}
+    for row in conn.execute('''
+        SELECT c.id, c.square_id, c.name, c.description
+        FROM categories c
+        WHERE c.environment=?
+        ORDER BY c.name
+    ''', (environment,)):
+        categories[row['id']] = {'id': row['square_id'], 'name': row['name'],
+                                 'description': row['description'], 'items': []}
+    uncategorized = {'id': None, 'name': None, 'description': None, 'items': []}
+
+    for row in conn.execute('''
+        SELECT m.id, m.square_id, m.name, m.description, m.price_cents, m.category_id,
+               i.source_url AS image_url
+        FROM menu_items m
+        LEFT JOIN images i ON i.id = m.image_id
+        WHERE m.environment=?
+        ORDER BY m.name
+    ''', (environment,)):
+        categories.get(row['category_id'], uncategorized)['items'].append({
+            'id': row['square_id'],
+            'name': row['name'],
+            'description': row['description'],
+            'price_cents': row['price_cents'],
+            'image_url': row['image_url'],
+            'variations': variations.get(row['id'], []),
+            'modifier_lists': item_lists.get(row['id'], []),
+        })
+
+    menu = [category for category in categories.values() if category['items']]
+    if uncategorized['items']:
+        menu.append(uncategorized)
+    return menu
+
+
+def get_locations(conn, environment):
+    return [{'id': row['square_id'], 'name': row['name'], 'store_number': row['store_number'],
+             'address': row['address'], 'phone': row['phone']}
+            for row in conn.execute('''
+                SELECT square_id, name, store_number, address, phone
+                FROM locations WHERE environment=? ORDER BY name
+            ''', (environment,))]
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def render_feeds(environment, categories, locations):
+    """
+    Feed bodies (UTF-8 JSON) keyed by ALL_LOCATIONS / location ID.
+
+    The categories are serialized once and spliced into every location's
+    document, so per-location feeds cost a copy, not another json.dumps.
+    """
+    menu = _dumps(categories)
+    head = f'{{"environment":{_dumps(environment)},"location":'
+    bodies = {ALL_LOCATIONS: f'{head}null,"categories":{menu}}}'.encode('utf-8')}
+    for location in locations:
+        bodies[location['id']] = f'{head}{_dumps(location)},"categories":{menu}}}'.encode('utf-8')
+    return bodies
+
+
+def etag(body):
+    """Strong ETag from the content hash"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def compress(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)  # mtime=0: same bytes, same file
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+def _write(path, data):
+    """Write atomically: readers see the old file or the new one, never half"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(environment):
+    """manifest.json of an environment's feeds, or None before the first run"""
+    try:
+        return json.loads((feeds_dir(environment) / 'manifest.json').read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_menu_change_counter(environment, conn=None):
+    """
+    Number of changes to the menu tables (schema_utils.MENU_TABLES) of an environment.
+
+    Maintained by triggers, so it moves with every insert, update and delete
+    whichever code path made it. 0 when nothing was ever written.
+    """
+    from db_utils import get_db
+
+    if conn is not None:
+        row = conn.execute('SELECT counter FROM menu_changes WHERE environment=?', (environment,)).fetchone()
+        return row[0] if row else 0
+    with get_db() as conn:
+        return get_menu_change_counter(environment, conn)
+
+
+def _up_to_date(environment, manifest, counter):
+    return (manifest is not None
+            and manifest.get('change_counter') == counter
+            and manifest.get('encodings') == encodings()
+            and all(feed_path(environment, key, encoding).exists()
+                    for key in manifest.get('feeds', {}) for encoding in manifest['encodings']))
+
+
+def generate_feeds(environment, force=False):
+    """
+    Regenerate the environment's feeds if the menu tables changed.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        force: Rebuild even when the change counter has not moved
+
+    Returns:
+        dict: {'change_counter', 'regenerated', 'written', 'unchanged', 'removed', 'feeds'}
+    """
+    from db_utils import get_db
+
+    manifest = load_manifest(environment)
+    with get_db() as conn:
+        # Read before the menu: a write during the build moves it again and the next run catches up
+        counter = get_menu_change_counter(environment, conn)
+        stats = {'change_counter': counter, 'regenerated': False, 'written': 0, 'unchanged': 0, 'removed': 0}
+        if not force and _up_to_date(environment, manifest, counter):
+            stats['feeds'] = manifest['feeds']
+            return stats
+
+        categories = build_menu(conn, environment)
+        locations = get_locations(conn, environment)
+
+    bodies = render_feeds(environment, categories, locations)
+    previous = (manifest or {}).get('feeds', {}) if (manifest or {}).get('encodings') == encodings() else {}
+    directory = feeds_dir(environment)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    feeds = {}
+    for key, body in bodies.items():
+        tag = etag(body)
+        if not force and previous.get(key, {}).get('etag') == tag and all(
+                feed_path(environment, key, encoding).exists() for encoding in encodings()):
+            feeds[key] = previous[key]
+            stats['unchanged'] += 1
+            continue
+
+        sizes = {}
+        for encoding in encodings():
+            data = compress(body, encoding)
+            _write(feed_path(environment, key, encoding), data)
+            sizes[encoding] = len(data)
+        feeds[key] = {'etag': tag, 'bytes': sizes, 'items': sum(len(c['items']) for c in categories)}
+        stats['written'] += 1
+
+    for key in set((manifest or {}).get('feeds', {})) - set(feeds):
+        for encoding in SUFFIXES:
+            feed_path(environment, key, encoding).unlink(missing_ok=True)
+        stats['removed'] += 1
+
+    manifest = {
+        'environment': environment,
+        'change_counter': counter,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'encodings': encodings(),
+        'feeds': feeds,
+    }
+    _write(directory / 'manifest.json', json.dumps(manifest, indent=2).encode('utf-8'))
+    stats.update(regenerated=True, feeds=feeds)
+    return stats
+
+
+def print_feed_stats(environment, stats):
+    if not stats['regenerated']:
+        print(f"✅ Menu feeds for {environment.upper()} are up to date (change counter {stats['change_counter']})")
+        return
+    print(f"🍽️  Menu feeds for {environment.upper()} (change counter {stats['change_counter']}): "
+          f"{stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed")
+    for key, feed in sorted(stats['feeds'].items()):
+        sizes = ', '.join(f"{encoding} {size / 1024:.1f} KB" for encoding, size in feed['bytes'].items())
+        print(f"   {key}: {feed['items']} items, ETag {feed['etag']} ({sizes})")
+    if brotli is None:
+        print("   (install `brotli` for .br files)")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write the static menu feeds from the database")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if nothing changed")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+
+    environment = args.environment or get_environment()
+    print_feed_stats(environment, generate_feeds(environment, force=args.force))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -4,12 +4,17 @@ Related: catalog_utils.py, db_utils.py
 Refactor if: >400 lines OR handling multiple image sources
 """
 
+from __future__ import annotations
+
 import os
-import requests
+import hashlib
 from pathlib import Path
-from square import Square
+from typing import TYPE_CHECKING
 import mimetypes
 
+if TYPE_CHECKING:
+    from square import Square  # Annotations only - the SDK is imported by client_utils
+
 # Get project root and set images directory
 PROJECT_ROOT = Path(__file__).parent.parent
 IMAGES_DIR = PROJECT_ROOT / 'data' / 'images'
@@ -51,6 +56,8 @@ def download_image(url, item_name):
     try:
         print(f"   ⬇️  Downloading: {url[:60]}...")
 
+        import requests  # Deferred: only needed when an image is actually fetched
+
         response = requests.get(url, timeout=30, stream=True)
         response.raise_for_status()
 
@@ -66,6 +73,15 @@ def download_image(url, item_name):
         return None
 
 
+def file_content_hash(local_path):
+    """Return the SHA-256 hex digest of a local file"""
+    digest = hashlib.sha256()
+    with open(local_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def upload_image_to_square(client: Square, local_path, item_name):
     """
     Upload image to Square Catalog.
@@ -76,11 +92,11 @@ def upload_image_to_square(client: Square, local_path, item_name):
         item_name: Name of menu item (for image caption)
 
     Returns:
-        str: Square image ID, or None if upload failed
+        tuple: (Square image ID, version), or (None, None) if upload failed
     """
     if not os.path.exists(local_path):
         print(f"   ❌ Image file not found: {local_path}")
-        return None
+        return (None, None)
 
     try:
         # Detect MIME type
@@ -111,21 +127,21 @@ def upload_image_to_square(client: Square, local_path, item_name):
 
         if hasattr(response, 'errors') and response.errors:
             print(f"   ❌ Upload failed: {response.errors[0].detail}")
-            return None
+            return (None, None)
 
         if hasattr(response, 'image') and response.image:
             image_id = response.image.id
             print(f"   ✅ Uploaded: {image_id}")
-            return image_id
+            return (image_id, response.image.version)
 
         print(f"   ❌ Unexpected response from Square")
-        return None
+        return (None, None)
 
     except Exception as e:
         print(f"   ❌ Upload exception: {str(e)}")
         import traceback
         traceback.print_exc()
-        return None
+        return (None, None)
 
 
 def attach_image_to_item(client: Square, item_square_id, image_square_id):
@@ -138,7 +154,7 @@ def attach_image_to_item(client: Square, item_square_id, image_square_id):
         image_square_id: Square ID of the image
 
     Returns:
-        bool: True if successful
+        The updated ITEM catalog object (new item and variation versions), or None if the update failed
     """
     try:
         print(f"   🔗 Attaching image {image_square_id} to item {item_square_id}")
@@ -148,11 +164,11 @@ def attach_image_to_item(client: Square, item_square_id, image_square_id):
 
         if hasattr(item_response, 'errors') and item_response.errors:
             print(f"   ❌ Failed to retrieve item: {item_response.errors[0].detail}")
-            return False
+            return None
 
         if not hasattr(item_response, 'object'):
             print(f"   ❌ Item not found")
-            return False
+            return None
 
         item = item_response.object
 
@@ -201,21 +217,23 @@ def attach_image_to_item(client: Square, item_square_id, image_square_id):
 
         if hasattr(update_response, 'errors') and update_response.errors:
             print(f"   ❌ Failed to attach image: {update_response.errors[0].detail}")
-            return False
+            return None
 
         print(f"   ✅ Image attached successfully")
-        return True
+        updated = [obj for obj in getattr(update_response, 'objects', None) or [] if obj.id == item.id]
+        return updated[0] if updated else item
 
     except Exception as e:
         print(f"   ❌ Exception: {str(e)}")
         import traceback
         traceback.print_exc()
-        return False
+        return None
 
 
 def process_item_image(client: Square, item_name, item_square_id, source_url, environment):
     """
-    Complete image workflow: download, upload to Square, attach to item, save to DB.
+    Complete image workflow: download, upload to Square, attach to item, save to DB
+    (image, item link and the item's new versions).
 
     Args:
         client: Square API client
@@ -227,7 +245,9 @@ def process_item_image(client: Square, item_name, item_square_id, source_url, en
     Returns:
         str: Square image ID, or None if failed
     """
-    from db_utils import save_image
+    from catalog_utils import extract_item_variations
+    from db_utils import (save_image, set_menu_item_image, save_item_variations,
+                          get_image_by_source_url, get_image_by_hash)
 
     if not source_url:
         return None
@@ -239,22 +259,62 @@ def process_item_image(client: Square, item_name, item_square_id, source_url, en
     if not local_path:
         return None
 
-    # Step 2: Upload to Square
-    image_square_id = upload_image_to_square(client, local_path, item_name)
-    if not image_square_id:
-        return None
+    # Step 2: Upload to Square (reuse an already-uploaded image when the
+    # source URL or the file contents match)
+    content_hash = file_content_hash(local_path)
+    image_square_id = (get_image_by_source_url(environment, source_url)
+                       or get_image_by_hash(environment, content_hash))
+
+    image_version = None  # Kept as recorded for a cached image
+    if image_square_id:
+        print(f"   → DB cache: image {image_square_id}")
+    else:
+        image_square_id, image_version = upload_image_to_square(client, local_path, item_name)
+        if not image_square_id:
+            return None
 
-    # Step 3: Attach to item
-    success = attach_image_to_item(client, item_square_id, image_square_id)
-    if not success:
+    # Step 3: Attach to item (new item and variation versions)
+    item = attach_image_to_item(client, item_square_id, image_square_id)
+    if not item:
         return None
 
-    # Step 4: Save to database
-    save_image(environment, image_square_id, source_url, local_path)
+    # Step 4: Save to database, with the versions reconcile compares against
+    save_image(environment, image_square_id, source_url, local_path, content_hash=content_hash,
+               version=image_version)
+    set_menu_item_image(environment, item_square_id, image_square_id, source_url, version=item.version)
+    save_item_variations(environment, item_square_id, extract_item_variations(item))
 
     return image_square_id
 
 
+def sync_item_images(client: Square, environment, menu_items):
+    """
+    Process images for every tracked menu item that has one in the menu feed.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        menu_items: Source feed items ({'name', 'image_url', ...})
+
+    Returns:
+        int: Number of items with an image attached
+    """
+    from db_utils import get_all_items
+
+    image_urls = {item.get('name'): item.get('image_url') for item in menu_items if item.get('image_url')}
+    processed = 0
+
+    for name, item_square_id in get_all_items(environment).items():
+        source_url = image_urls.get(name)
+        if not source_url:
+            continue
+
+        if process_item_image(client, name, item_square_id, source_url, environment):
+            processed += 1
+
+    return processed
+
+
 def cleanup_old_images(days_old=30):
     """Remove downloaded images older than specified days"""
     import time
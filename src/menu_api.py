@@ -0,0 +1,349 @@
+"""
+Purpose: Read-only menu HTTP API (menu, categories, items, search) served from square_catalog.db
+Related: feed_utils.py (menu document, ETag, change counter), search_utils.py
+Refactor if: >400 lines OR it needs writes, auth or a real web framework
+
+Never calls Square. Endpoints (GET/HEAD, JSON):
+
+    /menu[?location=ID]         the feed_utils document (all locations, or one location's)
+    /categories                 [{id, name, description, item_count}]
+    /categories/<id>            a category with its items
+    /items/<id>                 an item with its category
+    /search?q=kale+quin[&limit=20]
+    /health                     change counter and cache statistics (not cached)
+
+Caching: the menu is built once into memory with its lookups, and every
+rendered response is kept with its ETag and compressed bodies (bounded,
+oldest dropped first, so search queries cannot grow it without limit). Both are dropped when
+db_utils' menu_changes counter moves; the counter is read at most every
+`check_interval` seconds, so a change is visible within that time and
+requests in between never touch SQLite. Clients revalidate with
+If-None-Match and get a 304 while the data is unchanged.
+
+One SQLite connection (query_only) serves every thread behind a lock; it
+is only used to read the counter, rebuild, and run uncached searches.
+
+Usage:
+    python src/menu_api.py --port 8080                  # SQUARE_ENVIRONMENT
+    catering-square --env production api --port 8080
+"""
+
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from feed_utils import ALL_LOCATIONS, brotli, build_menu, etag, get_locations, render_feeds
+
+CHECK_INTERVAL = 1.0  # Seconds between change counter reads
+MAX_CACHED_RESPONSES = 4096
+MIN_COMPRESS_BYTES = 512  # Smaller bodies are sent as they are
+GZIP_LEVEL = 6  # Compressed once per cached response, on first request
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+class NotFound(Exception):
+    pass
+
+
+@dataclass
+class CachedResponse:
+    """A rendered JSON body, its ETag and its compressed forms (filled on first use)"""
+    body: bytes
+    etag: str
+    encoded: dict = field(default_factory=dict)
+
+    def encode(self, encoding):
+        if encoding == 'identity' or len(self.body) < MIN_COMPRESS_BYTES:
+            return self.body, 'identity'
+        data = self.encoded.get(encoding)
+        if data is None:
+            if encoding == 'br':
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            self.encoded[encoding] = data
+        return data, encoding
+
+
+def _response(value):
+    body = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return CachedResponse(body, etag(body))
+
+
+class Menu:
+    """One build of the menu, its lookups and the responses rendered from it; replaced whole on a rebuild"""
+
+    def __init__(self, conn, environment):
+        self.categories = build_menu(conn, environment)
+        self.locations = {location['id']: location for location in get_locations(conn, environment)}
+        self.by_id = {category['id']: category for category in self.categories if category['id']}
+        self.items = {item['id']: (item, category) for category in self.categories for item in category['items']}
+        self.responses = OrderedDict()
+
+
+class MenuCache:
+    """
+    In-memory menu of one environment, rebuilt when the database changes.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        check_interval: Seconds between change counter reads (0: every request)
+    """
+
+    def __init__(self, environment, check_interval=CHECK_INTERVAL, max_responses=MAX_CACHED_RESPONSES):
+        from db_utils import connect
+
+        self.environment = environment
+        self.check_interval = check_interval
+        self.max_responses = max_responses
+        self.conn = connect(check_same_thread=False)
+        self.conn.execute('PRAGMA query_only = ON')
+        self.lock = threading.Lock()
+        self.counter = None
+        self.checked_at = float('-inf')
+        self.menu = None
+        self.stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'checks': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def refresh(self):
+        """Rebuild if the change counter moved (read at most every check_interval)"""
+        from feed_utils import get_menu_change_counter
+
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.checked_at < self.check_interval:
+                return  # Another thread just checked
+            counter = get_menu_change_counter(self.environment, self.conn)
+            self.stats['checks'] += 1
+            if counter != self.counter:
+                self.menu = Menu(self.conn, self.environment)
+                self.counter = counter
+                self.stats['rebuilds'] += 1
+            self.checked_at = now
+
+    def get(self, path, query):
+        """
+        Cached response for a request path and parsed query string.
+
+        Raises:
+            NotFound: Unknown endpoint, ID or location
+        """
+        self.refresh()
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        menu = self.menu  # A rebuild swaps it; this request finishes on the one it started with
+        response = menu.responses.get(key)
+        if response is not None:
+            self.stats['hits'] += 1
+            return response
+
+        self.stats['misses'] += 1
+        response = self._render(menu, path, query)
+        with self.lock:
+            menu.responses[key] = response
+            while len(menu.responses) > self.max_responses:
+                menu.responses.popitem(last=False)
+        return response
+
+    def _render(self, menu, path, query):
+        parts = [part for part in path.split('/') if part]
+
+        if parts == ['menu']:
+            location = (query.get('location') or [None])[0]
+            if location is not None and location not in menu.locations:
+                raise NotFound(f"location {location}")
+            locations = [menu.locations[location]] if location else []
+            body = render_feeds(self.environment, menu.categories, locations)[location or ALL_LOCATIONS]
+            return CachedResponse(body, etag(body))
+
+        if parts == ['categories']:
+            return _response([{'id': c['id'], 'name': c['name'], 'description': c['description'],
+                               'item_count': len(c['items'])} for c in menu.categories])
+
+        if len(parts) == 2 and parts[0] == 'categories':
+            if parts[1] not in menu.by_id:
+                raise NotFound(f"category {parts[1]}")
+            return _response(menu.by_id[parts[1]])
+
+        if len(parts) == 2 and parts[0] == 'items':
+            if parts[1] not in menu.items:
+                raise NotFound(f"item {parts[1]}")
+            item, category = menu.items[parts[1]]
+            return _response(dict(item, category={'id': category['id'], 'name': category['name']}))
+
+        if parts == ['search']:
+            from search_utils import search_menu
+
+            try:
+                limit = min(int((query.get('limit') or [SEARCH_LIMIT])[0]), MAX_SEARCH_LIMIT)
+            except ValueError:
+                limit = SEARCH_LIMIT
+            with self.lock:
+                results = search_menu(self.environment, (query.get('q') or [''])[0], limit, self.conn)
+            return _response([dict(result, rank=round(result['rank'], 4)) for result in results])
+
+        raise NotFound(path)
+
+
+def _etag_matches(header, tag):
+    """If-None-Match: '*', or a comma-separated list of (possibly weak) ETags"""
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == tag for candidate in candidates)
+
+
+def _accepted_encoding(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        quality = params.replace(' ', '').partition('q=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue  # 'gzip;q=0' refuses gzip
+        except ValueError:
+            pass
+        accepted.add(name.strip())
+    if brotli and 'br' in accepted:
+        return 'br'
+    return 'gzip' if 'gzip' in accepted else 'identity'
+
+
+class MenuHandler(BaseHTTPRequestHandler):
+    """GET/HEAD only; keep-alive (HTTP/1.1) so clients reuse connections"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes: without TCP_NODELAY the body waits for a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        cache = self.server.cache
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/health':
+            cache.refresh()
+            return self._reply(200, _response({'environment': cache.environment, 'change_counter': cache.counter,
+                                               'cached_responses': len(cache.menu.responses), **cache.stats}),
+                               send_body, cache_control='no-store')
+        try:
+            response = cache.get(path, parse_qs(url.query))
+        except NotFound as e:
+            return self._reply(404, _response({'error': f"not found: {e}"}), send_body)
+
+        if _etag_matches(self.headers.get('If-None-Match'), response.etag):
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', response.etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        self._reply(200, response, send_body)
+
+    def _reply(self, status, response, send_body, cache_control='no-cache'):
+        data, encoding = response.encode(_accepted_encoding(self.headers.get('Accept-Encoding')))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 200:
+            self.send_header('ETag', response.etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(environment, host='127.0.0.1', port=8080, check_interval=CHECK_INTERVAL, verbose=False):
+    """
+    Build (but do not start) the menu API server.
+
+    Returns:
+        ThreadingHTTPServer with .cache (MenuCache); port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((host, port), MenuHandler)
+    server.daemon_threads = True
+    server.cache = MenuCache(environment, check_interval)
+    server.not_modified = 0
+    server.verbose = verbose
+    return server
+
+
+def serve(environment, host='127.0.0.1', port=8080, check_interval=CHECK_INTERVAL, verbose=False):
+    """Serve the menu API until interrupted; returns the cache statistics"""
+    from db_utils import get_db
+    from schema_utils import MIGRATIONS, get_schema_version
+
+    with get_db() as conn:
+        if get_schema_version(conn) < MIGRATIONS[-1][0]:
+            print("❌ The database schema is out of date: run `catering-square-db migrate` first")
+            return None
+
+    server = create_server(environment, host, port, check_interval, verbose)
+    server.cache.refresh()
+    print(f"🍽️  Menu API for {environment.upper()} on http://{host}:{server.server_address[1]}/menu "
+          f"({len(server.cache.menu.items)} items, "
+          f"change counter {server.cache.counter}, checked every {check_interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping")
+    finally:
+        server.server_close()
+        server.cache.close()
+
+    stats = dict(server.cache.stats, not_modified=server.not_modified)
+    print(f"📊 {stats['hits']} cache hit(s), {stats['misses']} miss(es), {stats['rebuilds']} rebuild(s), "
+          f"{stats['not_modified']} not modified")
+    return stats
+
+
+def add_server_arguments(parser):
+    """--host/--port/--check-interval/--verbose, shared with cli.py"""
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Port (default: 8080)")
+    parser.add_argument('--check-interval', type=float, default=CHECK_INTERVAL,
+                        help=f"Seconds between database change checks (default: {CHECK_INTERVAL:g})")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Read-only menu HTTP API served from the database")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+
+    environment = args.environment or get_environment()
+    stats = serve(environment, args.host, args.port, args.check_interval, args.verbose)
+    return 0 if stats is not None else 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Purpose: Load the Just Salad source menu feed used to build the catalog
+Related: create_catalog_safe.py, create_catalog_with_images.py, docs/public-data-endpoints.md
+Refactor if: >300 lines OR adding non-menu data sources
+"""
+
+import os
+import json
+
+# Saved copy of https://cdn1.justsalad.com/public/menu.json (may include HTTP headers)
+DEFAULT_MENU_PATH = '/tmp/menu.json'
+
+
+def get_menu_path():
+    """Get the menu feed path (MENU_JSON_PATH overrides the default)"""
+    return os.getenv('MENU_JSON_PATH', DEFAULT_MENU_PATH)
+
+
+def load_menu_data(path=None):
+    """
+    Load the menu feed, tolerating a raw HTTP response saved by curl -i.
+
+    Args:
+        path: Menu JSON path (default: get_menu_path())
+
+    Returns:
+        dict: Parsed feed with a 'menu_items' list
+    """
+    with open(path or get_menu_path(), 'r') as f:
+        content = f.read()
+
+    if content.startswith('HTTP/'):
+        json_start = max(content.find('{'), content.find('['))
+        if json_start != -1:
+            content = content[json_start:]
+
+    return json.loads(content)
+
+
+# Categories and items we publish to Square (names, categories, prices)
+MENU_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'menu_config.json')
+
+
+def load_menu_config(path=None):
+    """
+    Load the desired catalog configuration.
+
+    Args:
+        path: Config path (default: MENU_CONFIG_PATH env var or data/menu_config.json)
+
+    Returns:
+        dict: {'categories': [{'name', 'description'}],
+               'items': [{'name', 'category', 'price', optional 'description',
+                          'source_category_id', 'variations'}],
+               'modifier_lists': [{'name', 'selection_type', 'modifiers', 'attach_to'}]}
+               (modifier_lists is optional, see modifier_utils.py)
+    """
+    with open(path or os.getenv('MENU_CONFIG_PATH', MENU_CONFIG_PATH), 'r') as f:
+        return json.load(f)
+
+
+def resolve_menu_items(items_config, menu_data):
+    """
+    Combine configured items with the source feed.
+
+    Items with a source_category_id take their description and image URL
+    from the feed entry of the same name; the rest use the configured
+    description. Single-price items get one 'Regular' variation.
+
+    Args:
+        items_config: 'items' list from load_menu_config()
+        menu_data: Feed from load_menu_data() (may be None)
+
+    Returns:
+        list: [{'name', 'category', 'description', 'source_url', 'variations'}]
+    """
+    feed = {item.get('name'): item for item in (menu_data or {}).get('menu_items', [])}
+    resolved = []
+
+    for item_config in items_config:
+        description = item_config.get('description', '')
+        image_url = None
+
+        if 'source_category_id' in item_config and item_config['name'] in feed:
+            source = feed[item_config['name']]
+            description = source.get('description', description)
+            image_url = source.get('image_url')
+
+        resolved.append({
+            'name': item_config['name'],
+            'category': item_config['category'],
+            'description': description,
+            'source_url': image_url,
+            # Multi-variation items (sizes, per-person tiers) list them explicitly
+            'variations': item_config.get('variations') or [
+                {'name': 'Regular', 'price_cents': item_config['price']}
+            ]
+        })
+
+    return resolved
@@ -0,0 +1,366 @@
+"""
+Purpose: Create shared modifier lists (BYO toppings/dressings) and attach them to items in one batch
+Related: data/menu_config.json (modifier_lists), catalog_utils.py (batch limits), schema_utils.py (tables)
+Refactor if: >400 lines OR modifier lists need per-location pricing or min/max selection rules
+
+menu_config.json lists the shared modifier lists and the items they go on:
+
+    "modifier_lists": [
+      {"name": "BYO Additional Toppings", "selection_type": "MULTIPLE",
+       "modifiers": [{"name": "Avocado"}, {"name": "Grilled Chicken", "price": 300}],
+       "attach_to": {"category": "Build Your Own"}}      # or {"items": [names]}
+    ]
+
+Everything goes out in one batch_upsert call (more only past 10,000
+objects): each new list once, with '#' temporary IDs that the items in
+the same request reference in modifier_list_info. Existing lists are
+matched by normalized name and only extended; modifiers added by hand in
+the dashboard are kept. Items that already carry a list are left alone,
+so a second run sends nothing.
+
+Modifiers without a price have no price_money ("contact for pricing",
+docs/business-rules.md).
+
+Usage:
+    python src/modifier_utils.py                 # SQUARE_ENVIRONMENT
+    python src/modifier_utils.py production --dry-run
+"""
+
+import uuid
+
+from catalog_utils import _chunk_upsert_objects, normalize_name
+from rollback_utils import READ_ONLY_FIELDS
+
+SELECTION_TYPES = ('SINGLE', 'MULTIPLE')
+
+
+def _strip(obj):
+    """Upsert copy of a snapshot object: read-only fields dropped, version kept"""
+    return {k: v for k, v in obj.items() if k not in READ_ONLY_FIELDS or k == 'version'}
+
+
+def _modifier_data(config):
+    data = {'name': config['name']}
+    if config.get('price') is not None:
+        data['price_money'] = {'amount': int(config['price']), 'currency': config.get('currency', 'USD')}
+    return data
+
+
+def _list_items(list_config, items, item_categories):
+    """Live items a configured list is attached to"""
+    target = list_config.get('attach_to') or {}
+    if 'items' in target:
+        names = {normalize_name(name) for name in target['items']}
+        return [item for key, item in items.items() if key in names]
+    category = normalize_name(target.get('category'))
+    return [item for key, item in items.items() if category in item_categories[key]]
+
+
+def compute_modifier_changes(objects, lists_config):
+    """
+    Work out the upserts that create/extend the configured lists and attach them.
+
+    Args:
+        objects: Catalog objects (API shape), e.g. snapshot.objects.values()
+        lists_config: menu_config.json 'modifier_lists'
+
+    Returns:
+        dict: {'upserts': [objects], 'lists': [{'name', 'id', 'action', 'new_modifiers', 'items'}],
+               'attached': n, 'missing_items': [names]}
+    """
+    objects = [obj for obj in objects if not obj.get('is_deleted')]
+    categories = {obj['id']: normalize_name((obj.get('category_data') or {}).get('name'))
+                  for obj in objects if obj.get('type') == 'CATEGORY'}
+    live_lists = {normalize_name((obj.get('modifier_list_data') or {}).get('name')): obj
+                  for obj in objects if obj.get('type') == 'MODIFIER_LIST'}
+
+    items, item_categories = {}, {}
+    for obj in sorted((obj for obj in objects if obj.get('type') == 'ITEM'), key=lambda obj: obj['id']):
+        data = obj.get('item_data') or {}
+        key = normalize_name(data.get('name'))
+        items.setdefault(key, obj)
+        category_ids = [c.get('id') for c in data.get('categories') or []] or [data.get('category_id')]
+        item_categories.setdefault(key, {categories.get(cid) for cid in category_ids})
+
+    upserts, summaries, missing = [], [], []
+    item_updates = {}  # item ID -> upsert copy, so an item gets every list in one object
+
+    for list_config in lists_config:
+        name = list_config['name']
+        selection_type = list_config.get('selection_type', 'MULTIPLE')
+        if selection_type not in SELECTION_TYPES:
+            raise ValueError(f"Modifier list {name}: selection_type must be one of {', '.join(SELECTION_TYPES)}")
+
+        live = live_lists.get(normalize_name(name))
+        if live is None:
+            list_id = f"#modifier-list-{len(summaries)}"
+            modifiers = []
+            action = 'create'
+        else:
+            list_id = live['id']
+            modifiers = list((live.get('modifier_list_data') or {}).get('modifiers') or [])
+            action = 'unchanged'
+
+        have = {normalize_name((m.get('modifier_data') or {}).get('name')) for m in modifiers}
+        new_modifiers = [m for m in list_config.get('modifiers') or [] if normalize_name(m['name']) not in have]
+        if live is None or new_modifiers:
+            data = dict((live or {}).get('modifier_list_data') or {}, name=name, selection_type=selection_type)
+            data['modifiers'] = [_strip(m) for m in modifiers] + [
+                {'type': 'MODIFIER', 'id': f"#modifier-list-{len(summaries)}-modifier-{i}",
+                 'modifier_data': _modifier_data(m)}
+                for i, m in enumerate(new_modifiers)]
+            obj = _strip(live) if live else {'type': 'MODIFIER_LIST', 'id': list_id}
+            obj['modifier_list_data'] = data
+            upserts.append(obj)
+            if live is not None:
+                action = 'extend'
+
+        targets = _list_items(list_config, items, item_categories)
+        wanted = list_config.get('attach_to', {}).get('items') or []
+        found = {normalize_name((item.get('item_data') or {}).get('name')) for item in targets}
+        missing.extend(n for n in wanted if normalize_name(n) not in found)
+
+        attached = 0
+        for item in targets:
+            update = item_updates.get(item['id'])
+            info = ((update or item).get('item_data') or {}).get('modifier_list_info') or []
+            if any(entry.get('modifier_list_id') == list_id for entry in info):
+                continue
+            if update is None:
+                update = item_updates[item['id']] = _strip(item)
+                update['item_data'] = dict(item['item_data'])
+                update['item_data']['variations'] = [_strip(v) for v in item['item_data'].get('variations') or []]
+            update['item_data']['modifier_list_info'] = info + [{'modifier_list_id': list_id, 'enabled': True}]
+            attached += 1
+
+        summaries.append({'name': name, 'id': list_id, 'action': action,
+                          'new_modifiers': [m['name'] for m in new_modifiers],
+                          'items': [item['id'] for item in targets], 'attached': attached})
+
+    upserts.extend(item_updates.values())
+    return {'upserts': upserts, 'lists': summaries, 'missing_items': missing,
+            'attached': sum(s['attached'] for s in summaries)}
+
+
+def apply_modifier_changes(client, plan):
+    """
+    Send the upserts; temporary IDs resolve across every object of a call.
+
+    Returns:
+        dict: {'upserted': n, 'calls': n, 'id_mappings': {temporary ID: Square ID}}
+    """
+    from catalog_utils import replace_ids
+
+    stats = {'upserted': 0, 'calls': 0, 'id_mappings': {}}
+    for batches in _chunk_upsert_objects(plan['upserts']):
+        if stats['id_mappings']:
+            batches = replace_ids(batches, stats['id_mappings'])
+        response = client.catalog.batch_upsert(idempotency_key=str(uuid.uuid4()), batches=batches)
+        stats['calls'] += 1
+
+        if getattr(response, 'errors', None):
+            raise Exception(f"Modifier list upsert failed: {response.errors[0].detail}")
+
+        for mapping in getattr(response, 'id_mappings', None) or []:
+            stats['id_mappings'][mapping.client_object_id] = mapping.object_id
+        stats['upserted'] += sum(len(batch['objects']) for batch in batches)
+    return stats
+
+
+def tracked_lists(objects, lists_config):
+    """
+    Rows for save_modifier_lists() from an up-to-date snapshot.
+
+    Items are linked by what Square says (modifier_list_info), not by the
+    config, so links added in the dashboard are tracked as well.
+    """
+    objects = [obj for obj in objects if not obj.get('is_deleted')]
+    by_name = {normalize_name((obj.get('modifier_list_data') or {}).get('name')): obj
+               for obj in objects if obj.get('type') == 'MODIFIER_LIST'}
+
+    rows = []
+    for list_config in lists_config:
+        live = by_name.get(normalize_name(list_config['name']))
+        if live is None:
+            continue
+        data = live.get('modifier_list_data') or {}
+        rows.append({
+            'square_id': live['id'],
+            'name': list_config['name'],
+            'selection_type': data.get('selection_type'),
+            'version': live.get('version'),
+            'modifiers': [{'square_id': m['id'], 'name': (m.get('modifier_data') or {}).get('name'),
+                           'price_cents': ((m.get('modifier_data') or {}).get('price_money') or {}).get('amount'),
+                           'version': m.get('version')} for m in data.get('modifiers') or []],
+            'item_ids': [obj['id'] for obj in objects if obj.get('type') == 'ITEM' and any(
+                entry.get('modifier_list_id') == live['id']
+                for entry in (obj.get('item_data') or {}).get('modifier_list_info') or [])],
+        })
+    return rows
+
+
+def save_modifier_lists(environment, modifier_lists):
+    """
+    Save modifier lists, their modifiers and item links in one transaction.
+
+    A list's modifiers and item links are replaced by the ones given;
+    items not tracked in menu_items are skipped.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        modifier_lists: Dicts with square_id, name, selection_type, version,
+                        modifiers ([{'square_id', 'name', 'price_cents', 'version'}])
+                        and item_ids ([item Square IDs])
+
+    Returns:
+        dict: {'lists': n, 'modifiers': n, 'links': n}
+    """
+    from db_utils import get_db
+
+    stats = {'lists': 0, 'modifiers': 0, 'links': 0}
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for modifier_list in modifier_lists:
+            cursor.execute('''
+                INSERT INTO modifier_lists (environment, square_id, name, selection_type, square_version)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(environment, name)
+                DO UPDATE SET
+                    square_id=excluded.square_id,
+                    selection_type=excluded.selection_type,
+                    square_version=excluded.square_version,
+                    updated_at=CURRENT_TIMESTAMP
+            ''', (environment, modifier_list['square_id'], modifier_list['name'],
+                  modifier_list.get('selection_type'), modifier_list.get('version')))
+            cursor.execute('SELECT id FROM modifier_lists WHERE environment=? AND name=?',
+                           (environment, modifier_list['name']))
+            list_id = cursor.fetchone()['id']
+            stats['lists'] += 1
+
+            cursor.execute('DELETE FROM modifiers WHERE modifier_list_id=?', (list_id,))
+            cursor.executemany('''
+                INSERT OR REPLACE INTO modifiers
+                    (environment, square_id, modifier_list_id, name, price_cents, square_version)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(environment, m['square_id'], list_id, m['name'], m.get('price_cents'), m.get('version'))
+                  for m in modifier_list['modifiers']])
+            stats['modifiers'] += len(modifier_list['modifiers'])
+
+            cursor.execute('DELETE FROM item_modifier_lists WHERE modifier_list_id=?', (list_id,))
+            item_ids = list(modifier_list['item_ids'])
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO item_modifier_lists (item_id, modifier_list_id)
+                    SELECT id, ? FROM menu_items
+                    WHERE environment=? AND square_id IN ({', '.join('?' * len(chunk))})
+                ''', [list_id, environment, *chunk])
+                stats['links'] += cursor.rowcount
+
+    return stats
+
+
+def get_item_modifier_lists(environment, item_name):
+    """Names of the modifier lists linked to a menu item"""
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT l.name
+            FROM item_modifier_lists iml
+            JOIN menu_items m ON m.id = iml.item_id
+            JOIN modifier_lists l ON l.id = iml.modifier_list_id
+            WHERE m.environment=? AND m.name=?
+            ORDER BY l.name
+        ''', (environment, item_name))
+        return [row['name'] for row in cursor.fetchall()]
+
+
+def print_modifier_plan(plan, environment):
+    print(f"🧩 Modifier lists for {environment.upper()}")
+    print("-" * 70)
+    symbols = {'create': '+', 'extend': '~', 'unchanged': '='}
+    for summary in plan['lists']:
+        extra = f", +{len(summary['new_modifiers'])} modifier(s)" if summary['action'] == 'extend' else ""
+        print(f"  {symbols[summary['action']]} {summary['name']}: {len(summary['items'])} item(s), "
+              f"{summary['attached']} to attach{extra}")
+    for name in plan['missing_items']:
+        print(f"  ⚠️  Item not in the catalog: {name}")
+    print("-" * 70)
+    print(f"Modifier lists: {len(plan['upserts'])} object(s) to upsert in "
+          f"{len(_chunk_upsert_objects(plan['upserts']))} call(s)")
+
+
+def sync_modifier_lists(client, environment, lists_config=None, dry_run=False, confirm=True):
+    """
+    Create/extend the configured modifier lists, attach them, and track them in SQLite.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        lists_config: Default: 'modifier_lists' of data/menu_config.json
+        dry_run: Only print the plan
+        confirm: Ask before changing production
+
+    Returns:
+        dict: The plan, plus 'applied' and 'saved' stats when changes were sent
+    """
+    from menu_utils import load_menu_config
+    from snapshot_utils import sync_snapshot
+
+    if lists_config is None:
+        lists_config = load_menu_config().get('modifier_lists') or []
+
+    snapshot = sync_snapshot(client, environment)
+    plan = compute_modifier_changes(snapshot.objects.values(), lists_config)
+    print_modifier_plan(plan, environment)
+
+    if plan['upserts'] and not dry_run:
+        if confirm and environment == 'production':
+            response = input("⚠️  You are changing PRODUCTION modifier lists. Type 'yes' to continue: ")
+            if response.lower() != 'yes':
+                print("❌ Aborted.")
+                return plan
+
+        plan['applied'] = stats = apply_modifier_changes(client, plan)
+        print(f"✅ Upserted {stats['upserted']} object(s) in {stats['calls']} call(s)")
+        snapshot = sync_snapshot(client, environment, verbose=False)
+    elif dry_run:
+        return plan
+
+    rows = tracked_lists(snapshot.objects.values(), lists_config)
+    plan['saved'] = saved = save_modifier_lists(environment, rows)
+    print(f"📊 Tracked {saved['lists']} list(s), {saved['modifiers']} modifier(s), {saved['links']} item link(s)")
+    untracked = sum(len(row['item_ids']) for row in rows) - saved['links']
+    if untracked:
+        print(f"   {untracked} link(s) to items not in menu_items; `catering-square reconcile` adds them")
+    return plan
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create and attach the modifier lists from menu_config.json")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--dry-run', action='store_true', help="Only show what would change")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    from client_utils import create_square_client
+
+    environment = args.environment or get_environment()
+    try:
+        sync_modifier_lists(create_square_client(environment), environment,
+                            dry_run=args.dry_run, confirm=not args.yes)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
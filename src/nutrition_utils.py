@@ -0,0 +1,207 @@
+"""
+Purpose: Nutrition facts storage and a NumPy column store for menu filtering
+Related: db_utils.py (menu_item_nutrition table), create_catalog_with_images.py
+Refactor if: >400 lines OR adding non-nutrition columns
+"""
+
+import json
+import operator
+
+import numpy as np
+
+from db_utils import get_db
+
+# Numeric nutrition fields carried by the Just Salad menu feed (nutrition_info)
+NUTRITION_COLUMNS = ('calories', 'protein', 'carbohydrates', 'carbon_footprint')
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def save_nutrition(environment, item_square_id, nutrition_info, diets=None):
+    """
+    Save nutrition facts for a menu item already tracked in the database.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        item_square_id: Square ID of the menu item
+        nutrition_info: Dict from the menu feed, e.g. {'calories': 430, 'protein': 36}
+        diets: List of diet tags from the menu feed
+
+    Returns:
+        bool: True if saved, False if the item is not in the database
+    """
+    nutrition_info = nutrition_info or {}
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id FROM menu_items WHERE environment=? AND square_id=?',
+            (environment, item_square_id)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return False
+
+        cursor.execute('''
+            INSERT INTO menu_item_nutrition
+                (item_id, calories, protein, carbohydrates, carbon_footprint, diets)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(item_id)
+            DO UPDATE SET
+                calories=excluded.calories,
+                protein=excluded.protein,
+                carbohydrates=excluded.carbohydrates,
+                carbon_footprint=excluded.carbon_footprint,
+                diets=excluded.diets,
+                updated_at=CURRENT_TIMESTAMP
+        ''', (row['id'], *(nutrition_info.get(col) for col in NUTRITION_COLUMNS),
+              json.dumps(sorted(diets or []))))
+
+        return True
+
+
+class NutritionStore:
+    """
+    In-memory column store of nutrition facts for one environment.
+
+    Each nutrition field is a float64 array (NaN = unknown) and diets are a
+    boolean matrix, so filters are single vectorized passes over the columns.
+
+    Example:
+        >>> store = NutritionStore.from_db('production')
+        >>> store.select(('calories', '<', 500), ('protein', '>', 30),
+        ...              sort_by='carbon_footprint')
+    """
+
+    def __init__(self, square_ids, names, columns, diets):
+        """
+        Args:
+            square_ids: Sequence of menu item Square IDs
+            names: Sequence of menu item names (same order)
+            columns: Dict {column: sequence of numbers or None}
+            diets: Sequence of diet tag lists (same order)
+        """
+        self.square_ids = np.asarray(square_ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.columns = {
+            col: np.array([np.nan if v is None else v for v in columns.get(col, [None] * len(names))],
+                          dtype=np.float64)
+            for col in NUTRITION_COLUMNS
+        }
+
+        self.diet_names = sorted({tag for tags in diets for tag in tags})
+        diet_index = {tag: i for i, tag in enumerate(self.diet_names)}
+        self.diet_matrix = np.zeros((len(names), len(self.diet_names)), dtype=bool)
+        for row, tags in enumerate(diets):
+            for tag in tags:
+                self.diet_matrix[row, diet_index[tag]] = True
+
+    @classmethod
+    def from_db(cls, environment):
+        """Load all nutrition rows for an environment in one query"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT m.square_id, m.name, n.calories, n.protein, n.carbohydrates,
+                       n.carbon_footprint, n.diets
+                FROM menu_item_nutrition n
+                JOIN menu_items m ON m.id = n.item_id
+                WHERE m.environment = ?
+                ORDER BY m.name
+            ''', (environment,))
+            rows = cursor.fetchall()
+
+        return cls(
+            square_ids=[row['square_id'] for row in rows],
+            names=[row['name'] for row in rows],
+            columns={col: [row[col] for row in rows] for col in NUTRITION_COLUMNS},
+            diets=[json.loads(row['diets']) if row['diets'] else [] for row in rows]
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def mask(self, *conditions, diets=None):
+        """
+        Build a boolean row mask.
+
+        Args:
+            conditions: Tuples (column, op, value) with op in <, <=, >, >=, ==, !=.
+                        Rows with an unknown (NaN) value never match.
+            diets: Diet tags every selected row must carry
+
+        Returns:
+            numpy.ndarray: Boolean mask, one entry per item
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        for column, op, value in conditions:
+            if column not in self.columns:
+                raise ValueError(f"Unknown nutrition column: {column}")
+            if op not in _OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+            values = self.columns[column]
+            mask &= _OPERATORS[op](values, value) & ~np.isnan(values)
+
+        for tag in diets or []:
+            if tag not in self.diet_names:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.diet_matrix[:, self.diet_names.index(tag)]
+
+        return mask
+
+    def select(self, *conditions, diets=None, sort_by=None, descending=False, limit=None):
+        """
+        Filter and sort items.
+
+        Args:
+            conditions: Tuples (column, op, value), see mask()
+            diets: Diet tags every selected row must carry
+            sort_by: Nutrition column to sort by (unknown values sort last)
+            descending: Sort high to low
+            limit: Maximum number of rows
+
+        Returns:
+            list: Dicts with square_id, name and every nutrition column
+        """
+        indices = np.flatnonzero(self.mask(*conditions, diets=diets))
+
+        if sort_by:
+            if sort_by not in self.columns:
+                raise ValueError(f"Unknown nutrition column: {sort_by}")
+            keys = self.columns[sort_by][indices]
+            if descending:
+                keys = -keys
+            # NaN sorts last in numpy; stable sort keeps name order for ties
+            indices = indices[np.argsort(keys, kind='stable')]
+
+        if limit is not None:
+            indices = indices[:limit]
+
+        return [self.row(i) for i in indices]
+
+    def row(self, index):
+        """Return one item as a dict (unknown values as None)"""
+        result = {'square_id': self.square_ids[index], 'name': self.names[index]}
+        for col in NUTRITION_COLUMNS:
+            value = self.columns[col][index]
+            result[col] = None if np.isnan(value) else float(value)
+        result['diets'] = [tag for j, tag in enumerate(self.diet_names) if self.diet_matrix[index, j]]
+        return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    env = sys.argv[1] if len(sys.argv) > 1 else 'sandbox'
+    store = NutritionStore.from_db(env)
+    print(f"✅ Loaded nutrition for {len(store)} items ({env})")
+    for item in store.select(sort_by='calories'):
+        print(f"   {item['name']}: {item['calories']} cal, {item['protein']}g protein")
@@ -0,0 +1,286 @@
+"""
+Purpose: Offline dry-run planner - diff the desired menu config against the current catalog
+Related: menu_utils.py (menu config + feed), db_utils.py, cli.py (`catering-square plan`)
+Refactor if: >400 lines OR the plan starts applying changes itself
+
+Never calls Square. The current catalog comes from the local SQLite
+database (default) or a saved JSON catalog: a list of catalog objects,
+{'objects': [...]}, or a FakeSquare state file.
+
+Usage:
+    python src/plan_utils.py sandbox
+    python src/plan_utils.py production --json > plan.json
+    python src/plan_utils.py sandbox --catalog catalog.json --detailed-exitcode
+"""
+
+import json
+
+from menu_utils import load_menu_config, load_menu_data, resolve_menu_items
+
+# Output order: categories before the items that reference them
+TYPE_ORDER = {'CATEGORY': 0, 'ITEM': 1}
+ACTION_ORDER = {'create': 0, 'update': 1, 'delete': 2}
+
+
+def desired_state(config, menu_data=None):
+    """
+    Build the desired catalog from the menu config (and the feed if available).
+
+    Without a feed, descriptions of feed-sourced items are unknown (None)
+    and are not compared.
+
+    Returns:
+        dict: {'categories': {name: {...}}, 'items': {name: {...}}}
+    """
+    categories = {cat['name']: {'description': cat.get('description')} for cat in config['categories']}
+
+    items = {}
+    for item_config, item in zip(config['items'], resolve_menu_items(config['items'], menu_data)):
+        if menu_data is None and 'source_category_id' in item_config:
+            item['description'] = None
+        items[item['name']] = {
+            'category': item['category'],
+            'description': item['description'],
+            'variations': [(v['name'], v.get('price_cents')) for v in item['variations']],
+        }
+
+    return {'categories': categories, 'items': items}
+
+
+def current_from_db(environment):
+    """Read the tracked catalog for an environment from SQLite (three queries)"""
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT square_id, name, description FROM categories WHERE environment=?', (environment,))
+        categories = [{'id': r['square_id'], 'name': r['name'], 'description': r['description']}
+                      for r in cursor.fetchall()]
+
+        cursor.execute('''
+            SELECT m.id, m.square_id, m.name, m.description, m.price_cents, c.name AS category
+            FROM menu_items m
+            LEFT JOIN categories c ON c.id = m.category_id
+            WHERE m.environment = ?
+        ''', (environment,))
+        rows = cursor.fetchall()
+
+        cursor.execute('''
+            SELECT item_id, name, price_cents FROM item_variations
+            WHERE environment = ? ORDER BY item_id, id
+        ''', (environment,))
+        variations = {}
+        for r in cursor.fetchall():
+            variations.setdefault(r['item_id'], []).append((r['name'], r['price_cents']))
+
+    items = []
+    for r in rows:
+        item_variations = variations.get(r['id'])
+        if item_variations is None and r['price_cents'] is not None:
+            # Rows saved before variations were tracked
+            item_variations = [('Regular', r['price_cents'])]
+        items.append({'id': r['square_id'], 'name': r['name'], 'category': r['category'],
+                      'description': r['description'], 'variations': item_variations})
+
+    return {'categories': categories, 'items': items}
+
+
+def current_from_objects(objects):
+    """
+    Read the catalog from Square-shaped object dicts.
+
+    Args:
+        objects: Iterable of catalog objects as returned by the API (dicts)
+
+    Returns:
+        dict: Same shape as current_from_db()
+    """
+    objects = [obj for obj in objects if not obj.get('is_deleted')]
+    category_names = {obj['id']: obj.get('category_data', {}).get('name')
+                      for obj in objects if obj.get('type') == 'CATEGORY'}
+
+    categories, items = [], []
+    for obj in objects:
+        if obj.get('type') == 'CATEGORY':
+            data = obj.get('category_data', {})
+            categories.append({'id': obj['id'], 'name': data.get('name'), 'description': data.get('description')})
+
+        elif obj.get('type') == 'ITEM':
+            data = obj.get('item_data', {})
+            category_id = data.get('category_id') or next(
+                (c.get('id') for c in data.get('categories') or []), None)
+            variations = []
+            for variation in data.get('variations') or []:
+                v = variation.get('item_variation_data', {})
+                variations.append((v.get('name'), (v.get('price_money') or {}).get('amount')))
+            items.append({'id': obj['id'], 'name': data.get('name'), 'category': category_names.get(category_id),
+                          'description': data.get('description'), 'variations': variations})
+
+    return {'categories': categories, 'items': items}
+
+
+def load_catalog_file(path):
+    """Load a saved catalog (object list, {'objects': [...]} or FakeSquare state)"""
+    with open(path) as f:
+        data = json.load(f)
+
+    objects = data.get('objects', data) if isinstance(data, dict) else data
+    if isinstance(objects, dict):
+        objects = objects.values()
+    return current_from_objects(objects)
+
+
+def _field_changes(desired, current, fields):
+    changes = {}
+    for field in fields:
+        want, have = desired.get(field), current.get(field)
+        if want is None:
+            continue  # Unknown (e.g. no feed) - not compared
+        if field == 'description' and not want and not have:
+            continue  # '' and NULL are the same empty description
+        if want != have:
+            changes[field] = {'from': have, 'to': want}
+    return changes
+
+
+def _diff_type(object_type, desired, current, fields):
+    changes, unchanged = [], 0
+    seen = set()
+
+    for obj in current:
+        name = obj['name']
+        if name not in desired:
+            changes.append({'action': 'delete', 'type': object_type, 'name': name, 'id': obj['id']})
+            continue
+        if name in seen:
+            changes.append({'action': 'delete', 'type': object_type, 'name': name, 'id': obj['id'],
+                            'reason': 'duplicate'})
+            continue
+        seen.add(name)
+
+        field_changes = _field_changes(desired[name], obj, fields)
+        if field_changes:
+            changes.append({'action': 'update', 'type': object_type, 'name': name, 'id': obj['id'],
+                            'changes': field_changes})
+        else:
+            unchanged += 1
+
+    for name, spec in desired.items():
+        if name not in seen:
+            changes.append({'action': 'create', 'type': object_type, 'name': name, 'id': None,
+                            'fields': {k: v for k, v in spec.items() if v is not None}})
+
+    return changes, unchanged
+
+
+def compute_plan(desired, current):
+    """
+    Diff desired vs current state.
+
+    Returns:
+        dict: {'summary': {'create', 'update', 'delete', 'unchanged'},
+               'changes': [{'action', 'type', 'name', 'id', 'fields'|'changes'}]}
+    """
+    category_changes, categories_unchanged = _diff_type(
+        'CATEGORY', desired['categories'], current['categories'], ('description',))
+    item_changes, items_unchanged = _diff_type(
+        'ITEM', desired['items'], current['items'], ('category', 'description', 'variations'))
+
+    changes = sorted(category_changes + item_changes,
+                     key=lambda c: (TYPE_ORDER[c['type']], ACTION_ORDER[c['action']], c['name'] or ''))
+
+    summary = {action: sum(1 for c in changes if c['action'] == action) for action in ACTION_ORDER}
+    summary['unchanged'] = categories_unchanged + items_unchanged
+    return {'summary': summary, 'changes': changes}
+
+
+def build_plan(environment, config_path=None, menu_path=None, catalog_path=None):
+    """
+    Plan the changes a sync would make, without any API calls.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        config_path: Menu config (default: data/menu_config.json)
+        menu_path: Source feed (default: get_menu_path(); skipped if missing)
+        catalog_path: Saved catalog JSON instead of the local database
+
+    Returns:
+        dict: compute_plan() result plus 'environment' and 'source'
+    """
+    try:
+        menu_data = load_menu_data(menu_path)
+    except (OSError, ValueError):
+        menu_data = None
+
+    desired = desired_state(load_menu_config(config_path), menu_data)
+    current = load_catalog_file(catalog_path) if catalog_path else current_from_db(environment)
+
+    plan = compute_plan(desired, current)
+    plan['environment'] = environment
+    plan['source'] = catalog_path or 'database'
+    plan['menu_feed'] = menu_data is not None
+    return plan
+
+
+def _format_value(value):
+    if isinstance(value, list):
+        return ', '.join(f"{name} {'?' if price is None else f'${price / 100:.2f}'}" for name, price in value)
+    return repr(value)
+
+
+def print_plan(plan):
+    """Print a plan in a terraform-like text format"""
+    symbols = {'create': '+', 'update': '~', 'delete': '-'}
+
+    print(f"📋 Plan for {plan['environment'].upper()} (current state: {plan['source']})")
+    if not plan.get('menu_feed', True):
+        print("   ⚠️  Menu feed not found - feed descriptions not compared")
+    print("-" * 70)
+
+    for change in plan['changes']:
+        suffix = f" ({change['id']})" if change['id'] else ''
+        reason = f" [{change['reason']}]" if change.get('reason') else ''
+        print(f"  {symbols[change['action']]} {change['type']:<9} {change['name']}{suffix}{reason}")
+        for field, diff in change.get('changes', {}).items():
+            print(f"        {field}: {_format_value(diff['from'])} → {_format_value(diff['to'])}")
+
+    s = plan['summary']
+    if not plan['changes']:
+        print("  No changes.")
+    print("-" * 70)
+    print(f"Plan: {s['create']} to create, {s['update']} to update, {s['delete']} to delete, "
+          f"{s['unchanged']} unchanged")
+
+
+def main(argv=None):
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show what a catalog sync would change (no API calls)")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--config', help="Menu config JSON (default: data/menu_config.json)")
+    parser.add_argument('--menu', help="Source menu feed (default: MENU_JSON_PATH or /tmp/menu.json)")
+    parser.add_argument('--catalog', help="Saved catalog JSON to diff against instead of the database")
+    parser.add_argument('--json', action='store_true', help="Print the plan as JSON")
+    parser.add_argument('--detailed-exitcode', action='store_true', help="Exit 2 when there are changes")
+    args = parser.parse_args(argv)
+
+    environment = args.environment
+    if not environment:
+        from env_utils import get_environment
+        environment = get_environment()
+
+    plan = build_plan(environment, args.config, args.menu, args.catalog)
+
+    if args.json:
+        json.dump(plan, sys.stdout, indent=2)
+        print()
+    else:
+        print_plan(plan)
+
+    return 2 if args.detailed_exitcode and plan['changes'] else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+Purpose: Rule-driven bulk price updates: compute new variation prices locally, apply in few batch calls
+Related: rollback_utils.py (version-checked batch upserts), snapshot_utils.py, schema_utils.py (price_history)
+Refactor if: >400 lines OR prices need per-location overrides or time-based rules
+
+A rule set is a JSON file:
+
+    {
+      "round_to_cents": 5,          # optional, round new prices to a multiple
+      "min_price_cents": 100,       # optional floor (default 0)
+      "rules": [
+        {"percent": 3},                                       # whole catalog
+        {"category": "Smoothies", "percent": -5},
+        {"item": "Autumn Caesar", "amount_cents": 50},
+        {"item": "Autumn Caesar", "variation": "Large", "price_cents": 1899}
+      ]
+    }
+
+Each rule has one change (percent, amount_cents or price_cents) and
+optional targets matched by normalized name. For every fixed-price
+variation the most specific matching rule wins (variation > item >
+category > whole catalog; the later rule on a tie). Rules never stack,
+but percent/amount_cents are relative to the current price: applying
+the same rule set twice changes prices twice (price_cents does not).
+
+New prices are computed locally from the delta-refreshed snapshot; only
+changed variations are upserted, with their current version, so Square
+rejects the batch if someone edited one in between. Applied changes are
+recorded in price_history (record_price_changes()).
+
+Usage:
+    python src/price_utils.py data/price_rules.example.json            # dry run
+    python src/price_utils.py data/price_rules.example.json --apply
+    catering-square prices data/price_rules.example.json --apply
+"""
+
+import json
+import sqlite3
+import uuid
+from pathlib import Path
+
+from catalog_utils import MAX_OBJECTS_PER_BATCH, _chunk_upsert_objects, normalize_name
+from rollback_utils import READ_ONLY_FIELDS
+
+CHANGE_FIELDS = ('percent', 'amount_cents', 'price_cents')
+TARGET_FIELDS = ('category', 'item', 'variation')
+
+
+def load_rules(path):
+    """
+    Load and validate a rule set file.
+
+    Raises:
+        ValueError: Unknown fields, or not exactly one change per rule
+    """
+    with open(path) as f:
+        rule_set = json.load(f)
+
+    rules = rule_set.get('rules')
+    if not isinstance(rules, list) or not rules:
+        raise ValueError(f"{path}: 'rules' must be a non-empty list")
+
+    for i, rule in enumerate(rules, 1):
+        unknown = set(rule) - set(CHANGE_FIELDS) - set(TARGET_FIELDS)
+        if unknown:
+            raise ValueError(f"{path}: rule {i} has unknown field(s): {', '.join(sorted(unknown))}")
+        changes = [field for field in CHANGE_FIELDS if field in rule]
+        if len(changes) != 1:
+            raise ValueError(f"{path}: rule {i} needs exactly one of {', '.join(CHANGE_FIELDS)}")
+        if not isinstance(rule[changes[0]], (int, float)):
+            raise ValueError(f"{path}: rule {i}: {changes[0]} must be a number")
+
+    rule_set.setdefault('round_to_cents', 1)
+    rule_set.setdefault('min_price_cents', 0)
+    return rule_set
+
+
+def _specificity(rule):
+    return 3 if 'variation' in rule else 2 if 'item' in rule else 1 if 'category' in rule else 0
+
+
+def compile_rules(rules):
+    """Rules with normalized targets, most specific (then latest) first"""
+    compiled = []
+    for i, rule in enumerate(rules):
+        targets = {field: normalize_name(rule[field]) for field in TARGET_FIELDS if field in rule}
+        compiled.append((_specificity(rule), i, targets, rule))
+    compiled.sort(key=lambda entry: (-entry[0], -entry[1]))
+    return [(i, targets, rule) for _, i, targets, rule in compiled]
+
+
+def _matches(targets, keys):
+    # An item can be in several categories; item and variation names are single
+    return all(value in keys[field] if field == 'category' else keys[field] == value
+               for field, value in targets.items())
+
+
+def new_price(rule, old_cents, round_to=1, minimum=0):
+    """
+    Apply one rule to a price in cents.
+
+    Computed prices are rounded half up to a multiple of `round_to`; a
+    rule's explicit price_cents is used as is. Both are floored at `minimum`.
+    """
+    if 'price_cents' in rule:
+        return max(int(rule['price_cents']), minimum)
+    if 'amount_cents' in rule:
+        cents = old_cents + rule['amount_cents']
+    else:
+        cents = old_cents * (100 + rule['percent']) / 100
+    return max(int(cents / round_to + 0.5) * round_to, minimum)
+
+
+def _variation_update(variation, amount):
+    """Upsert copy of a variation with a new price (keeps its version for the check)"""
+    obj = {k: v for k, v in variation.items() if k not in READ_ONLY_FIELDS or k == 'version'}
+    data = dict(obj['item_variation_data'])
+    data['price_money'] = dict(data['price_money'], amount=amount)
+    obj['item_variation_data'] = data
+    return obj
+
+
+def compute_price_changes(objects, rule_set):
+    """
+    Work out new prices for every fixed-price variation in the catalog.
+
+    Args:
+        objects: Catalog objects (API shape), e.g. snapshot.objects.values()
+        rule_set: load_rules() result
+
+    Returns:
+        dict: {'changes': [...], 'upserts': [variation objects],
+               'summary': {'changed', 'unchanged', 'skipped'}, 'unmatched_rules': [rule numbers]}
+    """
+    objects = [obj for obj in objects if not obj.get('is_deleted')]
+    categories = {obj['id']: (obj.get('category_data') or {}).get('name')
+                  for obj in objects if obj.get('type') == 'CATEGORY'}
+    # Top-level copies: they carry the current price and version, nested ones can lag behind
+    variations = {obj['id']: obj for obj in objects if obj.get('type') == 'ITEM_VARIATION'}
+    compiled = compile_rules(rule_set['rules'])
+    round_to, minimum = rule_set['round_to_cents'], rule_set['min_price_cents']
+
+    changes, upserts = [], []
+    summary = {'changed': 0, 'unchanged': 0, 'skipped': 0}
+    used = set()
+
+    for item in sorted((obj for obj in objects if obj.get('type') == 'ITEM'), key=lambda obj: obj['id']):
+        data = item.get('item_data') or {}
+        category_ids = [c.get('id') for c in data.get('categories') or []] or [data.get('category_id')]
+        keys = {
+            'item': normalize_name(data.get('name')),
+            'category': {normalize_name(categories.get(cid)) for cid in category_ids if cid in categories},
+        }
+
+        for nested in data.get('variations') or []:
+            variation = variations.get(nested['id'], nested)
+            var_data = variation.get('item_variation_data') or {}
+            money = var_data.get('price_money') or {}
+            if var_data.get('pricing_type', 'FIXED_PRICING') != 'FIXED_PRICING' or money.get('amount') is None:
+                summary['skipped'] += 1
+                continue
+
+            keys['variation'] = normalize_name(var_data.get('name'))
+            match = next(((i, rule) for i, targets, rule in compiled if _matches(targets, keys)), None)
+            if match is None:
+                summary['unchanged'] += 1
+                continue
+
+            i, rule = match
+            used.add(i)
+            old = money['amount']
+            amount = new_price(rule, old, round_to, minimum)
+            if amount == old:
+                summary['unchanged'] += 1
+                continue
+
+            summary['changed'] += 1
+            upserts.append(_variation_update(variation, amount))
+            changes.append({'variation_id': variation['id'], 'item_id': item['id'], 'item': data.get('name'),
+                            'variation': var_data.get('name'), 'currency': money.get('currency'),
+                            'old_price_cents': old, 'new_price_cents': amount, 'rule': rule})
+
+    return {'changes': changes, 'upserts': upserts, 'summary': summary,
+            'unmatched_rules': [i + 1 for i in range(len(rule_set['rules'])) if i not in used]}
+
+
+def apply_price_changes(client, plan, stats=None):
+    """
+    Send the price upserts (1,000 objects per batch, 10,000 per call).
+
+    Args:
+        stats: Dict updated in place after every call, so progress is
+               known when a later call fails
+
+    Returns:
+        dict: {'upserted': n, 'calls': n, 'versions': {variation ID: new version}}
+
+    Raises:
+        Exception: On API errors (e.g. VERSION_MISMATCH); batches of a call
+                   are all-or-nothing, earlier calls stay applied
+    """
+    stats = stats if stats is not None else {}
+    stats.update(upserted=0, calls=0, versions={})
+    for batches in _chunk_upsert_objects(plan['upserts']):
+        response = client.catalog.batch_upsert(idempotency_key=str(uuid.uuid4()), batches=batches)
+        stats['calls'] += 1
+
+        if getattr(response, 'errors', None):
+            raise Exception(f"Price upsert failed: {response.errors[0].detail}")
+
+        for obj in getattr(response, 'objects', None) or []:
+            stats['versions'][obj.id] = obj.version
+        stats['upserted'] += sum(len(batch['objects']) for batch in batches)
+    return stats
+
+
+def record_price_changes(environment, run_id, changes):
+    """
+    Record applied price changes in one transaction: price_history rows,
+    new prices/versions on item_variations, and menu_items.price_cents
+    where it mirrored the changed variation's old price.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        run_id: Identifier shared by every change of one run
+        changes: Dicts with variation_id, item_id, item, variation,
+                 old_price_cents, new_price_cents, rule, version (new)
+
+    Returns:
+        int: Number of changes recorded
+    """
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO price_history
+                (environment, run_id, variation_square_id, item_name, variation_name,
+                 old_price_cents, new_price_cents, rule)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(environment, run_id, c['variation_id'], c['item'], c['variation'], c['old_price_cents'],
+               c['new_price_cents'], json.dumps(c['rule'])) for c in changes])
+
+        cursor.executemany('''
+            UPDATE item_variations
+            SET price_cents=?, square_version=COALESCE(?, square_version), updated_at=CURRENT_TIMESTAMP
+            WHERE environment=? AND square_id=?
+        ''', [(c['new_price_cents'], c.get('version'), environment, c['variation_id']) for c in changes])
+
+        cursor.executemany('''
+            UPDATE menu_items SET price_cents=?, updated_at=CURRENT_TIMESTAMP
+            WHERE environment=? AND square_id=? AND price_cents IS ?
+        ''', [(c['new_price_cents'], environment, c['item_id'], c['old_price_cents']) for c in changes])
+
+    return len(changes)
+
+
+def get_price_history(environment, item_name=None, limit=50):
+    """Latest price changes, optionally for one item (newest first)"""
+    from db_utils import get_db
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        query = '''
+            SELECT run_id, item_name, variation_name, old_price_cents, new_price_cents, rule, changed_at
+            FROM price_history
+            WHERE environment=?
+        '''
+        params = [environment]
+        if item_name:
+            query += ' AND item_name=?'
+            params.append(item_name)
+        cursor.execute(query + ' ORDER BY id DESC LIMIT ?', params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def plan_prices(client, environment, rules_path, verbose=True):
+    """Load the rules, delta-refresh the snapshot and compute the price changes (verbose=False for --json)"""
+    from snapshot_utils import sync_snapshot
+
+    rule_set = load_rules(rules_path)
+    snapshot = sync_snapshot(client, environment, verbose=verbose)
+    plan = compute_price_changes(snapshot.objects.values(), rule_set)
+    plan['environment'] = environment
+    plan['rules'] = str(rules_path)
+    plan['calls'] = len(_chunk_upsert_objects(plan['upserts']))
+    return plan
+
+
+def _money(cents, currency):
+    return f"{cents / 100:.2f} {currency or ''}".strip()
+
+
+def print_price_plan(plan, limit=50):
+    """Print a price plan in the same format as rollback_utils.print_rollback()"""
+    print(f"💲 Price update for {plan['environment'].upper()} ← {plan['rules']}")
+    print("-" * 70)
+    for change in plan['changes'][:limit]:
+        delta = change['new_price_cents'] - change['old_price_cents']
+        print(f"  ~ {change['item']} / {change['variation']}: {_money(change['old_price_cents'], change['currency'])}"
+              f" → {_money(change['new_price_cents'], change['currency'])} ({delta:+d}¢)")
+    if len(plan['changes']) > limit:
+        print(f"  ... {len(plan['changes']) - limit} more")
+    for number in plan['unmatched_rules']:
+        print(f"  ⚠️  Rule {number} matched no variation")
+
+    s = plan['summary']
+    print("-" * 70)
+    print(f"Prices: {s['changed']} to change, {s['unchanged']} unchanged, {s['skipped']} skipped "
+          f"(variable/no price), {plan['calls']} API call(s) of ≤{MAX_OBJECTS_PER_BATCH} per batch")
+
+
+def update_prices(client, environment, rules_path, apply=False, confirm=True, as_json=False):
+    """
+    Plan (and with apply=True, run) a rule-driven price update.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        rules_path: Rule set JSON (see module docstring)
+        apply: Send the changes (default: dry run)
+        confirm: Ask before applying in production
+        as_json: Print the plan as JSON instead of text
+
+    Returns:
+        dict: The plan, plus 'applied' stats and 'run_id' when changes were sent
+    """
+    plan = plan_prices(client, environment, rules_path, verbose=not as_json)
+
+    if as_json:
+        print(json.dumps({k: v for k, v in plan.items() if k != 'upserts'}, indent=2))
+    else:
+        print_price_plan(plan)
+
+    if not apply or not plan['changes']:
+        return plan
+
+    if confirm and environment == 'production':
+        response = input(f"⚠️  You are changing {len(plan['changes'])} PRODUCTION prices. Type 'yes' to continue: ")
+        if response.lower() != 'yes':
+            print("❌ Aborted.")
+            return plan
+
+    from db_utils import get_db
+    from schema_utils import run_migrations
+    from snapshot_utils import sync_snapshot
+
+    # price_history has to exist before Square changes, or the history of the run is lost
+    with get_db() as conn:
+        run_migrations(conn)
+
+    plan['applied'] = stats = {}
+    plan['run_id'] = f"{Path(rules_path).stem}-{uuid.uuid4().hex[:8]}"
+    try:
+        apply_price_changes(client, plan, stats)
+    finally:
+        # Record whatever Square accepted, also when a later call failed
+        applied = [dict(change, version=stats['versions'][change['variation_id']])
+                   for change in plan['changes'] if change['variation_id'] in stats['versions']]
+        record_price_changes(environment, plan['run_id'], applied)
+        sync_snapshot(client, environment, verbose=False)
+
+    print(f"✅ Updated {stats['upserted']} price(s) in {stats['calls']} call(s); history run {plan['run_id']}")
+    return plan
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk price updates from a rule set")
+    parser.add_argument('rules', help="Rule set JSON file")
+    parser.add_argument('--env', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--apply', action='store_true', help="Send the changes (default: dry run)")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+    parser.add_argument('--json', action='store_true', help="Print the plan as JSON")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    from client_utils import create_square_client
+
+    environment = args.env or get_environment()
+    try:
+        update_prices(create_square_client(environment), environment, args.rules,
+                      apply=args.apply, confirm=not args.yes, as_json=args.json)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Purpose: Shared --profile / --trace-memory options for scripts under scripts/
+Related: api_metrics.py (stage timings), all scripts/ entry points
+Refactor if: >200 lines OR adding sampling/remote profilers
+
+Usage in a script:
+    if __name__ == "__main__":
+        run_script(create_catalog_safe)
+
+    python scripts/catalog/create_catalog_safe.py --profile --trace-memory
+
+Reports are written to data/profiles/. When neither flag is given the
+entry function is called directly - cProfile/tracemalloc are not imported.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_DIR = Path(__file__).parent.parent / 'data' / 'profiles'
+PROFILE_FLAGS = ('--profile', '--trace-memory')
+
+# Rows shown in the text reports
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+def _pop_flags(argv):
+    """Remove profiling flags from argv in place and return the ones found"""
+    found = {flag for flag in PROFILE_FLAGS if flag in argv}
+    argv[:] = [arg for arg in argv if arg not in PROFILE_FLAGS]
+    return found
+
+
+def _stage_lines():
+    """Slowest pipeline stages recorded by api_metrics (if it was used)"""
+    api_metrics = sys.modules.get('api_metrics')
+    if api_metrics is None:
+        return []
+    stages = api_metrics.METRICS.slowest_stages()
+    return [f"{name:<30} {seconds:>10.3f}s" for name, seconds in stages]
+
+
+def _write_reports(name, profiler, snapshot, peak, wall):
+    """Write pstats and text reports, return the paths written"""
+    import io
+    import pstats
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S}"
+    written = []
+
+    stages = _stage_lines()
+    header = [f"Script: {name}", f"Wall time: {wall:.3f}s"]
+    if stages:
+        header += ["", "Slowest stages:"] + stages
+
+    if profiler is not None:
+        stats_path = stem.with_suffix('.pstats')
+        profiler.dump_stats(stats_path)
+        written.append(stats_path)
+
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        text_path = stem.with_suffix('.txt')
+        text_path.write_text('\n'.join(header) + '\n\n' + buffer.getvalue())
+        written.append(text_path)
+
+    if snapshot is not None:
+        lines = header + ["", f"Peak traced memory: {peak / 1e6:.1f} MB", "",
+                          f"Top {TOP_ALLOCATIONS} allocations by line:"]
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            lines.append(str(stat))
+        memory_path = Path(f"{stem}-memory.txt")
+        memory_path.write_text('\n'.join(lines) + '\n')
+        written.append(memory_path)
+
+    return written, stages
+
+
+def run_script(entry, *args, **kwargs):
+    """
+    Call a script's entry function, optionally under cProfile/tracemalloc.
+
+    Args:
+        entry: Script entry function (e.g. create_catalog_safe)
+        *args, **kwargs: Passed through to entry
+
+    Returns:
+        Whatever entry returns
+    """
+    flags = _pop_flags(sys.argv)
+    if not flags:
+        return entry(*args, **kwargs)
+
+    import time
+
+    profiler = None
+    if '--profile' in flags:
+        import cProfile
+        profiler = cProfile.Profile()
+    if '--trace-memory' in flags:
+        import tracemalloc
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return entry(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        wall = time.perf_counter() - start
+        snapshot, peak = None, 0
+        if '--trace-memory' in flags:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        name = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else entry.__name__
+        written, stages = _write_reports(name, profiler, snapshot, peak, wall)
+
+        print()
+        print(f"🔬 Profile ({wall:.2f}s):")
+        for line in stages[:5]:
+            print(f"   {line}")
+        if snapshot is not None:
+            print(f"   Peak traced memory: {peak / 1e6:.1f} MB")
+        for path in written:
+            print(f"   → {path}")
@@ -0,0 +1,330 @@
+"""
+Purpose: Validate and price catering orders against the tracked catalog
+Related: db_utils.py (menu_items, item_variations), docs/business-rules.md, docs/data-models.md
+Refactor if: >500 lines OR adding payment/checkout logic
+
+Prices come from SQLite only - quoting never calls Square.
+"""
+
+import numpy as np
+
+from db_utils import get_db
+
+# Minimum quantities (docs/business-rules.md)
+MINIMUM_QUANTITIES = {
+    'INDIVIDUAL_MEAL': 10,
+    'BYO': 10,
+    'COOKIE_PLATTER': 10,
+    'OTHER': 1,
+}
+
+MINIMUM_ERRORS = {
+    'INDIVIDUAL_MEAL': "Individual meals require 10 person minimum",
+    'BYO': "Build Your Own requires 10 person minimum",
+    'COOKIE_PLATTER': "Cookie platters require minimum of 10",
+    'OTHER': "Quantity must be at least 1",
+}
+
+# Square category name -> rule type
+CATEGORY_RULES = {
+    'Signature Salads': 'INDIVIDUAL_MEAL',
+    'Wraps': 'INDIVIDUAL_MEAL',
+    'Build Your Own': 'BYO',
+}
+
+# BYO selection rules (docs/data-models.md): field -> (exact count, minimum count, message)
+BYO_SELECTIONS = {
+    'selected_greens': (2, None, "Select exactly 2 greens"),
+    'selected_protein': (1, None, "Select exactly 1 protein"),
+    'selected_cheese': (1, None, "Select exactly 1 cheese"),
+    'selected_toppings': (None, 6, "Select at least 6 toppings"),
+    'selected_dressings': (None, 3, "Select at least 3 dressings"),
+}
+
+# Per-person add-on prices in cents. None = "Contact for pricing" (business rules)
+ADDON_PRICES = {
+    'bundle': None,               # chips + cookie
+    'wrap_conversion': None,
+    'additional_topping': None,
+    'additional_dressing': None,
+}
+
+CONTACT_MESSAGE = "pricing on request - contact catering@justsalad.com"
+
+
+def _rule_type(name, category):
+    """Return the minimum-quantity rule type for a catalog item"""
+    if 'cookie platter' in (name or '').casefold():
+        return 'COOKIE_PLATTER'
+    return CATEGORY_RULES.get(category, 'OTHER')
+
+
+def _selection_count(value):
+    """Count selections for a field that may be a single value or a list"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (list, tuple, set)):
+        return len(value)
+    return 1
+
+
+def _whole_quantity(value):
+    """Return a line quantity as an int, or None unless it is a whole number (9.9 is not 9)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    return quantity if isinstance(value, str) or quantity == value else None
+
+
+class QuoteEngine:
+    """
+    Price and validate catering orders.
+
+    The catalog for one environment is loaded once into arrays; a batch of
+    orders is flattened into line arrays and priced in a few vectorized
+    passes, so thousands of orders cost about as much as one.
+
+    Example:
+        >>> engine = QuoteEngine('sandbox')
+        >>> engine.quote_order({'lines': [{'item': 'Autumn Caesar', 'quantity': 12}]})
+    """
+
+    def __init__(self, environment, addon_prices=None):
+        """
+        Args:
+            environment: 'sandbox' or 'production'
+            addon_prices: Overrides for ADDON_PRICES (cents per person)
+        """
+        self.environment = environment
+        self.addon_prices = dict(ADDON_PRICES, **(addon_prices or {}))
+        self._load_catalog()
+
+    def _load_catalog(self):
+        """Load items and variations for the environment in two queries"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT m.id, m.square_id, m.name, m.price_cents, c.name AS category
+                FROM menu_items m
+                LEFT JOIN categories c ON c.id = m.category_id
+                WHERE m.environment = ?
+                ORDER BY m.id
+            ''', (self.environment,))
+            items = cursor.fetchall()
+
+            cursor.execute('''
+                SELECT item_id, square_id, name, price_cents
+                FROM item_variations
+                WHERE environment = ?
+            ''', (self.environment,))
+            variations = cursor.fetchall()
+
+        self.item_names = [row['name'] for row in items]
+        self.item_square_ids = [row['square_id'] for row in items]
+        self.item_rules = [_rule_type(row['name'], row['category']) for row in items]
+        self.item_categories = [row['category'] for row in items]
+
+        # -1 marks an unknown price
+        self.item_prices = np.array(
+            [-1 if row['price_cents'] is None else row['price_cents'] for row in items],
+            dtype=np.int64
+        )
+        self.item_minimums = np.array([MINIMUM_QUANTITIES[r] for r in self.item_rules], dtype=np.int64)
+
+        self._index = {}
+        for i, row in enumerate(items):
+            self._index[row['square_id']] = i
+            self._index[row['name'].casefold()] = i
+
+        position = {row['id']: i for i, row in enumerate(items)}
+        self._variations = {}
+        for row in variations:
+            if row['item_id'] in position:
+                i = position[row['item_id']]
+                price = -1 if row['price_cents'] is None else row['price_cents']
+                self._variations[(i, row['name'].casefold())] = price
+                self._variations[(i, row['square_id'])] = price
+
+    def _find_item(self, ref):
+        """Resolve an item reference (Square ID or name) to an index, or -1"""
+        if not ref:
+            return -1
+        if ref in self._index:
+            return self._index[ref]
+        return self._index.get(str(ref).casefold(), -1)
+
+    def _addon_cost(self, line, errors):
+        """Per-person add-on cost for a line; unpriced add-ons are reported as errors"""
+        requested = {
+            'bundle': 1 if line.get('include_bundle') else 0,
+            'wrap_conversion': 1 if line.get('convert_to_wrap') else 0,
+            'additional_topping': _selection_count(line.get('additional_toppings')),
+            'additional_dressing': _selection_count(line.get('additional_dressings')),
+        }
+
+        cost = 0
+        for addon, count in requested.items():
+            if not count:
+                continue
+            price = self.addon_prices.get(addon)
+            if price is None:
+                errors.append(f"{addon.replace('_', ' ').capitalize()}: {CONTACT_MESSAGE}")
+            else:
+                cost += price * count
+        return cost
+
+    def _line_errors(self, line, item_idx, errors):
+        """Row-level rules that are not plain arithmetic (BYO selections, wraps)"""
+        rule = self.item_rules[item_idx]
+
+        if rule == 'BYO':
+            for field, (exact, minimum, message) in BYO_SELECTIONS.items():
+                count = _selection_count(line.get(field))
+                if (exact is not None and count != exact) or (minimum is not None and count < minimum):
+                    errors.append(message)
+
+        if line.get('convert_to_wrap') and self.item_categories[item_idx] != 'Signature Salads':
+            errors.append("Only signature salads can be converted to wraps")
+
+    def quote_orders(self, orders):
+        """
+        Validate and price a batch of orders.
+
+        Args:
+            orders: List of dicts {'order_id': optional, 'lines': [line, ...]}.
+                    A line is {'item': name or Square ID, 'quantity': int,
+                    'variation': optional name or Square ID, 'include_bundle',
+                    'convert_to_wrap', 'selected_greens', 'selected_protein',
+                    'selected_cheese', 'selected_toppings', 'selected_dressings',
+                    'additional_toppings', 'additional_dressings'}
+
+        Returns:
+            list: One quote per order: {'order_id', 'valid', 'subtotal_cents', 'lines'}
+                  where each line carries unit_price_cents, addons_cents,
+                  total_cents and a list of errors
+        """
+        # Flatten all lines into parallel arrays
+        order_idx, item_idx, quantities, unit_prices, addon_costs, line_errors = [], [], [], [], [], []
+
+        for o, order in enumerate(orders):
+            for line in order.get('lines', []):
+                errors = []
+                idx = self._find_item(line.get('item'))
+
+                quantity = _whole_quantity(line.get('quantity', 0))
+                if quantity is None:
+                    quantity = 0
+                    errors.append("Quantity must be a whole number")
+
+                price = -1
+                if idx < 0:
+                    errors.append(f"Unknown menu item: {line.get('item')}")
+                else:
+                    price = self.item_prices[idx]
+                    variation = line.get('variation')
+                    if variation:
+                        price = self._variations.get(
+                            (idx, variation),
+                            self._variations.get((idx, str(variation).casefold()))
+                        )
+                        if price is None:
+                            errors.append(f"Unknown variation: {variation}")
+                            price = -1
+                    self._line_errors(line, idx, errors)
+
+                order_idx.append(o)
+                item_idx.append(idx)
+                quantities.append(quantity)
+                unit_prices.append(price)
+                addon_costs.append(self._addon_cost(line, errors))
+                line_errors.append(errors)
+
+        order_idx = np.array(order_idx, dtype=np.int64)
+        item_idx = np.array(item_idx, dtype=np.int64)
+        quantities = np.array(quantities, dtype=np.int64)
+        unit_prices = np.array(unit_prices, dtype=np.int64)
+        addon_costs = np.array(addon_costs, dtype=np.int64)
+
+        # Vectorized rules: minimums and missing prices
+        known = item_idx >= 0
+        if self.item_minimums.size == 0:
+            minimums = np.ones_like(item_idx)  # No items: every line is an unknown item
+        else:
+            minimums = np.where(known, self.item_minimums[np.where(known, item_idx, 0)], 1)
+        below_minimum = known & (quantities < minimums)
+        unpriced = known & (unit_prices < 0)
+
+        totals = quantities * (np.maximum(unit_prices, 0) + addon_costs)
+
+        for i in np.flatnonzero(below_minimum):
+            line_errors[i].append(MINIMUM_ERRORS[self.item_rules[item_idx[i]]])
+        for i in np.flatnonzero(unpriced):
+            line_errors[i].append(f"No price on file: {CONTACT_MESSAGE}")
+
+        has_errors = np.array([bool(e) for e in line_errors], dtype=bool)
+
+        subtotals = np.zeros(len(orders), dtype=np.int64)
+        np.add.at(subtotals, order_idx, totals)
+        invalid = np.zeros(len(orders), dtype=bool)
+        np.logical_or.at(invalid, order_idx, has_errors)
+
+        # Assemble results
+        quotes = [{
+            'order_id': order.get('order_id', o),
+            'valid': not invalid[o] and bool(order.get('lines')),
+            'subtotal_cents': int(subtotals[o]),
+            'lines': []
+        } for o, order in enumerate(orders)]
+
+        for i in range(len(order_idx)):
+            idx = item_idx[i]
+            quotes[order_idx[i]]['lines'].append({
+                'item': self.item_names[idx] if idx >= 0 else None,
+                'square_id': self.item_square_ids[idx] if idx >= 0 else None,
+                'quantity': int(quantities[i]),
+                'unit_price_cents': int(unit_prices[i]) if unit_prices[i] >= 0 else None,
+                'addons_cents': int(addon_costs[i]),
+                'total_cents': int(totals[i]),
+                'errors': line_errors[i],
+            })
+
+        for quote, order in zip(quotes, orders):
+            if not order.get('lines'):
+                quote['errors'] = ["Order has no lines"]
+
+        return quotes
+
+    def quote_order(self, order):
+        """Validate and price a single order (see quote_orders)"""
+        return self.quote_orders([order])[0]
+
+
+def format_cents(cents):
+    """Format cents as dollars, e.g. 15000 -> '$150.00'"""
+    return f"${cents / 100:,.2f}"
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+
+    if len(sys.argv) < 2:
+        print("Usage: python src/quote_utils.py <order.json> [environment]")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        payload = json.load(f)
+
+    env = sys.argv[2] if len(sys.argv) > 2 else 'sandbox'
+    orders = payload if isinstance(payload, list) else [payload]
+
+    for quote in QuoteEngine(env).quote_orders(orders):
+        status = "✅" if quote['valid'] else "❌"
+        print(f"{status} Order {quote['order_id']}: {format_cents(quote['subtotal_cents'])}")
+        for line in quote['lines']:
+            print(f"   {line['quantity']} x {line['item']}: {format_cents(line['total_cents'])}")
+            for error in line['errors']:
+                print(f"      ⚠️  {error}")
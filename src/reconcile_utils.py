@@ -0,0 +1,368 @@
+"""
+Purpose: Reconcile the SQLite tables with the live Square catalog and repair drift in bulk
+Related: db_utils.py (tables), catalog_utils.py (iter_catalog_objects), snapshot_utils.py
+Refactor if: >400 lines OR tracking object types beyond categories/items/variations/images
+
+Square IDs and versions are streamed page by page into an indexed TEMP
+table on the database connection, then set-diffed against the local
+tables with joins, in one transaction:
+
+    local row, not in Square       -> stale: deleted (item links to it cleared)
+    in both, version differs       -> outdated: name/version/links refreshed
+    in Square, no local row        -> missing: imported
+    missing, but the name is taken -> conflict: reported, left alone
+
+When nothing drifted (the usual case right after a sync) the whole run is
+the streaming calls plus a few indexed joins that change nothing.
+
+Usage:
+    python src/reconcile_utils.py                 # SQUARE_ENVIRONMENT
+    python src/reconcile_utils.py production --dry-run
+    python src/reconcile_utils.py sandbox --snapshot --json
+"""
+
+import json
+
+from catalog_utils import _get, iter_catalog_objects
+
+# Square type -> local table, in the order missing rows are imported (parents first)
+RECONCILE_TABLES = {
+    'CATEGORY': 'categories',
+    'IMAGE': 'images',
+    'ITEM': 'menu_items',
+    'ITEM_VARIATION': 'item_variations',
+}
+
+# Rows per executemany() into the TEMP table
+INSERT_ROWS = 5000
+
+# Stale/conflict names kept per table for the report
+DETAIL_LIMIT = 20
+
+
+def _item_category_id(item_data):
+    category_id = _get(item_data, 'category_id')
+    if category_id:
+        return category_id
+    return next((_get(c, 'id') for c in _get(item_data, 'categories') or []), None)
+
+
+def remote_row(obj):
+    """
+    Reduce a catalog object (dict or SDK model) to a TEMP table row.
+
+    Returns:
+        tuple: (type, square_id, version, name, description, parent_id, image_id, price_cents),
+               or None for untracked types and deleted objects
+    """
+    object_type = _get(obj, 'type')
+    if object_type not in RECONCILE_TABLES or _get(obj, 'is_deleted'):
+        return None
+
+    data = _get(obj, f"{object_type.lower()}_data")
+    parent_id = image_id = price = description = None
+    if object_type == 'ITEM':
+        parent_id = _item_category_id(data)
+        image_id = next(iter(_get(data, 'image_ids') or []), None)
+        description = _get(data, 'description')
+    elif object_type == 'ITEM_VARIATION':
+        parent_id = _get(data, 'item_id')
+        price = _get(_get(data, 'price_money'), 'amount')
+
+    return (object_type, _get(obj, 'id'), _get(obj, 'version'), _get(data, 'name'),
+            description, parent_id, image_id, price)
+
+
+def _load_remote(cursor, objects):
+    """Stream objects into temp.remote_objects; returns the row count"""
+    cursor.execute('DROP TABLE IF EXISTS temp.remote_objects')
+    cursor.execute('''
+        CREATE TEMP TABLE remote_objects (
+            type TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            version INTEGER,
+            name TEXT,
+            description TEXT,
+            parent_id TEXT,
+            image_id TEXT,
+            price_cents INTEGER,
+            PRIMARY KEY (type, square_id)
+        ) WITHOUT ROWID
+    ''')
+
+    total = 0
+    batch = []
+    for obj in objects:
+        row = remote_row(obj)
+        if row is None:
+            continue
+        batch.append(row)
+        if len(batch) >= INSERT_ROWS:
+            cursor.executemany('INSERT OR REPLACE INTO remote_objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany('INSERT OR REPLACE INTO remote_objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        total += len(batch)
+
+    return total
+
+
+def _not_in_remote(table, object_type):
+    return (f"{table}.environment = ? AND NOT EXISTS (SELECT 1 FROM remote_objects r "
+            f"WHERE r.type = '{object_type}' AND r.square_id = {table}.square_id)")
+
+
+def _missing(table):
+    return (f"NOT EXISTS (SELECT 1 FROM {table} t "
+            f"WHERE t.environment = ? AND t.square_id = r.square_id)")
+
+
+def _remote_match(table, object_type):
+    return f"FROM remote_objects r WHERE r.type = '{object_type}' AND r.square_id = {table}.square_id"
+
+
+def _outdated(table, object_type):
+    return (f"{table}.environment = ? AND EXISTS (SELECT 1 {_remote_match(table, object_type)} "
+            f"AND {table}.square_version IS NOT r.version)")
+
+
+def _delete_stale(cursor, environment, stats):
+    """Delete local rows whose Square object no longer exists (children first)"""
+    env = (environment,)
+
+    for object_type, table in RECONCILE_TABLES.items():
+        name = 'square_id' if table == 'images' else 'name'
+        cursor.execute(f'SELECT square_id, {name} AS name FROM {table} WHERE {_not_in_remote(table, object_type)}', env)
+        rows = cursor.fetchall()
+        stats[table]['stale'] = len(rows)
+        stats['details']['stale'].extend({'type': object_type, 'id': row['square_id'], 'name': row['name']}
+                                         for row in rows[:DETAIL_LIMIT])
+
+    cursor.execute(f'''
+        DELETE FROM item_variations
+        WHERE {_not_in_remote('item_variations', 'ITEM_VARIATION')}
+           OR item_id IN (SELECT id FROM menu_items WHERE {_not_in_remote('menu_items', 'ITEM')})
+    ''', env * 2)
+    cursor.execute(f"UPDATE menu_items SET category_id = NULL WHERE category_id IN "
+                   f"(SELECT id FROM categories WHERE {_not_in_remote('categories', 'CATEGORY')})", env)
+    cursor.execute(f"UPDATE menu_items SET image_id = NULL WHERE image_id IN "
+                   f"(SELECT id FROM images WHERE {_not_in_remote('images', 'IMAGE')})", env)
+    for table, object_type in (('menu_items', 'ITEM'), ('categories', 'CATEGORY'), ('images', 'IMAGE')):
+        cursor.execute(f'DELETE FROM {table} WHERE {_not_in_remote(table, object_type)}', env)
+
+    cursor.executemany('''
+        INSERT INTO sync_log (environment, operation, object_type, square_id, status, error_message)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(environment, 'delete', change['type'].lower(), change['id'], 'success', 'reconcile')
+          for change in stats['details']['stale']])
+
+
+# Per type: (UPDATE of outdated rows, INSERT of missing rows); every '?' is the environment.
+# Updates set a row value from a correlated subquery: UPDATE ... FROM needs SQLite 3.33,
+# older than many Python 3.9/3.10 builds ship.
+REPAIRS = {
+    'CATEGORY': (f'''
+        UPDATE OR IGNORE categories
+        SET (name, square_version, updated_at) = (
+            SELECT COALESCE(r.name, categories.name), r.version, CURRENT_TIMESTAMP
+            {_remote_match('categories', 'CATEGORY')})
+        WHERE {_outdated('categories', 'CATEGORY')}
+    ''', f'''
+        INSERT OR IGNORE INTO categories (environment, square_id, name, square_version)
+        SELECT ?, r.square_id, COALESCE(r.name, r.square_id), r.version
+        FROM remote_objects r
+        WHERE r.type = 'CATEGORY' AND {_missing('categories')}
+    '''),
+    'IMAGE': (f'''
+        UPDATE images SET square_version = (SELECT r.version {_remote_match('images', 'IMAGE')})
+        WHERE {_outdated('images', 'IMAGE')}
+    ''', f'''
+        INSERT OR IGNORE INTO images (environment, square_id, square_version)
+        SELECT ?, r.square_id, r.version
+        FROM remote_objects r
+        WHERE r.type = 'IMAGE' AND {_missing('images')}
+    '''),
+    'ITEM': (f'''
+        UPDATE OR IGNORE menu_items
+        SET (name, description, category_id, image_id, square_version, updated_at) = (
+            SELECT COALESCE(r.name, menu_items.name),
+                   COALESCE(r.description, menu_items.description),
+                   (SELECT c.id FROM categories c
+                    WHERE c.environment = menu_items.environment AND c.square_id = r.parent_id),
+                   (SELECT i.id FROM images i
+                    WHERE i.environment = menu_items.environment AND i.square_id = r.image_id),
+                   r.version, CURRENT_TIMESTAMP
+            {_remote_match('menu_items', 'ITEM')})
+        WHERE {_outdated('menu_items', 'ITEM')}
+    ''', '''
+        INSERT OR IGNORE INTO menu_items
+            (environment, square_id, name, category_id, description, price_cents, image_id, square_version)
+        SELECT e.environment, r.square_id, COALESCE(r.name, r.square_id),
+               (SELECT c.id FROM categories c WHERE c.environment = e.environment AND c.square_id = r.parent_id),
+               r.description, p.price_cents,
+               (SELECT i.id FROM images i WHERE i.environment = e.environment AND i.square_id = r.image_id),
+               r.version
+        FROM remote_objects r
+        CROSS JOIN (SELECT ? AS environment) e
+        LEFT JOIN (SELECT parent_id, MIN(price_cents) AS price_cents FROM remote_objects
+                   WHERE type = 'ITEM_VARIATION' GROUP BY parent_id) p ON p.parent_id = r.square_id
+        WHERE r.type = 'ITEM' AND NOT EXISTS (SELECT 1 FROM menu_items t
+                                              WHERE t.environment = e.environment AND t.square_id = r.square_id)
+    '''),
+    'ITEM_VARIATION': (f'''
+        UPDATE item_variations
+        SET (name, price_cents, square_version, updated_at) = (
+            SELECT COALESCE(r.name, item_variations.name), r.price_cents, r.version, CURRENT_TIMESTAMP
+            {_remote_match('item_variations', 'ITEM_VARIATION')})
+        WHERE {_outdated('item_variations', 'ITEM_VARIATION')}
+    ''', '''
+        INSERT OR IGNORE INTO item_variations
+            (environment, square_id, item_id, name, price_cents, square_version, updated_at)
+        SELECT m.environment, r.square_id, m.id, COALESCE(r.name, ''), r.price_cents, r.version, CURRENT_TIMESTAMP
+        FROM remote_objects r
+        JOIN menu_items m ON m.square_id = r.parent_id AND m.environment = ?
+        WHERE r.type = 'ITEM_VARIATION' AND NOT EXISTS (SELECT 1 FROM item_variations t
+                                                        WHERE t.environment = m.environment
+                                                          AND t.square_id = r.square_id)
+    '''),
+}
+
+
+def _repair(cursor, environment, stats):
+    """Refresh outdated rows and import missing ones, parents before children"""
+    for object_type, table in RECONCILE_TABLES.items():
+        update_sql, insert_sql = REPAIRS[object_type]
+        cursor.execute(update_sql, (environment,) * update_sql.count('?'))
+        stats[table]['updated'] = cursor.rowcount
+        cursor.execute(insert_sql, (environment,) * insert_sql.count('?'))
+        stats[table]['imported'] = cursor.rowcount
+
+        # Still missing or outdated: the name belongs to another local row
+        # (or, for variations, the item could not be imported)
+        name = 'r.square_id' if table == 'images' else 'r.name'
+        cursor.execute(f'''
+            SELECT r.square_id, {name} AS name FROM remote_objects r
+            WHERE r.type = ? AND NOT EXISTS (SELECT 1 FROM {table} t
+                                             WHERE t.environment = ? AND t.square_id = r.square_id
+                                               AND t.square_version IS r.version)
+        ''', (object_type, environment))
+        rows = cursor.fetchall()
+        stats[table]['conflicts'] = len(rows)
+        stats['details']['conflicts'].extend({'type': object_type, 'id': row['square_id'], 'name': row['name']}
+                                             for row in rows[:DETAIL_LIMIT])
+
+
+def reconcile_objects(environment, objects, dry_run=False):
+    """
+    Set-diff catalog objects against the local tables and repair the drift.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        objects: Iterable of catalog objects (streamed pages or a snapshot)
+        dry_run: Work out the repairs, then roll them back
+
+    Returns:
+        dict: {table: {'stale', 'updated', 'imported', 'conflicts'}, 'remote': n,
+               'details': {'stale': [...], 'conflicts': [...]}, 'dry_run': bool}
+    """
+    from db_utils import get_db
+
+    stats = {table: {} for table in RECONCILE_TABLES.values()}
+    stats['details'] = {'stale': [], 'conflicts': []}
+    stats['dry_run'] = dry_run
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        stats['remote'] = _load_remote(cursor, objects)
+        _delete_stale(cursor, environment, stats)
+        _repair(cursor, environment, stats)
+        if dry_run:
+            conn.rollback()
+        cursor.execute('DROP TABLE IF EXISTS temp.remote_objects')
+
+    return stats
+
+
+def drift_count(stats):
+    """Rows changed (or that would change) by a reconcile"""
+    return sum(stats[table].get(kind, 0) for table in RECONCILE_TABLES.values()
+               for kind in ('stale', 'updated', 'imported'))
+
+
+def print_reconcile(stats, environment):
+    """Print a per-table reconcile report"""
+    title = "Reconcile (dry run)" if stats['dry_run'] else "Reconcile"
+    print(f"🔍 {title}: {environment.upper()} database ↔ Square ({stats['remote']} objects)")
+    print("-" * 70)
+    print(f"  {'table':<18}{'stale':>8}{'updated':>10}{'imported':>10}{'conflicts':>11}")
+    for table in RECONCILE_TABLES.values():
+        s = stats[table]
+        print(f"  {table:<18}{s['stale']:>8}{s['updated']:>10}{s['imported']:>10}{s['conflicts']:>11}")
+
+    for change in stats['details']['stale']:
+        print(f"  - {change['type']:<15} {change['name']} ({change['id']})")
+    for change in stats['details']['conflicts']:
+        print(f"  ⚠️  {change['type']:<15} {change['name']} ({change['id']}): name already used locally")
+
+    print("-" * 70)
+    drift = drift_count(stats)
+    if not drift:
+        print("✅ Database matches Square")
+    elif stats['dry_run']:
+        print(f"📝 {drift} row(s) would be repaired (run without --dry-run)")
+    else:
+        print(f"✅ Repaired {drift} row(s)")
+
+
+def reconcile(client, environment, dry_run=False, snapshot=False, as_json=False):
+    """
+    Stream the live catalog (or delta-refresh the snapshot) and reconcile the database.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        dry_run: Report the drift without changing the database
+        snapshot: Read the delta-refreshed local snapshot instead of
+                  streaming every page (one call when nothing changed)
+        as_json: Print the stats as JSON instead of text
+
+    Returns:
+        dict: See reconcile_objects()
+    """
+    if snapshot:
+        from snapshot_utils import sync_snapshot
+        objects = sync_snapshot(client, environment, verbose=False).objects.values()
+    else:
+        objects = iter_catalog_objects(client, types=list(RECONCILE_TABLES))
+
+    stats = reconcile_objects(environment, objects, dry_run=dry_run)
+    if as_json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_reconcile(stats, environment)
+    return stats
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reconcile the local database with the Square catalog")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--dry-run', action='store_true', help="Report drift without repairing it")
+    parser.add_argument('--snapshot', action='store_true', help="Use the delta-refreshed local snapshot")
+    parser.add_argument('--json', action='store_true', help="Print the stats as JSON")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    from client_utils import create_square_client
+
+    environment = args.environment or get_environment()
+    reconcile(create_square_client(environment), environment,
+              dry_run=args.dry_run, snapshot=args.snapshot, as_json=args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
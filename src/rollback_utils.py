@@ -0,0 +1,336 @@
+"""
+Purpose: Roll the Square catalog back to a saved snapshot with minimal batch calls
+Related: snapshot_utils.py (snapshots, --archive), diff_utils.py, catalog_utils.py (batch limits)
+Refactor if: >400 lines OR rolling back object types with external data (images)
+
+The live catalog is delta-refreshed into the local snapshot first, then
+compared with the target snapshot object by object:
+
+    in both, content differs   -> upsert with the target content and the
+                                  live version (Square rejects the batch if
+                                  someone edited the object in between)
+    only in the target         -> update a live object with the same type
+                                  and normalized name, else re-create
+                                  (deleted IDs cannot be revived; '#<old id>'
+                                  temporary IDs keep references intact)
+    only in the live catalog   -> delete
+
+Upserts go out in as few batch_upsert calls as Square allows (1,000 objects
+per batch, 10,000 per call), deletes in batch_delete calls of 200 IDs.
+Images are not rolled back (they cannot be re-created without the file).
+
+Usage:
+    python src/rollback_utils.py data/snapshots/production-20261001-090000.jsonl.gz
+    python src/rollback_utils.py data/snapshots/production-20261001-090000.jsonl.gz --apply
+"""
+
+import json
+import uuid
+from collections import defaultdict
+
+from catalog_utils import MAX_DELETE_IDS, _chunk_upsert_objects, normalize_name, replace_ids
+
+# Rolled-back types, in dependency order (categories before the items that use them)
+ROLLBACK_TYPES = ('CATEGORY', 'TAX', 'DISCOUNT', 'MODIFIER_LIST', 'ITEM')
+
+# Parent type -> (data field, nested child list); children are rolled back with their parent
+NESTED_CHILDREN = {
+    'ITEM': ('item_data', 'variations'),
+    'MODIFIER_LIST': ('modifier_list_data', 'modifiers'),
+}
+
+# Set by Square, never sent in an upsert or compared
+READ_ONLY_FIELDS = ('version', 'updated_at', 'created_at', 'is_deleted', 'catalog_v1_ids')
+
+
+def _strip(obj):
+    """Copy of an object (and its nested children) without read-only fields"""
+    result = {k: v for k, v in obj.items() if k not in READ_ONLY_FIELDS}
+    nested = NESTED_CHILDREN.get(obj.get('type'))
+    if nested and (obj.get(nested[0]) or {}).get(nested[1]) is not None:
+        data = dict(result[nested[0]])
+        data[nested[1]] = [_strip(child) for child in data[nested[1]]]
+        result[nested[0]] = data
+    return result
+
+
+def _children(obj):
+    nested = NESTED_CHILDREN.get(obj.get('type'))
+    return ((obj.get(nested[0]) or {}).get(nested[1]) or []) if nested else []
+
+
+def _top_level_children(objects):
+    """
+    {id: object} with every nested variation/modifier replaced by its top-level copy.
+
+    The top-level objects are the ones a delta refresh updates, so their
+    content and versions are the current ones.
+    """
+    result = {}
+    for object_id, obj in objects.items():
+        nested = NESTED_CHILDREN.get(obj.get('type'))
+        children = (obj.get(nested[0]) or {}).get(nested[1]) if nested else None
+        if children:
+            data = dict(obj[nested[0]], **{nested[1]: [objects.get(child['id'], child) for child in children]})
+            obj = dict(obj, **{nested[0]: data})
+        result[object_id] = obj
+    return result
+
+
+def _error_message(e):
+    """First error detail of a Square API error, else the exception text"""
+    errors = getattr(e, 'errors', None)
+    return getattr(errors[0], 'detail', None) or str(e) if errors else str(e)
+
+
+def _name(obj):
+    return (obj.get(f"{obj['type'].lower()}_data") or {}).get('name')
+
+
+def compute_rollback(target_objects, current_objects):
+    """
+    Work out the upserts and deletes that turn the current catalog into the target.
+
+    Target objects whose ID no longer exists are matched to live objects of
+    the same type and normalized name first (re-created since, or by an
+    earlier rollback), so running a rollback twice changes nothing.
+
+    Args:
+        target_objects: {id: object} of the snapshot to restore
+        current_objects: {id: object} of the live catalog (fresh snapshot)
+
+    Returns:
+        dict: {'upserts': [objects], 'deletes': [ids], 'changes': [...],
+               'summary': {'recreate', 'update', 'delete', 'unchanged'}}
+    """
+    order = {object_type: i for i, object_type in enumerate(ROLLBACK_TYPES)}
+    target_objects = _top_level_children(target_objects)
+    current_objects = _top_level_children(current_objects)
+    targets = sorted((obj for obj in target_objects.values()
+                      if obj.get('type') in order and not obj.get('is_deleted')),
+                     key=lambda obj: (order[obj['type']], obj['id']))
+    live = {object_id: obj for object_id, obj in current_objects.items()
+            if obj.get('type') in order and not obj.get('is_deleted')}
+    target_ids = {part['id'] for obj in targets for part in (obj, *_children(obj))}
+
+    def unclaimed_by_name(objects):
+        by_name = defaultdict(list)
+        for obj in objects:
+            if obj['id'] not in target_ids:
+                by_name[(obj['type'], normalize_name(_name(obj)))].append(obj['id'])
+        return by_name
+
+    # Target ID -> live ID (matched by name) or '#<target ID>' (re-created)
+    mapping = {}
+    spare = unclaimed_by_name(live.values())
+    for obj in targets:
+        if obj['id'] not in live:
+            candidates = spare.get((obj['type'], normalize_name(_name(obj))))
+            mapping[obj['id']] = candidates.pop(0) if candidates else f"#{obj['id']}"
+
+        parent = live.get(mapping.get(obj['id'], obj['id']))
+        live_children = {child['id'] for child in _children(parent)} if parent else set()
+        spare_children = unclaimed_by_name(_children(parent)) if parent else {}
+        for child in _children(obj):
+            if child['id'] not in live_children:
+                candidates = spare_children.get((child['type'], normalize_name(_name(child))))
+                mapping[child['id']] = candidates.pop(0) if candidates else f"#{child['id']}"
+
+    versions = {part['id']: part.get('version') for obj in live.values() for part in (obj, *_children(obj))}
+
+    upserts, changes = [], []
+    unchanged = 0
+    kept = set()
+    for obj in targets:
+        content = replace_ids(_strip(obj), mapping)
+        current = live.get(content['id'])
+
+        if current is None:
+            action = 'recreate'
+        else:
+            kept.add(current['id'])
+            if content == _strip(current):
+                unchanged += 1
+                continue
+            action = 'update'
+
+        for part in (content, *_children(content)):
+            if part['id'] in versions:
+                part['version'] = versions[part['id']]
+        upserts.append(content)
+        changes.append({'action': action, 'type': obj['type'], 'name': _name(obj), 'id': content['id']})
+
+    deletes = sorted((obj for obj in live.values() if obj['id'] not in kept and obj['id'] not in target_ids),
+                     key=lambda obj: (-order[obj['type']], obj['id']))
+    changes.extend({'action': 'delete', 'type': obj['type'], 'name': _name(obj), 'id': obj['id']}
+                   for obj in deletes)
+
+    summary = {action: sum(1 for c in changes if c['action'] == action)
+               for action in ('recreate', 'update', 'delete')}
+    summary['unchanged'] = unchanged
+    return {'upserts': upserts, 'deletes': [obj['id'] for obj in deletes],
+            'changes': changes, 'summary': summary}
+
+
+def apply_rollback(client, plan):
+    """
+    Send a compute_rollback() plan to Square: upserts first, then deletes.
+
+    Returns:
+        dict: {'upserted': n, 'deleted': n, 'calls': n}
+    """
+    stats = {'upserted': 0, 'deleted': 0, 'calls': 0}
+    id_mappings = {}  # '#temp' -> new ID, for references across upsert calls
+
+    for batches in _chunk_upsert_objects(plan['upserts']):
+        if id_mappings:
+            batches = replace_ids(batches, id_mappings)
+        response = client.catalog.batch_upsert(idempotency_key=str(uuid.uuid4()), batches=batches)
+        stats['calls'] += 1
+
+        if getattr(response, 'errors', None):
+            raise Exception(f"Rollback upsert failed: {response.errors[0].detail}")
+
+        for mapping in getattr(response, 'id_mappings', None) or []:
+            id_mappings[mapping.client_object_id] = mapping.object_id
+        stats['upserted'] += sum(len(batch['objects']) for batch in batches)
+
+    deletes = plan['deletes']
+    for start in range(0, len(deletes), MAX_DELETE_IDS):
+        response = client.catalog.batch_delete(object_ids=deletes[start:start + MAX_DELETE_IDS])
+        stats['calls'] += 1
+
+        if getattr(response, 'errors', None):
+            raise Exception(f"Rollback delete failed: {response.errors[0].detail}")
+        stats['deleted'] += len(getattr(response, 'deleted_object_ids', None) or [])
+
+    return stats
+
+
+def estimated_calls(plan):
+    """API calls apply_rollback() will make for a plan"""
+    deletes = -(-len(plan['deletes']) // MAX_DELETE_IDS)
+    return len(_chunk_upsert_objects(plan['upserts'])) + deletes
+
+
+def plan_rollback(client, environment, target_path, verbose=True):
+    """
+    Refresh the live snapshot and plan a rollback to the snapshot at target_path.
+
+    Args:
+        verbose: Print the snapshot refresh line (off for --json)
+
+    Returns:
+        tuple: (plan, live CatalogSnapshot)
+    """
+    from snapshot_utils import CatalogSnapshot, sync_snapshot
+
+    target = CatalogSnapshot.load(target_path)
+    if target.environment != environment:
+        raise ValueError(f"Snapshot {target_path} is for {target.environment}, not {environment}")
+
+    live = sync_snapshot(client, environment, verbose=verbose)
+    plan = compute_rollback(target.objects, live.objects)
+    plan['environment'] = environment
+    plan['target'] = str(target_path)
+    plan['target_time'] = target.refreshed_at
+    plan['calls'] = estimated_calls(plan)
+    return plan, live
+
+
+def print_rollback(plan, limit=50):
+    """Print a rollback plan in the same format as plan_utils.print_plan()"""
+    symbols = {'recreate': '+', 'update': '~', 'delete': '-'}
+
+    print(f"⏪ Rollback plan for {plan['environment'].upper()} → {plan['target']} ({plan['target_time']})")
+    print("-" * 70)
+    for change in plan['changes'][:limit]:
+        print(f"  {symbols[change['action']]} {change['type']:<13} {change['name']} ({change['id']})")
+    if len(plan['changes']) > limit:
+        print(f"  ... {len(plan['changes']) - limit} more")
+
+    s = plan['summary']
+    if not plan['changes']:
+        print("  No changes - the catalog already matches the snapshot.")
+    print("-" * 70)
+    print(f"Rollback: {s['recreate']} to re-create, {s['update']} to update, {s['delete']} to delete, "
+          f"{s['unchanged']} unchanged ({plan['calls']} API call(s))")
+
+
+def rollback(client, environment, target_path, apply=False, confirm=True, as_json=False):
+    """
+    Plan (and with apply=True, run) a rollback to a saved snapshot.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        target_path: Snapshot to restore (see `snapshot --archive`)
+        apply: Send the changes (default: dry run)
+        confirm: Ask before applying in production
+        as_json: Print the plan as JSON instead of text
+
+    Returns:
+        dict: The plan, plus 'applied' stats when changes were sent
+    """
+    plan, live = plan_rollback(client, environment, target_path, verbose=not as_json)
+
+    if as_json:
+        print(json.dumps({k: v for k, v in plan.items() if k != 'upserts'}, indent=2))
+    else:
+        print_rollback(plan)
+
+    if not apply or not plan['changes']:
+        return plan
+
+    if confirm and environment == 'production':
+        response = input("⚠️  You are rolling back PRODUCTION. Type 'yes' to continue: ")
+        if response.lower() != 'yes':
+            print("❌ Aborted.")
+            return plan
+
+    from snapshot_utils import sync_snapshot
+
+    try:
+        plan['applied'] = apply_rollback(client, plan)
+    except Exception as e:
+        plan['error'] = _error_message(e)
+        print(f"❌ Rollback failed: {plan['error']}")
+        print("   Calls sent before the failure are applied; re-run the rollback to finish")
+        sync_snapshot(client, environment, verbose=False)
+        return plan
+
+    stats = plan['applied']
+    print(f"✅ Rolled back: {stats['upserted']} upserted, {stats['deleted']} deleted in {stats['calls']} call(s)")
+    sync_snapshot(client, environment)
+    if plan['summary']['recreate']:
+        print("⚠️  Re-created objects have new IDs - the local database still has the old ones")
+    return plan
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Roll the catalog back to a saved snapshot")
+    parser.add_argument('snapshot', help="Snapshot file to restore")
+    parser.add_argument('--env', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--apply', action='store_true', help="Send the changes (default: dry run)")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation in production")
+    parser.add_argument('--json', action='store_true', help="Print the plan as JSON")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    from client_utils import create_square_client
+
+    environment = args.env or get_environment()
+    try:
+        plan = rollback(create_square_client(environment), environment, args.snapshot,
+                        apply=args.apply, confirm=not args.yes, as_json=args.json)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 1 if plan.get('error') else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+Purpose: Catalog database schema - base tables and versioned migrations
+Related: db_utils.py (connect() and init_database() apply them), feed_utils.py (menu_changes counter)
+Refactor if: >400 lines OR a migration needs a data backfill in Python
+
+The base tables are the v0 schema every database starts from; every
+change after that is a MIGRATIONS entry, tracked with PRAGMA
+user_version. db_utils.connect() applies pending migrations on the first
+connection of a process, so code never runs against an older schema.
+"""
+
+
+def create_tables(conn):
+    """Create the base (v0) tables; later changes are MIGRATIONS entries"""
+    cursor = conn.cursor()
+
+    # Locations table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS locations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,  -- 'sandbox' or 'production'
+            square_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            store_number TEXT,
+            address TEXT,
+            phone TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id)
+        )
+    ''')
+
+    # Categories table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id),
+            UNIQUE(environment, name)
+        )
+    ''')
+
+    # Images table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            source_url TEXT,
+            local_path TEXT,
+            downloaded_at TIMESTAMP,
+            uploaded_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id)
+        )
+    ''')
+
+    # Menu items table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            category_id INTEGER,
+            description TEXT,
+            price_cents INTEGER,
+            image_id INTEGER,
+            source_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id),
+            UNIQUE(environment, name),
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (image_id) REFERENCES images(id)
+        )
+    ''')
+
+    # Item variations table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_variations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            price_cents INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id),
+            FOREIGN KEY (item_id) REFERENCES menu_items(id)
+        )
+    ''')
+
+    # Sync log table - track all operations
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            operation TEXT NOT NULL,  -- 'create', 'update', 'delete'
+            object_type TEXT NOT NULL,  -- 'location', 'category', 'item', 'image'
+            square_id TEXT,
+            status TEXT NOT NULL,  -- 'success', 'error'
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.commit()
+
+
+# Tables the published menu is built from (feed_utils.py), with the SQL
+# expression giving a row's environment; triggers count every change to them
+MENU_TABLES = {
+    'locations': '{row}.environment',
+    'categories': '{row}.environment',
+    'images': '{row}.environment',
+    'menu_items': '{row}.environment',
+    'item_variations': '{row}.environment',
+    'modifier_lists': '{row}.environment',
+    'modifiers': '{row}.environment',
+    'item_modifier_lists': '(SELECT environment FROM modifier_lists WHERE id = {row}.modifier_list_id)',
+}
+
+
+def _menu_change_triggers():
+    """AFTER INSERT/UPDATE/DELETE triggers that bump menu_changes.counter"""
+    statements = []
+    for table, environment in MENU_TABLES.items():
+        for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+            statements.append(f'''CREATE TRIGGER IF NOT EXISTS {table}_menu_change_{event.lower()}
+            AFTER {event} ON {table} BEGIN
+                INSERT INTO menu_changes (environment, counter) VALUES ({environment.format(row=row)}, 1)
+                ON CONFLICT(environment) DO UPDATE SET counter = counter + 1, changed_at = CURRENT_TIMESTAMP;
+            END''')
+    return statements
+
+
+# Schema migrations - applied in order, tracked with PRAGMA user_version.
+# Each entry is (version, description, [statements]). Never edit a shipped
+# migration; append a new one instead.
+MIGRATIONS = [
+    (1, 'covering indexes for hot lookups', [
+        'CREATE INDEX IF NOT EXISTS idx_menu_items_env_name '
+        'ON menu_items(environment, name, square_id)',
+        'CREATE INDEX IF NOT EXISTS idx_images_env_source_url '
+        'ON images(environment, source_url, square_id)',
+        'CREATE INDEX IF NOT EXISTS idx_item_variations_item '
+        'ON item_variations(item_id)',
+    ]),
+    (2, 'square versions and content hashes', [
+        'ALTER TABLE categories ADD COLUMN square_version INTEGER',
+        'ALTER TABLE menu_items ADD COLUMN square_version INTEGER',
+        'ALTER TABLE menu_items ADD COLUMN content_hash TEXT',
+        'ALTER TABLE item_variations ADD COLUMN square_version INTEGER',
+        'ALTER TABLE item_variations ADD COLUMN updated_at TIMESTAMP',
+        'ALTER TABLE images ADD COLUMN square_version INTEGER',
+        'ALTER TABLE images ADD COLUMN content_hash TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_images_env_content_hash '
+        'ON images(environment, content_hash, square_id)',
+    ]),
+    (3, 'full-text search over menu items', [
+        # External-content FTS5 index: menu_items stays the only copy of the text
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS menu_items_fts USING fts5(
+            name, description,
+            content='menu_items', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS menu_items_fts_insert AFTER INSERT ON menu_items BEGIN
+            INSERT INTO menu_items_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS menu_items_fts_delete AFTER DELETE ON menu_items BEGIN
+            INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS menu_items_fts_update
+        AFTER UPDATE OF name, description ON menu_items BEGIN
+            INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO menu_items_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END''',
+        "INSERT INTO menu_items_fts(menu_items_fts) VALUES ('rebuild')",
+    ]),
+    (4, 'nutrition facts per menu item', [
+        '''CREATE TABLE IF NOT EXISTS menu_item_nutrition (
+            item_id INTEGER PRIMARY KEY,
+            calories REAL,
+            protein REAL,
+            carbohydrates REAL,
+            carbon_footprint REAL,
+            diets TEXT,  -- JSON array, e.g. ["vegan", "gluten_free"]
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (item_id) REFERENCES menu_items(id)
+        )''',
+        # foreign_keys is off by default, so clean up explicitly
+        '''CREATE TRIGGER IF NOT EXISTS menu_item_nutrition_delete AFTER DELETE ON menu_items BEGIN
+            DELETE FROM menu_item_nutrition WHERE item_id = old.id;
+        END''',
+    ]),
+    (5, 'price history for bulk price updates', [
+        '''CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            run_id TEXT NOT NULL,  -- one price update run (price_utils.py)
+            variation_square_id TEXT NOT NULL,
+            item_name TEXT,
+            variation_name TEXT,
+            old_price_cents INTEGER,
+            new_price_cents INTEGER NOT NULL,
+            rule TEXT,  -- the rule that set the price, as JSON
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_price_history_variation '
+        'ON price_history(environment, variation_square_id, changed_at)',
+    ]),
+    (6, 'modifier lists and item links', [
+        '''CREATE TABLE IF NOT EXISTS modifier_lists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            selection_type TEXT,  -- 'SINGLE' or 'MULTIPLE'
+            square_version INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id),
+            UNIQUE(environment, name)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS modifiers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            environment TEXT NOT NULL,
+            square_id TEXT NOT NULL,
+            modifier_list_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            price_cents INTEGER,  -- NULL: no price in Square
+            square_version INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(environment, square_id),
+            FOREIGN KEY (modifier_list_id) REFERENCES modifier_lists(id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_modifiers_list ON modifiers(modifier_list_id)',
+        '''CREATE TABLE IF NOT EXISTS item_modifier_lists (
+            item_id INTEGER NOT NULL,
+            modifier_list_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (item_id, modifier_list_id),
+            FOREIGN KEY (item_id) REFERENCES menu_items(id),
+            FOREIGN KEY (modifier_list_id) REFERENCES modifier_lists(id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_item_modifier_lists_list ON item_modifier_lists(modifier_list_id)',
+        '''CREATE TRIGGER IF NOT EXISTS item_modifier_lists_item_delete AFTER DELETE ON menu_items BEGIN
+            DELETE FROM item_modifier_lists WHERE item_id = old.id;
+        END''',
+    ]),
+    (7, 'menu change counter', [
+        # One row per environment; feeds and the menu API rebuild only when it moves
+        '''CREATE TABLE IF NOT EXISTS menu_changes (
+            environment TEXT PRIMARY KEY,
+            counter INTEGER NOT NULL DEFAULT 0,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        *_menu_change_triggers(),
+    ]),
+]
+
+
+def get_schema_version(conn):
+    """Get the schema version recorded in the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def run_migrations(conn, file=None):
+    """
+    Apply pending schema migrations.
+
+    Each migration runs in its own transaction together with the
+    user_version bump, so a failed migration leaves the database at the
+    previous version.
+
+    Args:
+        conn: Open sqlite3 connection
+        file: Stream for progress messages (default: stdout)
+
+    Returns:
+        int: Number of migrations applied
+    """
+    current = get_schema_version(conn)
+    applied = 0
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not accept bound parameters
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"   ↑ Migrated database to v{version}: {description}", file=file)
+        applied += 1
+
+    return applied
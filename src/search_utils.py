@@ -0,0 +1,90 @@
+"""
+Purpose: Full-text menu search backed by the SQLite FTS5 index
+Related: db_utils.py (menu_items_fts table and sync triggers)
+Refactor if: >300 lines OR adding non-menu search sources
+"""
+
+import re
+
+from db_utils import get_db
+
+# Column weights for bm25(): a hit in the name outranks a hit in the ingredients
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never inject
+    FTS5 operators and partially typed words still match.
+
+    Examples:
+        >>> build_match_query('caesar chick')
+        '"caesar"* "chick"*'
+
+        >>> build_match_query('  ')
+        ''
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_menu(environment, query, limit=20, conn=None):
+    """
+    Search menu items by name and ingredients.
+
+    Args:
+        environment: 'sandbox' or 'production'
+        query: Free text, e.g. 'kale quin' (prefix matching per word)
+        limit: Maximum number of results
+        conn: Connection to use (default: get_db())
+
+    Returns:
+        list: Dicts with square_id, name, category, price_cents, snippet, rank
+              ordered best match first
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    if conn is None:
+        with get_db() as conn:
+            return search_menu(environment, query, limit, conn)
+
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT m.square_id, m.name, c.name AS category, m.price_cents,
+               snippet(menu_items_fts, 1, '[', ']', '…', 10) AS snippet,
+               bm25(menu_items_fts, ?, ?) AS rank
+        FROM menu_items_fts
+        JOIN menu_items m ON m.id = menu_items_fts.rowid
+        LEFT JOIN categories c ON c.id = m.category_id
+        WHERE menu_items_fts MATCH ? AND m.environment = ?
+        ORDER BY rank
+        LIMIT ?
+    ''', (NAME_WEIGHT, DESCRIPTION_WEIGHT, match, environment, limit))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def rebuild_search_index():
+    """Rebuild the FTS index from menu_items (after bulk imports or repairs)"""
+    with get_db() as conn:
+        conn.execute("INSERT INTO menu_items_fts(menu_items_fts) VALUES ('rebuild')")
+
+
+if __name__ == "__main__":
+    import sys
+    import os
+
+    if len(sys.argv) < 2:
+        print("Usage: python src/search_utils.py <query> [environment]")
+        sys.exit(1)
+
+    env = sys.argv[2] if len(sys.argv) > 2 else os.getenv('SQUARE_ENVIRONMENT', 'sandbox').lower()
+
+    for result in search_menu(env, sys.argv[1]):
+        print(f"{result['name']} ({result['square_id']}) - {result['snippet']}")
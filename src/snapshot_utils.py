@@ -0,0 +1,390 @@
+"""
+Purpose: Local catalog snapshots (compressed JSONL) with delta refresh
+Related: catalog_utils.py (check_for_duplicates), client_utils.py, db_utils.py (DB_PATH)
+Refactor if: >400 lines OR snapshots need indexes beyond id/type/name
+
+A snapshot is every catalog object of one environment, one JSON object per
+line, preceded by a metadata header line:
+
+    {"format": "catering-square-snapshot", "format_version": 1, "environment": ...,
+     "latest_time": ..., "object_count": ..., "created_at": ..., "refreshed_at": ...}
+
+Files ending in .gz are gzip-compressed (default); plain .jsonl files are
+memory-mapped on load. After the first full download, refresh() only asks
+Square for objects changed since latest_time (catalog.search with
+begin_time + include_deleted_objects), so a warm start is one API call.
+Variations and modifiers are kept both as top-level objects and nested in
+their ITEM/MODIFIER_LIST; a delta re-nests the top-level copies so both agree.
+
+Usage:
+    python src/snapshot_utils.py sandbox          # refresh (full on first run) and save
+    python src/snapshot_utils.py sandbox --info   # show snapshot metadata only
+    python src/snapshot_utils.py production --archive   # also keep a dated copy for diff_utils.py
+"""
+
+import os
+import gc
+import json
+import gzip
+import mmap
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+FORMAT = 'catering-square-snapshot'
+FORMAT_VERSION = 1
+
+# catalog.search page size (Square maximum)
+SEARCH_PAGE_SIZE = 1000
+
+# gzip level for .gz snapshots (9 is ~6x slower to write for ~10% smaller files)
+GZIP_LEVEL = 5
+
+# Child type -> (child data field, parent ref field, parent data field, nested list field)
+NESTED_CHILDREN = {
+    'ITEM_VARIATION': ('item_variation_data', 'item_id', 'item_data', 'variations'),
+    'MODIFIER': ('modifier_data', 'modifier_list_id', 'modifier_list_data', 'modifiers'),
+}
+
+
+def snapshots_dir():
+    """Snapshots live next to the database (data/snapshots/ by default)"""
+    import db_utils
+    return Path(db_utils.DB_PATH).parent / 'snapshots'
+
+
+def snapshot_path(environment):
+    """Default snapshot file for an environment (fake-client catalogs are kept apart)"""
+    from client_utils import is_fake_client
+
+    suffix = '-fake' if is_fake_client() else ''
+    return snapshots_dir() / f"{environment}{suffix}.jsonl.gz"
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector while building large object graphs.
+
+    Loading 100k objects allocates millions of dicts and lists; without
+    this, repeated full collections take about half the load time.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def archive_path(environment, path=None):
+    """Dated copy next to the snapshot: <env>-YYYYmmdd-HHMMSS.jsonl.gz"""
+    path = Path(path or snapshot_path(environment))
+    stem = path.name.split('.', 1)[0]
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return path.with_name(f"{stem}-{stamp}{''.join(path.suffixes)}")
+
+
+def _parent_id(obj):
+    """Parent ITEM/MODIFIER_LIST ID of a variation or modifier, else None"""
+    nested = NESTED_CHILDREN.get(obj.get('type'))
+    return (obj.get(nested[0]) or {}).get(nested[1]) if nested else None
+
+
+def _to_dict(obj):
+    """Plain dict for an SDK model, FakeModel or dict"""
+    if isinstance(obj, dict):
+        return obj
+    if callable(getattr(obj, 'model_dump', None)):
+        return obj.model_dump(mode='json', exclude_none=True)
+    return dict(obj)
+
+
+class CatalogSnapshot:
+    """
+    In-memory catalog for one environment: {object ID: object dict}.
+
+    Objects keep the Square API shape (type, id, version, item_data, ...).
+    """
+
+    def __init__(self, environment, objects=None, latest_time=None, created_at=None, refreshed_at=None):
+        self.environment = environment
+        self.objects = objects if objects is not None else {}
+        self.latest_time = latest_time
+        self.created_at = created_at
+        self.refreshed_at = refreshed_at
+
+    def __len__(self):
+        return len(self.objects)
+
+    def of_type(self, object_type):
+        """All objects of one type (e.g. 'ITEM', 'CATEGORY')"""
+        return [obj for obj in self.objects.values() if obj.get('type') == object_type]
+
+    def metadata(self):
+        return {
+            'format': FORMAT,
+            'format_version': FORMAT_VERSION,
+            'environment': self.environment,
+            'latest_time': self.latest_time,
+            'object_count': len(self.objects),
+            'created_at': self.created_at,
+            'refreshed_at': self.refreshed_at,
+        }
+
+    # ----- persistence -----------------------------------------------------
+
+    def save(self, path=None):
+        """Write the snapshot atomically (gzip when the name ends in .gz)"""
+        path = Path(path or snapshot_path(self.environment))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+
+        if path.suffix == '.gz':
+            f = gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=GZIP_LEVEL)
+        else:
+            f = open(tmp_path, 'w', encoding='utf-8')
+        with f:
+            f.write(json.dumps(self.metadata()) + '\n')
+            for obj in self.objects.values():
+                f.write(json.dumps(obj, separators=(',', ':')) + '\n')
+
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a snapshot file written by save()"""
+        path = Path(path)
+        if path.suffix == '.gz':
+            # One C-level decompress is much faster than streaming readline()
+            return cls._from_lines(iter(gzip.decompress(path.read_bytes()).splitlines()), path)
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return cls._from_lines(iter(mm.readline, b''), path)
+
+    @classmethod
+    def _from_lines(cls, lines, path):
+        meta = json.loads(next(lines, b'{}'))
+        if meta.get('format') != FORMAT or meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Not a v{FORMAT_VERSION} catalog snapshot: {path}")
+
+        objects = {}
+        with gc_paused():
+            for line in lines:
+                obj = json.loads(line)
+                objects[obj['id']] = obj
+
+        # Files saved before refresh() re-nested children can hold stale nested copies
+        stale = _stale_parents(objects)
+        if stale:
+            _renest(objects, stale)
+
+        return cls(meta['environment'], objects, meta.get('latest_time'),
+                   meta.get('created_at'), meta.get('refreshed_at'))
+
+    # ----- sync ------------------------------------------------------------
+
+    def refresh(self, client, full=False):
+        """
+        Bring the snapshot up to date with Square.
+
+        Without a latest_time (or with full=True) every object is downloaded;
+        otherwise only objects changed since latest_time, including deletions.
+
+        Returns:
+            dict: {'full': bool, 'updated': n, 'deleted': n, 'calls': n}
+        """
+        full = full or not self.latest_time
+        stats = {'full': full, 'updated': 0, 'deleted': 0, 'calls': 0}
+        objects = {} if full else self.objects
+        cursor = None
+        latest_time = self.latest_time
+        renest = set()  # Parents whose variations/modifiers changed on their own
+
+        while True:
+            kwargs = {'cursor': cursor, 'limit': SEARCH_PAGE_SIZE, 'include_deleted_objects': not full}
+            if not full:
+                kwargs['begin_time'] = self.latest_time
+            response = client.catalog.search(**kwargs)
+            stats['calls'] += 1
+
+            for obj in response.objects or []:
+                data = _to_dict(obj)
+                if data.get('is_deleted'):
+                    old = objects.pop(data['id'], None)
+                    if old is not None:
+                        stats['deleted'] += 1
+                        renest.add(_parent_id(old))
+                else:
+                    objects[data['id']] = data
+                    stats['updated'] += 1
+                    renest.add(_parent_id(data))
+
+            latest_time = response.latest_time or latest_time
+            cursor = response.cursor
+            if not cursor:
+                break
+
+        renest.discard(None)
+        if renest and not full:
+            _renest(objects, renest)
+
+        now = datetime.now().isoformat(timespec='seconds')
+        self.objects = objects
+        self.latest_time = latest_time
+        self.refreshed_at = now
+        if full or not self.created_at:
+            self.created_at = now
+        return stats
+
+
+def _renest(objects, parent_ids):
+    """
+    Replace the nested variations/modifiers of these parents with the top-level objects.
+
+    A delta returns a changed variation as a top-level object; without this
+    the copy nested in its ITEM would keep the old price and version.
+    Order is kept, new children are appended and deleted ones dropped.
+    """
+    children = {}
+    for obj in objects.values():
+        parent_id = _parent_id(obj)
+        if parent_id in parent_ids:
+            children.setdefault(parent_id, {})[obj['id']] = obj
+
+    for parent_id in parent_ids:
+        parent = objects.get(parent_id)
+        fields = [(data, field) for _, _, data, field in NESTED_CHILDREN.values() if (parent or {}).get(data)]
+        if not fields:
+            continue
+        data_field, list_field = fields[0]
+        fresh = children.get(parent_id, {})
+        nested = [fresh.pop(child['id']) for child in parent[data_field].get(list_field) or []
+                  if child['id'] in fresh]
+        parent[data_field] = dict(parent[data_field], **{list_field: nested + list(fresh.values())})
+
+
+def _stale_parents(objects):
+    """Parents with a nested child whose version differs from its top-level copy"""
+    stale = set()
+    for obj in objects.values():
+        for _, _, data_field, list_field in NESTED_CHILDREN.values():
+            for child in (obj.get(data_field) or {}).get(list_field) or []:
+                top = objects.get(child.get('id'))
+                if top is not None and top.get('version') != child.get('version'):
+                    stale.add(obj['id'])
+                    break
+    return stale
+
+
+# Snapshots kept in memory while warm_snapshots() is active: {path: (mtime_ns, snapshot)}
+_warm = None
+
+
+@contextmanager
+def warm_snapshots():
+    """
+    Keep loaded snapshots in memory for the block (long-running processes).
+
+    load_snapshot() then returns the in-memory copy while its file is
+    unchanged, so a warm delta refresh costs the API call, not a reload.
+    """
+    global _warm
+    outer, _warm = _warm, {}
+    try:
+        yield
+    finally:
+        _warm = outer
+
+
+def _remember(path, snapshot):
+    if _warm is not None:
+        _warm[str(path)] = (path.stat().st_mtime_ns, snapshot)
+
+
+def load_snapshot(environment, path=None):
+    """Load the saved snapshot for an environment, or None if there is none"""
+    path = Path(path or snapshot_path(environment))
+    if not path.exists():
+        return None
+
+    cached = _warm.get(str(path)) if _warm is not None else None
+    if cached and cached[0] == path.stat().st_mtime_ns:
+        return cached[1]
+
+    try:
+        snapshot = CatalogSnapshot.load(path)
+    except (OSError, ValueError, EOFError) as e:
+        print(f"⚠️  Ignoring unreadable snapshot {path}: {e}")
+        return None
+    _remember(path, snapshot)
+    return snapshot
+
+
+def sync_snapshot(client, environment, path=None, full=False, verbose=True, archive=False):
+    """
+    Load, delta-refresh and save the snapshot for an environment.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        path: Snapshot file (default: snapshot_path(environment))
+        full: Ignore the saved snapshot and download everything
+        archive: Also save a dated copy (see archive_path()) for later diffs
+
+    Returns:
+        CatalogSnapshot
+    """
+    snapshot = None if full else load_snapshot(environment, path)
+    if snapshot is None:
+        snapshot = CatalogSnapshot(environment)
+
+    stats = snapshot.refresh(client, full=full)
+    saved = Path(path or snapshot_path(environment))
+    if stats['full'] or stats['updated'] or stats['deleted'] or not saved.exists():
+        snapshot.save(saved)
+        _remember(saved, snapshot)
+
+    if verbose:
+        kind = "full download" if stats['full'] else "delta"
+        print(f"🗂️  Snapshot {saved.name}: {len(snapshot)} objects "
+              f"({kind}: {stats['updated']} updated, {stats['deleted']} deleted, {stats['calls']} call(s))")
+    if archive:
+        archived = snapshot.save(archive_path(environment, saved))
+        if verbose:
+            print(f"   → Archived as {archived.name}")
+    return snapshot
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Refresh or inspect the local catalog snapshot")
+    parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    parser.add_argument('--path', help="Snapshot file (default: data/snapshots/<env>.jsonl.gz)")
+    parser.add_argument('--full', action='store_true', help="Download the whole catalog again")
+    parser.add_argument('--info', action='store_true', help="Show metadata without calling Square")
+    parser.add_argument('--archive', action='store_true', help="Also keep a dated copy of the snapshot")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment
+    environment = args.environment or get_environment()
+
+    if args.info:
+        snapshot = load_snapshot(environment, args.path)
+        if snapshot is None:
+            print(f"❌ No snapshot for {environment}")
+            return 1
+        print(json.dumps(snapshot.metadata(), indent=2))
+        return 0
+
+    from client_utils import create_square_client
+    sync_snapshot(create_square_client(environment), environment, args.path, full=args.full, archive=args.archive)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
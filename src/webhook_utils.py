@@ -0,0 +1,372 @@
+"""
+Purpose: Receive Square's catalog.version.updated webhook and sync once per burst of edits
+Related: reconcile_utils.py (the sync), snapshot_utils.py (delta refresh), env_utils.py (signature key)
+Refactor if: >400 lines OR handling webhook types beyond catalog.version.updated
+
+A small http.server receiver replaces polling for dashboard edits:
+
+    POST /square/webhook
+      -> signature checked (HMAC-SHA256 of notification URL + body, keyed
+         by SQUARE_WEBHOOK_SIGNATURE_KEY), 403 if it does not match
+      -> 200 right away; retried deliveries (same event_id) are dropped
+      -> events are coalesced: the sync runs once the catalog has been quiet
+         for --quiet seconds (or --max-wait after the first event), however
+         many notifications a bulk edit sent
+
+The sync is incremental: a delta refresh of the local snapshot (one call
+for the objects changed since the last refresh), then reconcile_utils
+repairs square_catalog.db from it. Syncs run one at a time on the main
+thread; events arriving during a sync start the next burst.
+
+Usage:
+    python src/webhook_utils.py serve --port 8765
+    python src/webhook_utils.py send --count 20        # local test sender
+    catering-square webhook --port 8765
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SIGNATURE_HEADER = 'x-square-hmacsha256-signature'
+CATALOG_EVENT = 'catalog.version.updated'
+WEBHOOK_PATH = '/square/webhook'
+
+QUIET_SECONDS = 2.0  # Sync once no event arrived for this long...
+MAX_WAIT_SECONDS = 30.0  # ...but no later than this after the first event of a burst
+MAX_BODY_BYTES = 1024 * 1024
+SEEN_EVENT_IDS = 1000  # Retried deliveries remembered for de-duplication
+
+
+def sign(signature_key, notification_url, body):
+    """Square webhook signature: base64(HMAC-SHA256(key, notification URL + raw body))"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hmac.new(signature_key.encode('utf-8'), notification_url.encode('utf-8') + body,
+                      hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def is_valid_signature(signature_key, notification_url, body, signature):
+    """Constant-time check of a received signature header"""
+    if not signature:
+        return False
+    return hmac.compare_digest(sign(signature_key, notification_url, body), signature)
+
+
+def catalog_event(merchant_id='LOCAL', updated_at=None, event_id=None):
+    """A catalog.version.updated payload shaped like Square's (for the test sender)"""
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return {
+        'merchant_id': merchant_id,
+        'type': CATALOG_EVENT,
+        'event_id': event_id or str(uuid.uuid4()),
+        'created_at': now,
+        'data': {
+            'type': 'catalog_version',
+            'id': '',
+            'object': {'catalog_version': {'updated_at': updated_at or now}},
+        },
+    }
+
+
+class EventCoalescer:
+    """
+    Collects webhook events from the HTTP threads into bursts.
+
+    add() is called per delivery; next_burst() blocks until a burst is
+    over (quiet period elapsed, or max_wait since its first event) and
+    returns its events. Thread-safe.
+    """
+
+    def __init__(self, quiet=QUIET_SECONDS, max_wait=MAX_WAIT_SECONDS):
+        self.quiet = quiet
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._events = []
+        self._first_at = self._last_at = None
+        self._seen = OrderedDict()
+        self._stopped = False
+        self.received = 0
+        self.duplicates = 0
+
+    def add(self, event):
+        """Queue an event; returns False for a retried delivery already seen"""
+        with self._cond:
+            event_id = event.get('event_id')
+            if event_id:
+                if event_id in self._seen:
+                    self.duplicates += 1
+                    return False
+                self._seen[event_id] = True
+                if len(self._seen) > SEEN_EVENT_IDS:
+                    self._seen.popitem(last=False)
+
+            now = time.monotonic()
+            if not self._events:
+                self._first_at = now
+            self._last_at = now
+            self._events.append(event)
+            self.received += 1
+            self._cond.notify()
+            return True
+
+    def next_burst(self, timeout=None):
+        """
+        Wait for the current burst to end.
+
+        Returns:
+            list: The burst's events, or None on stop() / timeout with no events
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                if self._events:
+                    due = min(self._last_at + self.quiet, self._first_at + self.max_wait)
+                    if now >= due:
+                        events, self._events = self._events, []
+                        return events
+                    self._cond.wait(due - now)
+                else:
+                    if give_up is not None and now >= give_up:
+                        return None
+                    self._cond.wait(None if give_up is None else give_up - now)
+            return None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Verifies and queues deliveries; the server carries key, URL and coalescer"""
+
+    def do_POST(self):
+        if self.path.split('?')[0] != self.server.path:
+            return self._reply(404, 'not found')
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._reply(400, 'invalid Content-Length')
+        if length > MAX_BODY_BYTES:
+            return self._reply(413, 'payload too large')
+        body = self.rfile.read(length)
+
+        if not is_valid_signature(self.server.signature_key, self.server.notification_url,
+                                  body, self.headers.get(SIGNATURE_HEADER)):
+            self.server.rejected += 1
+            return self._reply(403, 'invalid signature')
+
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return self._reply(400, 'invalid JSON')
+
+        if not isinstance(event, dict) or event.get('type') != CATALOG_EVENT:
+            return self._reply(200, 'ignored')
+        self.server.coalescer.add(event)
+        return self._reply(200, 'ok')
+
+    def _reply(self, status, message):
+        body = json.dumps({'status': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(signature_key, host='127.0.0.1', port=8765, notification_url=None,
+                  coalescer=None, path=WEBHOOK_PATH, verbose=False):
+    """
+    Build (but do not start) the webhook HTTP server.
+
+    Args:
+        signature_key: Subscription signature key
+        notification_url: URL registered with Square, part of every signature
+                          (default: http://<host>:<port><path>)
+        coalescer: EventCoalescer receiving verified events
+
+    Returns:
+        ThreadingHTTPServer (port 0 picks a free port, see server.server_address)
+    """
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    server.daemon_threads = True
+    server.path = path
+    server.signature_key = signature_key
+    server.notification_url = notification_url or f"http://{host}:{server.server_address[1]}{path}"
+    server.coalescer = coalescer or EventCoalescer()
+    server.rejected = 0
+    server.verbose = verbose
+    return server
+
+
+def sync_catalog(client, environment):
+    """Incremental sync run per burst: delta-refresh the snapshot, reconcile the database"""
+    from reconcile_utils import drift_count, reconcile_objects
+    from snapshot_utils import sync_snapshot
+
+    snapshot = sync_snapshot(client, environment, verbose=False)
+    stats = reconcile_objects(environment, snapshot.objects.values())
+    return drift_count(stats)
+
+
+def serve(client, environment, host='127.0.0.1', port=8765, quiet=QUIET_SECONDS,
+          max_wait=MAX_WAIT_SECONDS, notification_url=None, sync=None, max_syncs=None):
+    """
+    Receive webhooks until interrupted, syncing once per burst.
+
+    The HTTP server runs on a background thread; syncs run on the calling
+    thread, so they never overlap and can use its DB connection.
+
+    Args:
+        client: Square API client
+        environment: 'sandbox' or 'production'
+        sync: Callable(client, environment) -> rows changed (default: sync_catalog)
+        max_syncs: Stop after this many syncs (tests/benchmarks)
+
+    Returns:
+        dict: {'received', 'duplicates', 'rejected', 'syncs', 'changed'}
+    """
+    from client_utils import CachingClient
+    from env_utils import get_webhook_signature_key, get_webhook_url
+
+    sync = sync or sync_catalog
+    coalescer = EventCoalescer(quiet=quiet, max_wait=max_wait)
+    server = create_server(get_webhook_signature_key(), host, port, coalescer=coalescer,
+                           notification_url=notification_url or get_webhook_url())
+    thread = threading.Thread(target=server.serve_forever, name='webhook-server', daemon=True)
+    thread.start()
+
+    print(f"📡 Listening on {host}:{server.server_address[1]}{server.path} ({environment.upper()})")
+    print(f"   Signed URL: {server.notification_url}")
+    print(f"   Sync after {quiet:g}s quiet (at most {max_wait:g}s after the first event)")
+
+    stats = {'syncs': 0, 'changed': 0}
+    try:
+        while max_syncs is None or stats['syncs'] < max_syncs:
+            events = coalescer.next_burst()
+            if events is None:
+                break
+            started = time.perf_counter()
+            if isinstance(client, CachingClient):
+                client.clear()  # A cached delta search would hide this burst's edits
+            try:
+                changed = sync(client, environment)
+            except Exception as e:
+                print(f"❌ Sync after {len(events)} event(s) failed: {e}")
+                continue
+            stats['syncs'] += 1
+            stats['changed'] += changed or 0
+            print(f"✅ Synced {len(events)} event(s) in {time.perf_counter() - started:.2f}s: "
+                  f"{changed or 0} row(s) changed")
+    except KeyboardInterrupt:
+        print("\n👋 Stopping")
+    finally:
+        coalescer.stop()
+        server.shutdown()
+        server.server_close()
+
+    stats.update(received=coalescer.received, duplicates=coalescer.duplicates, rejected=server.rejected)
+    return stats
+
+
+def send_test_event(url, signature_key, notification_url=None, event=None, timeout=10):
+    """
+    POST a signed catalog.version.updated event, like Square would.
+
+    Returns:
+        int: HTTP status code
+    """
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    body = json.dumps(event or catalog_event()).encode('utf-8')
+    request = Request(url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        SIGNATURE_HEADER: sign(signature_key, notification_url or url, body),
+    })
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def add_server_arguments(parser):
+    """--host/--port/--quiet/--max-wait, shared with cli.py"""
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--quiet', type=float, default=QUIET_SECONDS, help="Seconds without events before syncing")
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT_SECONDS, help="Longest delay of a sync")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Square catalog webhook receiver and test sender")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = sub.add_parser('serve', help="Receive webhooks and sync once per burst")
+    serve_parser.add_argument('environment', nargs='?', help="sandbox or production (default: SQUARE_ENVIRONMENT)")
+    add_server_arguments(serve_parser)
+
+    send_parser = sub.add_parser('send', help="Send signed test events to a local receiver")
+    send_parser.add_argument('--url', default=f"http://127.0.0.1:8765{WEBHOOK_PATH}")
+    send_parser.add_argument('--count', type=int, default=1, help="Events to send (a burst)")
+    send_parser.add_argument('--interval', type=float, default=0.05, help="Seconds between events")
+    send_parser.add_argument('--bad-signature', action='store_true', help="Sign with a wrong key (expect 403)")
+    args = parser.parse_args(argv)
+
+    from env_utils import get_environment, get_webhook_signature_key, get_webhook_url
+
+    try:
+        signature_key = get_webhook_signature_key()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.command == 'send':
+        key = 'wrong-key' if args.bad_signature else signature_key
+        statuses = []
+        try:
+            for i in range(args.count):
+                if i:
+                    time.sleep(args.interval)
+                statuses.append(send_test_event(args.url, key, get_webhook_url(args.url)))
+        except OSError as e:
+            print(f"❌ Could not reach {args.url}: {e}")
+            return 1
+        print(f"📨 Sent {args.count} event(s) to {args.url}: "
+              + ', '.join(f"{statuses.count(s)}× {s}" for s in sorted(set(statuses))))
+        return 0 if all(s == 200 for s in statuses) else 1
+
+    from client_utils import create_square_client
+
+    environment = args.environment or get_environment()
+    stats = serve(create_square_client(environment), environment, args.host, args.port,
+                  quiet=args.quiet, max_wait=args.max_wait)
+    print(f"📊 {stats['received']} event(s), {stats['duplicates']} duplicate(s), {stats['rejected']} rejected, "
+          f"{stats['syncs']} sync(s), {stats['changed']} row(s) changed")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())